@@ -16,6 +16,8 @@
  * - runFullPipeline(): Run the complete analytics pipeline
  * - checkForNewData(): Check if new monthly data is available
  * - refreshConnectedData(): Refresh BigQuery connected data in the sheet
+ * - startPipelineAsync(): Start the pipeline and return immediately
+ * - checkPipelineProgress(): Follow the last async run until it finishes
  */
 
 // Configuration - UPDATE THIS with your Cloud Function URL
@@ -29,6 +31,11 @@ const CONFIG = {
   // Timeout for HTTP requests (in seconds)
   REQUEST_TIMEOUT: 540,
 
+  // How often, and for how long, checkPipelineProgress() polls an async run
+  // (in seconds; Apps Script stops a script after 6 minutes)
+  PROGRESS_POLL_INTERVAL: 20,
+  PROGRESS_MAX_WAIT: 300,
+
   // Sheet name for logging (optional)
   LOG_SHEET_NAME: 'Pipeline Log'
 };
@@ -98,6 +105,71 @@ function runFullPipeline(options = {}) {
 }
 
 
+/**
+ * Start the analytics pipeline without waiting for it to finish.
+ * The Cloud Function submits the BigQuery jobs and returns a run ID, which is
+ * saved so checkPipelineProgress() can follow the run.
+ *
+ * Options:
+ * - force: true to rebuild even if no new data detected
+ */
+function startPipelineAsync(options = {}) {
+  const result = callCloudFunction({
+    async: true,
+    force: options.force || false,
+    skip_check: options.skip_check || false
+  });
+
+  if (result.run_id && result.status === 'running') {
+    PropertiesService.getDocumentProperties().setProperty('LAST_RUN_ID', result.run_id);
+    showNotification('Pipeline Started', `Run ${result.run_id} submitted. Use "Check Pipeline Progress" to follow it.`);
+    logToSheet('Pipeline started (async)', result);
+  } else if (result.status === 'skipped') {
+    showNotification('Pipeline Skipped', result.message || 'No new data to process');
+  } else {
+    showNotification('Pipeline Failed', result.error || 'Unknown error');
+    logToSheet('Pipeline start failed', result);
+  }
+
+  return result;
+}
+
+
+/**
+ * Follow the last run started with startPipelineAsync() until it finishes,
+ * or for up to CONFIG.PROGRESS_MAX_WAIT seconds, showing per-step progress.
+ * Each check also lets the Cloud Function submit the steps that are now ready.
+ */
+function checkPipelineProgress() {
+  const runId = PropertiesService.getDocumentProperties().getProperty('LAST_RUN_ID');
+  if (!runId) {
+    showNotification('No Run Found', 'Start a pipeline run first');
+    return null;
+  }
+
+  const deadline = Date.now() + CONFIG.PROGRESS_MAX_WAIT * 1000;
+  let result;
+  while (true) {
+    result = callCloudFunction({ run_id: runId });
+    const counts = Object.entries(result.step_counts || {})
+      .map(([status, n]) => `${n} ${status}`)
+      .join(', ');
+    showNotification(`Run ${result.status}`, counts || result.error || 'Unknown status');
+
+    if (result.status !== 'running' || Date.now() >= deadline) {
+      break;
+    }
+    Utilities.sleep(CONFIG.PROGRESS_POLL_INTERVAL * 1000);
+  }
+
+  if (result.status !== 'running') {
+    logToSheet('Async pipeline finished', result);
+  }
+
+  return result;
+}
+
+
 /**
  * Check if new monthly data is available without running the pipeline.
  */
@@ -187,6 +259,8 @@ function onOpen() {
     .addItem('Refresh Views Only', 'refreshViews')
     .addItem('Run Full Pipeline', 'runFullPipeline')
     .addItem('Force Full Rebuild', 'forceFullRebuild')
+    .addItem('Start Pipeline (Async)', 'startPipelineAsync')
+    .addItem('Check Pipeline Progress', 'checkPipelineProgress')
     .addSeparator()
     .addItem('Refresh Connected Data', 'refreshConnectedData')
     .addItem('Run Pipeline & Refresh Data', 'runPipelineAndRefresh')
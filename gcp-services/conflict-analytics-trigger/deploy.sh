@@ -7,10 +7,21 @@ set -e
 PROJECT_ID="${PROJECT_ID:-clingen-dev}"
 REGION="${REGION:-us-central1}"
 FUNCTION_NAME="conflict-analytics-trigger"
+# Cloud Scheduler job that advances async runs nobody is polling; set
+# ADVANCE_SCHEDULE="" to skip it
+ADVANCE_JOB="$FUNCTION_NAME-advance"
+ADVANCE_SCHEDULE="${ADVANCE_SCHEDULE-*/5 * * * *}"
+
+# Bundle the SQL scripts as a fallback for when GCS cannot be reached
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+rm -rf "$SCRIPT_DIR/sql"
+mkdir -p "$SCRIPT_DIR/sql"
+cp "$SCRIPT_DIR"/../../scripts/conflict-resolution-analysis/0[1-7]-*.sql "$SCRIPT_DIR/sql/"
 
 echo "Deploying $FUNCTION_NAME to $PROJECT_ID..."
 
 gcloud functions deploy "$FUNCTION_NAME" \
+    --source="$SCRIPT_DIR" \
     --project="$PROJECT_ID" \
     --region="$REGION" \
     --runtime=python311 \
@@ -21,14 +32,32 @@ gcloud functions deploy "$FUNCTION_NAME" \
     --memory=512MB \
     --set-env-vars="PROJECT_ID=$PROJECT_ID"
 
+FUNCTION_URL="$(gcloud functions describe "$FUNCTION_NAME" \
+    --project="$PROJECT_ID" \
+    --region="$REGION" \
+    --format='value(httpsTrigger.url)')"
+
+if [ -n "$ADVANCE_SCHEDULE" ]; then
+    echo "Scheduling $ADVANCE_JOB ($ADVANCE_SCHEDULE)..."
+    if gcloud scheduler jobs describe "$ADVANCE_JOB" \
+        --project="$PROJECT_ID" --location="$REGION" >/dev/null 2>&1; then
+        SCHEDULER_COMMAND=update
+    else
+        SCHEDULER_COMMAND=create
+    fi
+    gcloud scheduler jobs "$SCHEDULER_COMMAND" http "$ADVANCE_JOB" \
+        --project="$PROJECT_ID" \
+        --location="$REGION" \
+        --schedule="$ADVANCE_SCHEDULE" \
+        --http-method=GET \
+        --uri="$FUNCTION_URL?advance=true&project=$PROJECT_ID"
+fi
+
 echo ""
 echo "Deployment complete!"
 echo ""
 echo "Function URL:"
-gcloud functions describe "$FUNCTION_NAME" \
-    --project="$PROJECT_ID" \
-    --region="$REGION" \
-    --format='value(httpsTrigger.url)'
+echo "$FUNCTION_URL"
 echo ""
 echo "Test with:"
 echo "  curl \"\$(gcloud functions describe $FUNCTION_NAME --project=$PROJECT_ID --region=$REGION --format='value(httpsTrigger.url)')?check_only=true\""
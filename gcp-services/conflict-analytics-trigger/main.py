@@ -26,17 +26,32 @@ For authenticated access (recommended for production):
 """
 
 import functions_framework
+from google.api_core.exceptions import Conflict, GoogleAPIError, NotFound, PreconditionFailed
+from google.auth.exceptions import TransportError
 from google.cloud import bigquery
 from google.cloud import storage
 from flask import jsonify
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import re
+import requests
+import threading
+import time
 import traceback
-from datetime import datetime
+import uuid
+from datetime import date, datetime
 
 # GCS bucket and folder containing SQL files
 SQL_BUCKET = "clinvar-ingest"
 SQL_FOLDER = "conflict-analytics-sql"
 
-# SQL files in execution order
+# Copy of scripts/conflict-resolution-analysis bundled by deploy.sh, used
+# when GCS cannot be reached
+LOCAL_SQL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql")
+
+# SQL files in execution order. Steps run concurrently where the tables they
+# read allow it (see build_dependency_graph); this order breaks ties.
 SQL_SCRIPTS = [
     ("01-get-monthly-conflicts.sql", "Creating monthly_conflict_snapshots"),
     ("02-monthly-conflict-changes.sql", "Creating monthly_conflict_changes"),
@@ -46,12 +61,91 @@ SQL_SCRIPTS = [
     ("07-google-sheets-analytics.sql", "Creating Google Sheets views"),
 ]
 
+# GCS folder (in SQL_BUCKET) holding the state of asynchronous runs
+RUNS_FOLDER = "conflict-analytics-runs"
+
+# GCS folder (in SQL_BUCKET) holding one lease per project and pipeline
+# mode, so only one run of each rebuilds the tables at a time
+LEASES_FOLDER = "conflict-analytics-leases"
+# Seconds a lease stays valid without renewal. Longer than the function
+# timeout, so a lease outlives a dead instance by at most this long.
+LEASE_SECONDS = 600
+LEASE_LOST = "Lease lost: another run of this project and mode has taken over"
+
+# Seconds after which a run that has not finished is marked expired and
+# its lease released, so a run nobody advances cannot hold the lease
+RUN_TIMEOUT_SECONDS = 6 * 3600
+
 # Default project
 DEFAULT_PROJECT = "clingen-dev"
 
+# Table (in the run's project) that every executed step's job statistics
+# are appended to, for tracking cost and duration per script over time
+HISTORY_TABLE = "clinvar_ingest.conflict_analytics_step_history"
+HISTORY_SCHEMA = [
+    bigquery.SchemaField("run_id", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("script", "STRING", mode="REQUIRED"),
+    bigquery.SchemaField("status", "STRING"),
+    bigquery.SchemaField("job_id", "STRING"),
+    bigquery.SchemaField("start_month", "DATE"),
+    bigquery.SchemaField("submitted_at", "TIMESTAMP"),
+    bigquery.SchemaField("duration_seconds", "FLOAT"),
+    bigquery.SchemaField("total_bytes_processed", "INTEGER"),
+    bigquery.SchemaField("total_bytes_billed", "INTEGER"),
+    bigquery.SchemaField("slot_millis", "INTEGER"),
+    bigquery.SchemaField("cache_hit", "BOOLEAN"),
+    bigquery.SchemaField(
+        "timeline", "RECORD", mode="REPEATED",
+        fields=[
+            bigquery.SchemaField("elapsed_ms", "INTEGER"),
+            bigquery.SchemaField("active_units", "INTEGER"),
+            bigquery.SchemaField("pending_units", "INTEGER"),
+            bigquery.SchemaField("completed_units", "INTEGER"),
+            bigquery.SchemaField("slot_millis", "INTEGER")
+        ]
+    )
+]
+
+# Seconds between BigQuery job status checks while steps are running
+POLL_INTERVAL_SECONDS = 2
+
+# SQL comments, stripped before looking for table references
+SQL_COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+# Tables and views a script creates
+SQL_CREATE_PATTERN = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:TEMP\s+|TEMPORARY\s+)?(?:TABLE|VIEW)\s+"
+    r"(?:IF\s+NOT\s+EXISTS\s+)?`([^`]+)`",
+    re.IGNORECASE
+)
+# Any backquoted dataset.table or project.dataset.table reference
+SQL_TABLE_PATTERN = re.compile(r"`([\w-]+(?:\.[\w-]+){1,2})`")
+# Build window declared by the month-scoped scripts (01, 02, 04, 05); its
+# default is a full rebuild. Incremental runs replace it with @start_month.
+START_MONTH_PATTERN = re.compile(
+    r"DECLARE\s+start_month\s+DATE\s+DEFAULT\s+DATE\s*'[\d-]+'\s*;",
+    re.IGNORECASE
+)
+
+# Single-row table, written by 01, holding the latest processed snapshot date
+WATERMARK_TABLE = "clinvar_ingest.monthly_conflict_watermark"
+# Release datasets created by clinvar-ingest (the schemas all_schemas() lists)
+RELEASE_DATASET_PATTERN = re.compile(r"^clinvar_(\d{4})_(\d{2})_(\d{2})_v\d_\d+_\d+$")
+# First month the analytics cover
+FIRST_MONTH = date(2023, 1, 1)
+# Seconds a new-data check result is reused by later calls on a warm instance
+NEW_DATA_CACHE_SECONDS = 300
+
 # Storage client (initialized on first use)
 _storage_client = None
 
+# Script name -> (generation, SQL) of the last version downloaded. Kept
+# across warm invocations so unchanged scripts are not downloaded again.
+_sql_cache = {}
+_sql_cache_lock = threading.Lock()
+
+# Project -> (expiry time.monotonic(), new month count) of recent checks
+_new_data_cache = {}
+
 
 def get_storage_client():
     """Get or create storage client."""
@@ -61,62 +155,912 @@ def get_storage_client():
     return _storage_client
 
 
-def load_sql_from_gcs(script_name: str) -> str:
-    """Load SQL content from GCS bucket."""
-    client = get_storage_client()
-    bucket = client.bucket(SQL_BUCKET)
-    blob = bucket.blob(f"{SQL_FOLDER}/{script_name}")
+def load_sql(script_name: str, generation: int = None) -> tuple:
+    """
+    Load a SQL script from GCS, through the in-memory cache.
+
+    Without a generation, one metadata request finds the current version,
+    and the script is downloaded only if the cache holds another one. With
+    a generation, that exact version is returned from the cache without
+    any request, or downloaded directly.
+
+    If GCS cannot be reached, the cached copy is used, then the copy
+    bundled in LOCAL_SQL_DIR (reported with generation None).
+
+    Returns:
+        (generation, sql_content)
+    """
+    path = f"{SQL_FOLDER}/{script_name}"
+    cached = _sql_cache.get(script_name)
+    if generation is not None and cached and cached[0] == generation:
+        return cached
+
+    try:
+        bucket = get_storage_client().bucket(SQL_BUCKET)
+        if generation is None:
+            blob = bucket.get_blob(path)
+            if blob is None:
+                raise NotFound(path)
+            if cached and cached[0] == blob.generation:
+                return cached
+        else:
+            blob = bucket.blob(path, generation=generation)
+        sql_content = blob.download_as_text()
+        generation = blob.generation or generation
+    except NotFound:
+        raise FileNotFoundError(f"SQL file not found: gs://{SQL_BUCKET}/{path}")
+    except (GoogleAPIError, TransportError, requests.exceptions.RequestException):
+        if cached:
+            return cached
+        sql_content = bundled_sql(script_name)
+        if sql_content is None:
+            raise
+        return None, sql_content
+
+    with _sql_cache_lock:
+        _sql_cache[script_name] = (generation, sql_content)
+    return generation, sql_content
+
+
+def bundled_sql(script_name: str) -> str:
+    """The copy of a SQL script bundled in LOCAL_SQL_DIR, or None if there is none."""
+    local_path = os.path.join(LOCAL_SQL_DIR, script_name)
+    if not os.path.exists(local_path):
+        return None
+    with open(local_path) as f:
+        return f.read()
 
-    if not blob.exists():
-        raise FileNotFoundError(
-            f"SQL file not found: gs://{SQL_BUCKET}/{SQL_FOLDER}/{script_name}"
+
+def sql_source(generation: int) -> str:
+    """Where load_sql found a script: "gcs", or "bundled" (LOCAL_SQL_DIR)."""
+    return "bundled" if generation is None else "gcs"
+
+
+def sql_source_summary(steps: list) -> dict:
+    """
+    The SQL sources a run's steps used, with a warning when they are mixed.
+
+    A run mixing GCS and bundled scripts may run dependent steps at
+    different versions (the bundled copy is as of the last deploy).
+    """
+    sources = sorted({step["sql_source"] for step in steps if step.get("sql_source")})
+    summary = {"sql_sources": sources}
+    if len(sources) > 1:
+        bundled = [step["script"] for step in steps if step.get("sql_source") == "bundled"]
+        summary["sql_source_warning"] = (
+            "Run mixes SQL from GCS with the copy bundled at deploy time for: "
+            + ", ".join(bundled)
         )
+    return summary
 
-    return blob.download_as_text()
 
+def prefetch_sql(script_names: list) -> dict:
+    """
+    Load several SQL scripts concurrently.
+
+    Returns:
+        dict of script name -> (generation, sql_content), or the exception
+        raised while loading it
+    """
+    def load(script_name):
+        try:
+            return load_sql(script_name)
+        except Exception as e:
+            return e
+
+    if not script_names:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(script_names)) as executor:
+        return dict(zip(script_names, executor.map(load, script_names)))
+
+
+def get_latest_snapshot_date(client: bigquery.Client):
+    """
+    Latest snapshot_release_date in monthly_conflict_snapshots.
+
+    Read from WATERMARK_TABLE through the table data API, which runs no
+    query job. Falls back to querying the snapshot table if the watermark
+    has not been written yet.
+
+    Returns:
+        date, or None if there are no snapshots yet
+    """
+    try:
+        for row in client.list_rows(WATERMARK_TABLE, max_results=1):
+            return row["latest_snapshot_date"]
+    except NotFound:
+        pass
 
-def check_new_data(client: bigquery.Client) -> int:
-    """Check if there are new monthly releases to process."""
     query = """
-    WITH latest_snapshot AS (
-      SELECT MAX(snapshot_release_date) AS latest_snapshot_date
-      FROM `clinvar_ingest.monthly_conflict_snapshots`
-    ),
-    new_months AS (
-      SELECT COUNT(DISTINCT DATE_TRUNC(release_date, MONTH)) AS new_month_count
-      FROM `clinvar_ingest.all_schemas`()
-      WHERE release_date >= DATE'2023-01-01'
-        AND DATE_TRUNC(release_date, MONTH) > (
-          SELECT COALESCE(DATE_TRUNC(latest_snapshot_date, MONTH), DATE'2022-12-01')
-          FROM latest_snapshot
-        )
-    )
-    SELECT new_month_count FROM new_months
+    SELECT MAX(snapshot_release_date) AS latest_snapshot_date
+    FROM `clinvar_ingest.monthly_conflict_snapshots`
     """
-    result = client.query(query).result()
+    try:
+        result = client.query(query).result()
+    except NotFound:
+        return None
     for row in result:
-        return row.new_month_count
-    return 0
+        return row.latest_snapshot_date
+    return None
+
+
+def count_release_months_after(client: bigquery.Client, latest_snapshot_date) -> int:
+    """
+    Count the months with a completed ClinVar release after the latest snapshot.
+
+    Uses dataset metadata in place of all_schemas(): release dates come from
+    the dataset names, and a release counts once its scv_summary table
+    exists (post-processing has finished).
+    """
+    after = latest_snapshot_date.replace(day=1) if latest_snapshot_date else None
+    candidates = {}
+    for dataset in client.list_datasets():
+        match = RELEASE_DATASET_PATTERN.match(dataset.dataset_id)
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if month >= FIRST_MONTH and (after is None or month > after):
+            candidates.setdefault(month, []).append(dataset.dataset_id)
+
+    count = 0
+    for dataset_ids in candidates.values():
+        for dataset_id in dataset_ids:
+            try:
+                client.get_table(f"{dataset_id}.scv_summary")
+            except NotFound:
+                continue
+            count += 1
+            break
+    return count
+
+
+def check_new_data(client: bigquery.Client) -> int:
+    """
+    Check if there are new monthly releases to process.
+
+    Results are cached per project for NEW_DATA_CACHE_SECONDS, so frequent
+    check_only polls neither scan all_schemas() nor run any query.
+    """
+    cached = _new_data_cache.get(client.project)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    new_months = count_release_months_after(client, get_latest_snapshot_date(client))
+    _new_data_cache[client.project] = (time.monotonic() + NEW_DATA_CACHE_SECONDS, new_months)
+    return new_months
+
+
+def get_incremental_start(client: bigquery.Client):
+    """
+    First month not yet in monthly_conflict_snapshots, for incremental runs.
 
+    Returns:
+        date of the first day of that month, or None if there are no
+        snapshots yet (a full rebuild is needed)
+    """
+    latest = get_latest_snapshot_date(client)
+    if latest is None:
+        return None
+    if latest.month == 12:
+        return date(latest.year + 1, 1, 1)
+    return date(latest.year, latest.month + 1, 1)
+
+
+def normalize_table_name(name: str) -> str:
+    """Reduce a table reference to dataset.table."""
+    return ".".join(name.split(".")[-2:]).lower()
+
+
+def parse_sql_tables(sql_content: str) -> tuple:
+    """
+    Find the tables a SQL script creates and the tables it reads.
+
+    Returns:
+        (outputs, inputs) as sets of dataset.table names
+    """
+    sql = SQL_COMMENT_PATTERN.sub(" ", sql_content)
+    outputs = {normalize_table_name(t) for t in SQL_CREATE_PATTERN.findall(sql)}
+    references = {normalize_table_name(t) for t in SQL_TABLE_PATTERN.findall(sql)}
+    return outputs, references - outputs
+
+
+def build_dependency_graph(sql_by_script: dict) -> dict:
+    """
+    Derive step dependencies from the tables each script creates and reads.
+
+    A script depends on every other script that creates a table it reads.
+    When two scripts create the same table, the later one in the given
+    order depends on the earlier one.
+
+    Returns:
+        dict of script name -> set of script names it must wait for
 
-def run_sql_script(client: bigquery.Client, sql_content: str, description: str) -> dict:
-    """Execute a SQL script and return timing info."""
-    start_time = datetime.now()
+    Raises:
+        ValueError: if the scripts depend on each other in a cycle
+    """
+    tables = {script: parse_sql_tables(sql) for script, sql in sql_by_script.items()}
+    order = list(tables)
+    graph = {}
+    for index, script in enumerate(order):
+        outputs, inputs = tables[script]
+        graph[script] = set()
+        for other_index, other in enumerate(order):
+            other_outputs = tables[other][0]
+            if other == script:
+                continue
+            if inputs & other_outputs or (index > other_index and outputs & other_outputs):
+                graph[script].add(other)
+
+    cycle = find_cycle(graph)
+    if cycle:
+        raise ValueError(f"Circular dependency between SQL scripts: {' -> '.join(cycle)}")
+    return graph
+
+
+def find_cycle(graph: dict) -> list:
+    """
+    Find a circular dependency in a dependency graph.
+
+    Returns:
+        list of script names around the cycle, the first repeated at the
+        end, or None if there is no cycle
+    """
+    path = []
+    done = set()
 
-    # Execute the SQL
-    job = client.query(sql_content)
-    job.result()  # Wait for completion
+    def visit(script):
+        if script in done:
+            return None
+        if script in path:
+            return path[path.index(script):] + [script]
+        path.append(script)
+        for dependency in sorted(graph[script]):
+            cycle = visit(dependency)
+            if cycle:
+                return cycle
+        path.pop()
+        done.add(script)
+        return None
 
-    end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
+    for script in graph:
+        cycle = visit(script)
+        if cycle:
+            return cycle
+    return None
 
+
+def new_run(scripts_to_run: list, project_id: str, start_month: date = None) -> dict:
+    """
+    Create the state of a pipeline run.
+
+    Loads every script concurrently so the dependency graph can be
+    recorded up front; scripts that cannot be loaded are marked as errors.
+    Their bundled copy (if any) still places them in the graph, so the
+    steps reading their tables are skipped instead of running on stale
+    outputs; without one, every later step waits on them. Each step
+    records the generation of the script it was planned with, so later
+    polls run that same version.
+
+    Args:
+        start_month: First month to rebuild in the month-scoped scripts
+            (incremental run), or None for a full rebuild
+    """
+    run = {
+        "run_id": f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}",
+        "project": project_id,
+        "started_at": datetime.now().isoformat(),
+        "sql_source": f"gs://{SQL_BUCKET}/{SQL_FOLDER}/",
+        "start_month": start_month.isoformat() if start_month else None,
+        "status": "running",
+        "steps": []
+    }
+
+    loaded = prefetch_sql([script_name for script_name, _ in scripts_to_run])
+    sql_by_script = {}
+    for script_name, description in scripts_to_run:
+        step = {"description": description, "script": script_name, "status": "waiting"}
+        if isinstance(loaded[script_name], Exception):
+            step.update(status="error", error=str(loaded[script_name]))
+        else:
+            step["sql_generation"], sql_by_script[script_name] = loaded[script_name]
+            step["sql_source"] = sql_source(step["sql_generation"])
+        run["steps"].append(step)
+
+    # Scripts that failed to load are still graphed, from the bundled copy
+    graph_sql = {
+        step["script"]: sql_by_script.get(step["script"]) or bundled_sql(step["script"])
+        for step in run["steps"]
+    }
+    graph = build_dependency_graph(
+        {script: sql for script, sql in graph_sql.items() if sql is not None}
+    )
+    # Earlier scripts with no SQL at all; what they write is unknown
+    unknown = set()
+    for step in run["steps"]:
+        outputs, inputs = parse_sql_tables(graph_sql[step["script"]] or "")
+        step["outputs"] = sorted(outputs)
+        step["inputs"] = sorted(inputs)
+        step["depends_on"] = sorted(graph.get(step["script"], set()) | unknown)
+        if graph_sql[step["script"]] is None:
+            unknown.add(step["script"])
+    return run
+
+
+def table_modified_times(client: bigquery.Client, tables: list) -> dict:
+    """
+    Look up the last modification time of each table.
+
+    Returns:
+        dict of table -> datetime, or None for references that are not
+        tables or views (e.g. the all_schemas() table function)
+    """
+    modified = {}
+    for table in tables:
+        try:
+            modified[table] = client.get_table(table).modified
+        except NotFound:
+            modified[table] = None
+    return modified
+
+
+def outputs_are_current(client: bigquery.Client, step: dict) -> bool:
+    """True if every table a step creates exists and is newer than its inputs."""
+    modified = table_modified_times(client, step["outputs"] + step["inputs"])
+    outputs = [modified[t] for t in step["outputs"]]
+    if not outputs or None in outputs:
+        return False
+    inputs = [modified[t] for t in step["inputs"] if modified[t] is not None]
+    return not inputs or min(outputs) >= max(inputs)
+
+
+def resume_run(client: bigquery.Client, previous: dict) -> dict:
+    """
+    Start a new run that picks up where a previous run stopped.
+
+    Steps that succeeded in the previous run are reused when their outputs
+    are still newer than their inputs and none of their dependencies have
+    to run again; every other step runs. A retry therefore restarts at the
+    first failed or stale step instead of at 01.
+    """
+    scripts = [(step["script"], step["description"]) for step in previous["steps"]]
+    start_month = previous.get("start_month")
+    run = new_run(
+        scripts, previous["project"],
+        date.fromisoformat(start_month) if start_month else None
+    )
+    run["resumed_from"] = previous["run_id"]
+
+    before = {step["script"]: step for step in previous["steps"]}
+    reusable = {
+        step["script"] for step in run["steps"]
+        if step["status"] == "waiting"
+        and before[step["script"]]["status"] == "success"
+        and outputs_are_current(client, step)
+    }
+    # A step whose dependency runs again has to run again too
+    changed = True
+    while changed:
+        changed = False
+        for step in run["steps"]:
+            if step["script"] in reusable and not reusable.issuperset(step["depends_on"]):
+                reusable.discard(step["script"])
+                changed = True
+
+    for step in run["steps"]:
+        if step["script"] in reusable:
+            old = before[step["script"]]
+            step.update(
+                status="success",
+                reused_from=old.get("reused_from", previous["run_id"]),
+                job_id=old.get("job_id"),
+                outputs_modified=old.get("outputs_modified")
+            )
+    return run
+
+
+def job_id_for_step(run: dict, script_name: str) -> str:
+    """Deterministic BigQuery job ID, so a step is never submitted twice."""
+    stem = re.sub(r"[^\w-]", "_", script_name.rsplit(".", 1)[0])
+    return f"conflict_analytics_{run['run_id']}_{stem}"
+
+
+def prepare_query(run: dict, step: dict, sql_content: str, dry_run: bool = False) -> tuple:
+    """
+    Build the SQL and job config for a step.
+
+    In an incremental run, month-scoped scripts get the run's start_month
+    as the @start_month query parameter; other scripts run unchanged.
+
+    Returns:
+        (sql_content, job_config)
+    """
+    job_config = bigquery.QueryJobConfig(dry_run=dry_run, use_query_cache=not dry_run)
+    if run.get("start_month") and START_MONTH_PATTERN.search(sql_content):
+        sql_content = START_MONTH_PATTERN.sub(
+            "DECLARE start_month DATE DEFAULT @start_month;", sql_content, count=1
+        )
+        job_config.query_parameters = [
+            bigquery.ScalarQueryParameter(
+                "start_month", "DATE", date.fromisoformat(run["start_month"])
+            )
+        ]
+        step["start_month"] = run["start_month"]
+    return sql_content, job_config
+
+
+def submit_step(client: bigquery.Client, run: dict, step: dict, sql_content: str):
+    """Submit a step's query job without waiting for it."""
+    job_id = job_id_for_step(run, step["script"])
+    sql_content, job_config = prepare_query(run, step, sql_content)
+    try:
+        job = client.query(sql_content, job_config=job_config, job_id=job_id)
+    except Conflict:
+        # Already submitted by an earlier poll of the same run
+        job = client.get_job(job_id)
+    step.update(
+        status="running",
+        job_id=job.job_id,
+        job_location=job.location,
+        submitted_at=datetime.now().isoformat()
+    )
+
+
+def job_statistics(job) -> dict:
+    """
+    Cost and performance statistics of a completed query job.
+
+    For a multi-statement script these are the totals over all of its
+    child jobs. The timeline samples the job's progress (work units and
+    cumulative slot time) as it ran.
+    """
+    return {
+        "total_bytes_processed": job.total_bytes_processed,
+        "total_bytes_billed": job.total_bytes_billed,
+        "slot_millis": job.slot_millis,
+        "cache_hit": job.cache_hit,
+        "timeline": [
+            {
+                "elapsed_ms": entry.elapsed_ms,
+                "active_units": entry.active_units,
+                "pending_units": entry.pending_units,
+                "completed_units": entry.completed_units,
+                "slot_millis": entry.slot_millis
+            }
+            for entry in job.timeline or []
+        ]
+    }
+
+
+def total_job_statistics(steps: list) -> dict:
+    """Bytes and slot time summed over the steps that ran in this run."""
     return {
-        "description": description,
-        "duration_seconds": duration,
-        "status": "success"
+        stat: sum(s.get(stat) or 0 for s in steps if "reused_from" not in s)
+        for stat in ("total_bytes_processed", "total_bytes_billed", "slot_millis")
     }
 
 
+def finish_step(step: dict, job) -> None:
+    """Record the outcome and statistics of a completed job on its step."""
+    if job.error_result:
+        step.update(status="error", error=job.error_result.get("message", str(job.error_result)))
+    else:
+        step["status"] = "success"
+    if job.ended and job.created:
+        step["duration_seconds"] = (job.ended - job.created).total_seconds()
+    step.update(job_statistics(job))
+
+
+def record_step_history(client: bigquery.Client, run: dict) -> None:
+    """
+    Append the statistics of a finished run's executed steps to HISTORY_TABLE.
+
+    Steps reused from an earlier run or never submitted have no job of
+    their own and are left out. The rows are appended with a load job,
+    which creates the table on first use; streaming inserts into a table
+    that was just created can be dropped. The job ID is derived from the
+    run ID, so when two polls finish the same run only one load runs.
+    Failures are recorded on the run as history_error rather than failing
+    the pipeline.
+    """
+    if run.get("history_recorded"):
+        return
+    rows = [
+        {
+            "run_id": run["run_id"],
+            "script": step["script"],
+            "status": step["status"],
+            "job_id": step["job_id"],
+            "start_month": step.get("start_month"),
+            "submitted_at": step.get("submitted_at"),
+            "duration_seconds": step.get("duration_seconds"),
+            "total_bytes_processed": step.get("total_bytes_processed"),
+            "total_bytes_billed": step.get("total_bytes_billed"),
+            "slot_millis": step.get("slot_millis"),
+            "cache_hit": step.get("cache_hit"),
+            "timeline": step.get("timeline", [])
+        }
+        for step in run["steps"]
+        if step.get("job_id") and "reused_from" not in step
+    ]
+    try:
+        if rows:
+            job_config = bigquery.LoadJobConfig(
+                schema=HISTORY_SCHEMA,
+                write_disposition=bigquery.WriteDisposition.WRITE_APPEND
+            )
+            try:
+                client.load_table_from_json(
+                    rows, f"{client.project}.{HISTORY_TABLE}", job_config=job_config,
+                    job_id=f"conflict_analytics_{run['run_id']}_history"
+                ).result()
+            except Conflict:
+                # Already loaded by a concurrent poll of the same run
+                pass
+        run["history_recorded"] = True
+    except Exception as e:
+        run["history_error"] = str(e)
+
+
+def estimate_run(client: bigquery.Client, run: dict) -> dict:
+    """
+    Dry-run every step of a run to estimate the bytes it would process.
+
+    Steps that read tables created earlier in the same run are estimated
+    against the tables as they exist now; a step whose tables do not
+    exist yet reports the dry run's error instead of an estimate.
+    """
+    for step in run["steps"]:
+        if step["status"] != "waiting":
+            continue
+        try:
+            sql_content, job_config = prepare_query(
+                run, step, load_sql(step["script"], step.get("sql_generation"))[1],
+                dry_run=True
+            )
+            job = client.query(sql_content, job_config=job_config)
+            step.update(status="estimated", estimated_bytes_processed=job.total_bytes_processed)
+        except Exception as e:
+            step.update(status="error", error=str(e))
+    run["estimated_bytes_processed"] = sum(
+        step.get("estimated_bytes_processed") or 0 for step in run["steps"]
+    )
+    return run
+
+
+def advance_run(client: bigquery.Client, run: dict, sql_by_script: dict = None) -> bool:
+    """
+    Move a run forward without blocking.
+
+    Records jobs that have finished, then submits every waiting step whose
+    dependencies have all succeeded, so independent chains (e.g. 01->02 and
+    04->05) overlap. Steps whose dependencies failed are skipped rather than
+    run against stale inputs.
+
+    Args:
+        sql_by_script: SQL already loaded for the run; other scripts are
+            loaded (from the cache when warm) when their step is submitted.
+
+    Returns:
+        True once every step has finished
+    """
+    sql_by_script = {} if sql_by_script is None else sql_by_script
+    steps = {step["script"]: step for step in run["steps"]}
+
+    for step in steps.values():
+        if step["status"] == "running":
+            job = client.get_job(step["job_id"], location=step.get("job_location"))
+            if job.state == "DONE":
+                finish_step(step, job)
+                if step["status"] == "success":
+                    # Checkpoint: when the step's tables were last written
+                    step["outputs_modified"] = {
+                        table: modified.isoformat() if modified else None
+                        for table, modified in table_modified_times(
+                            client, step["outputs"]
+                        ).items()
+                    }
+
+    finished = {"success", "error", "skipped"}
+    waiting = [step for step in run["steps"] if step["status"] == "waiting"]
+    ready = [
+        step for step in waiting
+        if all(steps[d]["status"] in finished for d in step["depends_on"])
+    ]
+
+    for step in ready:
+        failed = [d for d in step["depends_on"] if steps[d]["status"] != "success"]
+        if failed:
+            step.update(
+                status="skipped",
+                error=f"Depends on failed step(s): {', '.join(failed)}"
+            )
+            continue
+        try:
+            if step["script"] not in sql_by_script:
+                generation, sql_by_script[step["script"]] = load_sql(
+                    step["script"], step.get("sql_generation")
+                )
+                step["sql_source"] = sql_source(generation)
+            submit_step(client, run, step, sql_by_script[step["script"]])
+        except Exception as e:
+            step.update(status="error", error=str(e))
+
+    if all(step["status"] in finished for step in run["steps"]):
+        if run["status"] == "running":
+            failed = any(step["status"] != "success" for step in run["steps"])
+            run["status"] = "partial_failure" if failed else "success"
+            run["completed_at"] = datetime.now().isoformat()
+        return True
+    return False
+
+
+def run_sql_scripts(client: bigquery.Client, run: dict) -> dict:
+    """
+    Execute a run's steps, polling until every step has finished.
+
+    The run state is saved to GCS whenever a step changes status, so a
+    failed or timed-out run can be resumed (see resume_run). If the run
+    loses its lease it is abandoned without submitting further steps.
+    """
+    sql_by_script = {}
+    saved = None
+    while True:
+        done = advance_run(client, run, sql_by_script)
+        statuses = [step["status"] for step in run["steps"]]
+        if statuses != saved:
+            save_run_state(run)
+            saved = statuses
+        if done:
+            finish_run(client, run)
+            save_run_state(run)
+            return run
+        if time.time() > run.get("lease_expires_at", float("inf")) - LEASE_SECONDS / 2:
+            if not renew_lease(run):
+                stop_run(run, "abandoned", LEASE_LOST)
+                save_run_state(run)
+                return run
+        time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def stop_run(run: dict, status: str, error: str) -> None:
+    """End a run early (abandoned or expired); its waiting steps are never submitted."""
+    for step in run["steps"]:
+        if step["status"] == "waiting":
+            step.update(status="skipped", error=f"Run {status} before this step started")
+    run["status"] = status
+    run["error"] = error
+    run["completed_at"] = datetime.now().isoformat()
+
+
+def jobs_in_flight(client: bigquery.Client, run_id: str) -> bool:
+    """True if a run's submitted BigQuery jobs have not all finished."""
+    run = load_run_state(run_id)
+    if run is None or run["status"] != "running":
+        return False
+    return any(
+        client.get_job(step["job_id"], location=step.get("job_location")).state != "DONE"
+        for step in run["steps"]
+        if step["status"] == "running"
+    )
+
+
+def finish_run(client: bigquery.Client, run: dict) -> None:
+    """Record a finished run's history and let the next run start."""
+    # The run may have moved the watermark
+    _new_data_cache.pop(run["project"], None)
+    record_step_history(client, run)
+    release_lease(run)
+
+
+def lease_blob(project_id: str, mode: str):
+    """GCS blob holding the lease of a project and pipeline mode."""
+    if not re.fullmatch(r"[\w-]+", f"{project_id}_{mode}"):
+        raise ValueError(f"Invalid lease: {project_id}_{mode}")
+    bucket = get_storage_client().bucket(SQL_BUCKET)
+    return bucket.blob(f"{LEASES_FOLDER}/{project_id}_{mode}.json")
+
+
+def write_lease(blob, run: dict, generation: int) -> None:
+    """Write a run's lease, only if the blob is still at the given generation."""
+    expires_at = time.time() + LEASE_SECONDS
+    blob.upload_from_string(
+        json.dumps({"run_id": run["run_id"], "expires_at": expires_at}),
+        content_type="application/json",
+        if_generation_match=generation
+    )
+    run["lease_expires_at"] = expires_at
+
+
+def read_lease(blob) -> tuple:
+    """
+    Read a lease.
+
+    Returns:
+        (lease, generation), or (None, 0) if there is no lease
+    """
+    try:
+        blob.reload()
+        return json.loads(blob.download_as_text(if_generation_match=blob.generation)), \
+            blob.generation
+    except (NotFound, PreconditionFailed):
+        # Missing, or replaced between the two requests; either way the
+        # caller's conditional write decides
+        return None, 0
+
+
+def acquire_lease(run: dict, mode: str, client: bigquery.Client = None) -> str:
+    """
+    Take the lease of the run's project and mode (single flight).
+
+    Creation and takeover are conditional on the blob's generation, so of
+    several concurrent callers exactly one wins. A lease that has not been
+    renewed within LEASE_SECONDS (its instance died, or an async run was
+    not polled) is taken over, unless the holder's BigQuery jobs are still
+    running (checked when a client is given).
+
+    Returns:
+        None if the lease was acquired, else the run_id of the run holding it
+    """
+    blob = lease_blob(run["project"], mode)
+    while True:
+        lease, generation = read_lease(blob)
+        if lease and lease["run_id"] != run["run_id"] and (
+            lease["expires_at"] > time.time()
+            or (client is not None and jobs_in_flight(client, lease["run_id"]))
+        ):
+            return lease["run_id"]
+        try:
+            write_lease(blob, run, generation)
+        except PreconditionFailed:
+            continue
+        run["lease"] = mode
+        return None
+
+
+def renew_lease(run: dict) -> bool:
+    """
+    Extend a run's lease.
+
+    Returns:
+        False if the run no longer holds it (it expired and was taken over)
+    """
+    if not run.get("lease"):
+        return False
+    blob = lease_blob(run["project"], run["lease"])
+    lease, generation = read_lease(blob)
+    if not lease or lease["run_id"] != run["run_id"]:
+        run["lease"] = None
+        return False
+    try:
+        write_lease(blob, run, generation)
+    except PreconditionFailed:
+        # Another poll of the same run renewed it first
+        pass
+    return True
+
+
+def release_lease(run: dict) -> None:
+    """Delete a run's lease if the run still holds it."""
+    if not run.get("lease"):
+        return
+    blob = lease_blob(run["project"], run["lease"])
+    lease, generation = read_lease(blob)
+    if lease and lease["run_id"] == run["run_id"]:
+        try:
+            blob.delete(if_generation_match=generation)
+        except (NotFound, PreconditionFailed):
+            pass
+    run["lease"] = None
+
+
+def run_state_blob(run_id: str):
+    """GCS blob holding the state of an asynchronous run."""
+    if not re.fullmatch(r"[\w-]+", run_id):
+        raise ValueError(f"Invalid run_id: {run_id}")
+    bucket = get_storage_client().bucket(SQL_BUCKET)
+    return bucket.blob(f"{RUNS_FOLDER}/{run_id}.json")
+
+
+def save_run_state(run: dict) -> None:
+    """Persist a run's state to GCS."""
+    run_state_blob(run["run_id"]).upload_from_string(
+        json.dumps(run, indent=2), content_type="application/json"
+    )
+
+
+def load_run_state(run_id: str) -> dict:
+    """Load a run's state from GCS, or None if there is no such run."""
+    try:
+        return json.loads(run_state_blob(run_id).download_as_text())
+    except NotFound:
+        return None
+
+
+def latest_run_id() -> str:
+    """ID of the most recently started run, or None if there are none."""
+    blobs = get_storage_client().list_blobs(SQL_BUCKET, prefix=f"{RUNS_FOLDER}/")
+    names = [blob.name for blob in blobs if blob.name.endswith(".json")]
+    if not names:
+        return None
+    # Run IDs start with their start time, so they sort chronologically
+    return max(names).rsplit("/", 1)[-1][: -len(".json")]
+
+
+def advance_async_run(run: dict) -> None:
+    """
+    Advance a running asynchronous run once and save its state.
+
+    The run's lease is renewed before anything is submitted; a run whose
+    lease was taken over by another run is marked abandoned instead. A run
+    still going RUN_TIMEOUT_SECONDS after it started, async or not (e.g. a
+    synchronous run killed by the function timeout), is marked expired and
+    releases its lease. A synchronous run is otherwise left to the request
+    running it.
+    """
+    if run["status"] != "running":
+        return
+    age = (datetime.now() - datetime.fromisoformat(run["started_at"])).total_seconds()
+    if age > RUN_TIMEOUT_SECONDS:
+        stop_run(run, "expired", f"Not finished within {RUN_TIMEOUT_SECONDS} seconds")
+        release_lease(run)
+    elif not run.get("async"):
+        return
+    elif renew_lease(run):
+        client = bigquery.Client(project=run["project"])
+        if advance_run(client, run):
+            finish_run(client, run)
+    else:
+        stop_run(run, "abandoned", LEASE_LOST)
+    save_run_state(run)
+
+
+def advance_leased_runs() -> list:
+    """
+    Advance every asynchronous run that holds a lease, and expire stale ones.
+
+    Called on a schedule (advance=true), so async runs move forward even
+    when nobody polls them, and a synchronous run whose request died is
+    expired once it is RUN_TIMEOUT_SECONDS old (see advance_async_run).
+
+    Returns:
+        list of the advanced runs' summaries
+    """
+    summaries = []
+    for blob in get_storage_client().list_blobs(SQL_BUCKET, prefix=f"{LEASES_FOLDER}/"):
+        lease, _ = read_lease(blob)
+        run = load_run_state(lease["run_id"]) if lease else None
+        if run is None or run["status"] != "running":
+            continue
+        advance_async_run(run)
+        summaries.append(summarize_run(run))
+    return summaries
+
+
+def poll_run(run_id: str):
+    """Advance an asynchronous run and report per-step progress."""
+    run = load_run_state(run_id)
+    if run is None:
+        return jsonify({"status": "error", "error": f"Unknown run_id: {run_id}"}), 404
+
+    advance_async_run(run)
+    return jsonify(summarize_run(run))
+
+
+def summarize_run(run: dict) -> dict:
+    """Add step counts and total duration to a run for the HTTP response."""
+    counts = {}
+    for step in run["steps"]:
+        counts[step["status"]] = counts.get(step["status"], 0) + 1
+    summary = dict(run, step_counts=counts)
+    summary["total_duration_seconds"] = sum(
+        s.get("duration_seconds", 0)
+        for s in run["steps"]
+        if s.get("status") == "success"
+    )
+    summary.update(total_job_statistics(run["steps"]))
+    summary.update(sql_source_summary(run["steps"]))
+    return summary
+
+
 @functions_framework.http
 def run_analytics_pipeline(request):
     """
@@ -128,18 +1072,51 @@ def run_analytics_pipeline(request):
         check_only (bool): Only check if rebuild is needed (default: false)
         project (str): GCP project ID (default: clingen-dev)
         views_only (bool): Only run the views script (07-google-sheets-analytics.sql)
+        async (bool): Submit the jobs and return a run_id without waiting
+        run_id (str): Report (and advance) the progress of an async run
+        advance (bool): Advance every async run holding a lease (for a
+            Cloud Scheduler job)
+        resume (str): Retry a previous run ("true" for the latest, or a run_id),
+            reusing the steps whose outputs are still current
+        incremental (bool): Rebuild only the months after the latest snapshot
+            in the monthly snapshot and change tables
+        dry_run (bool): Estimate the bytes each script would process
+            without running anything
 
     Returns:
         JSON response with execution status and timing
     """
     try:
+        # Poll an asynchronous run
+        run_id = request.args.get("run_id")
+        if run_id:
+            return poll_run(run_id)
+
+        # Scheduled advance of the in-flight async runs
+        if request.args.get("advance", "false").lower() == "true":
+            return jsonify({"status": "success", "runs": advance_leased_runs()})
+
         # Parse parameters
         force = request.args.get("force", "false").lower() == "true"
         skip_check = request.args.get("skip_check", "false").lower() == "true"
         check_only = request.args.get("check_only", "false").lower() == "true"
         views_only = request.args.get("views_only", "false").lower() == "true"
+        async_mode = request.args.get("async", "false").lower() == "true"
+        incremental = request.args.get("incremental", "false").lower() == "true"
+        dry_run = request.args.get("dry_run", "false").lower() == "true"
         project_id = request.args.get("project", DEFAULT_PROJECT)
 
+        # A resumed run repeats a previous run's steps, so skip the data check
+        resume = request.args.get("resume", "")
+        previous = None
+        if resume:
+            previous_id = latest_run_id() if resume.lower() == "true" else resume
+            previous = load_run_state(previous_id) if previous_id else None
+            if previous is None:
+                return jsonify({"status": "error", "error": f"No run to resume: {resume}"}), 404
+            project_id = previous["project"]
+            skip_check = True
+
         # Initialize BigQuery client
         client = bigquery.Client(project=project_id)
 
@@ -152,7 +1129,7 @@ def run_analytics_pipeline(request):
         }
 
         # Check for new data unless skipped or forced
-        if not skip_check and not force and not views_only:
+        if not skip_check and not force and not views_only and not dry_run:
             new_months = check_new_data(client)
             results["new_months_found"] = new_months
 
@@ -179,31 +1156,62 @@ def run_analytics_pipeline(request):
         else:
             scripts_to_run = SQL_SCRIPTS
 
-        # Load and execute SQL scripts from GCS
-        for script_name, description in scripts_to_run:
-            try:
-                sql_content = load_sql_from_gcs(script_name)
-                step_result = run_sql_script(client, sql_content, description)
-                step_result["script"] = script_name
-                results["steps"].append(step_result)
-            except FileNotFoundError as e:
-                results["steps"].append({
-                    "description": description,
-                    "script": script_name,
-                    "status": "error",
-                    "error": str(e)
-                })
-                results["status"] = "partial_failure"
-            except Exception as e:
-                results["steps"].append({
-                    "description": description,
-                    "script": script_name,
-                    "status": "error",
-                    "error": str(e)
-                })
-                results["status"] = "partial_failure"
+        # Load SQL scripts from GCS and execute them in dependency order
+        pipeline_start = time.monotonic()
+        if previous:
+            run = resume_run(client, previous)
+            results["resumed_from"] = previous["run_id"]
+        else:
+            start_month = get_incremental_start(client) if incremental else None
+            run = new_run(scripts_to_run, project_id, start_month)
+        results["run_id"] = run["run_id"]
+        results["start_month"] = run["start_month"]
+
+        if dry_run:
+            estimate_run(client, run)
+            results["status"] = "dry_run"
+            results["steps"] = run["steps"]
+            results["estimated_bytes_processed"] = run["estimated_bytes_processed"]
+            return jsonify(results)
+
+        # Only one run per project and mode at a time; others attach to it
+        mode = "views" if views_only else "full"
+        holder = acquire_lease(run, mode, client)
+        if holder:
+            in_flight = load_run_state(holder)
+            if in_flight:
+                results.update(summarize_run(in_flight))
+            else:
+                results.update(run_id=holder, status="running", steps=[])
+            results["attached"] = True
+            results["poll_url"] = f"{request.base_url}?run_id={holder}"
+            return jsonify(results), 202
+
+        if async_mode:
+            # Submit the first jobs; each poll of run_id (or scheduled
+            # advance) submits the next ones
+            run["async"] = True
+            if advance_run(client, run):
+                finish_run(client, run)
+            save_run_state(run)
+            results["status"] = run["status"]
+            results["steps"] = run["steps"]
+            results.update(sql_source_summary(run["steps"]))
+            results["poll_url"] = f"{request.base_url}?run_id={run['run_id']}"
+            return jsonify(results), 202
+
+        try:
+            run_sql_scripts(client, run)
+        finally:
+            release_lease(run)
+        results["steps"] = run["steps"]
+        results["status"] = run["status"]
+        results.update(sql_source_summary(run["steps"]))
+        if run.get("history_error"):
+            results["history_error"] = run["history_error"]
 
         results["completed_at"] = datetime.now().isoformat()
+        results["wall_clock_seconds"] = time.monotonic() - pipeline_start
 
         # Calculate total duration
         if results["steps"]:
@@ -213,6 +1221,7 @@ def run_analytics_pipeline(request):
                 if s.get("status") == "success"
             )
             results["total_duration_seconds"] = total_duration
+            results.update(total_job_statistics(results["steps"]))
 
         return jsonify(results)
 
@@ -0,0 +1,145 @@
+"""
+Benchmark the orchestration overhead of run_analytics_pipeline offline.
+
+Drives the Cloud Function through each parameter mode against the fakes in
+fakes.py, so no BigQuery or GCS access is needed. Every job takes the
+given latency (plus optional jitter), so the time beyond the critical path
+of job latencies is the orchestration overhead. The scheduling delay of a
+step is the time from its last dependency finishing (or the run starting)
+to its job being submitted.
+
+Usage:
+    python tests/benchmark_pipeline.py [--latency 0.2] [--jitter 0.0] \\
+        [--fail 02-monthly-conflict-changes] [--repeat 3] [--modes force,views_only]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+import flask
+
+sys.path.insert(0, os.path.dirname(__file__))
+import fakes  # noqa: E402
+from fakes import main  # noqa: E402
+
+MODES = {
+    "check_only": "check_only=true",
+    "force": "force=true",
+    "skip_check": "skip_check=true",
+    "views_only": "views_only=true",
+    "incremental": "force=true&incremental=true",
+    "async": "async=true&force=true",
+}
+
+
+def critical_path(steps, latency):
+    """Longest chain of job latencies through the steps' dependencies."""
+    finish = {}
+    for step in steps:
+        if step["status"] not in ("success", "error"):
+            continue
+        ready = max((finish.get(d, 0.0) for d in step["depends_on"]), default=0.0)
+        finish[step["script"]] = ready + latency
+    return max(finish.values(), default=0.0)
+
+
+def scheduling_delays(bigquery, steps, started):
+    """Seconds between each step becoming ready and its job being submitted."""
+    finished_at = {}
+    delays = []
+    for step in steps:
+        job = bigquery.jobs.get(step.get("job_id"))
+        if job is None:
+            continue
+        ready = max(
+            (finished_at[d] for d in step["depends_on"] if d in finished_at),
+            default=started,
+        )
+        delays.append(max(job.started_at - ready, 0.0))
+        finished_at[step["script"]] = job.started_at + job.latency
+    return delays
+
+
+def run_mode(app, mode, args, storage=None):
+    """Run one mode against fresh (or the given warm) fakes."""
+    if storage is None:
+        storage = fakes.FakeStorageClient()
+        storage.add_sql_scripts()
+    bigquery = fakes.FakeBigQueryClient(
+        latency=args.latency,
+        jitter=args.jitter,
+        fail=set(args.fail),
+        latest_snapshot=date(2025, 3, 2),
+        releases=[date(2025, 3, 2), date(2025, 4, 6)],
+    )
+    restore = fakes.install(bigquery, storage)
+    # install() clears the warm caches; keep them for warm runs
+    main._sql_cache.update(getattr(storage, "sql_cache", {}))
+    downloads = len(storage.downloads)
+    try:
+        started = time.monotonic()
+        with app.test_request_context(f"/?{MODES[mode]}"):
+            response = main.run_analytics_pipeline(flask.request)
+            body = (response[0] if isinstance(response, tuple) else response).get_json()
+            # Async runs: poll like Apps Script would until the run finishes
+            while body["status"] == "running" and body.get("run_id"):
+                time.sleep(main.POLL_INTERVAL_SECONDS)
+                body = main.poll_run(body["run_id"]).get_json()
+        elapsed = time.monotonic() - started
+        storage.sql_cache = dict(main._sql_cache)
+    finally:
+        restore()
+
+    steps = body.get("steps", [])
+    return {
+        "status": body["status"],
+        "seconds": elapsed,
+        "critical_path": critical_path(steps, args.latency),
+        "delays": scheduling_delays(bigquery, steps, started),
+        "jobs": len(bigquery.jobs),
+        "api_calls": len(bigquery.calls),
+        "sql_downloads": sum(
+            name.startswith(main.SQL_FOLDER) for name in storage.downloads[downloads:]
+        ),
+    }, storage
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per job")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra seconds")
+    parser.add_argument("--fail", action="append", default=[], help="Script stem to fail")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+
+    app = flask.Flask(__name__)
+    print(
+        f"{'mode':<18} {'status':<16} {'wall':>7} {'critical':>8} {'overhead':>8} "
+        f"{'max delay':>9} {'jobs':>4} {'bq calls':>8} {'sql dl':>6}"
+    )
+    for mode in args.modes.split(","):
+        storage = None
+        for repeat in range(args.repeat):
+            # The first repeat starts cold, later ones reuse the warm SQL cache
+            result, storage = run_mode(app, mode, args, storage)
+            label = f"{mode}{'' if repeat else ' (cold)'}"
+            delay = max(result["delays"], default=0.0)
+            print(
+                f"{label:<18} {result['status']:<16} {result['seconds']:>6.3f}s "
+                f"{result['critical_path']:>7.3f}s "
+                f"{result['seconds'] - result['critical_path']:>7.3f}s "
+                f"{delay * 1000:>7.1f}ms {result['jobs']:>4} {result['api_calls']:>8} "
+                f"{result['sql_downloads']:>6}"
+            )
+        if result["delays"]:
+            mean_delay = statistics.mean(result["delays"]) * 1000
+            print(f"{'':<18} mean scheduling delay {mean_delay:.1f}ms")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,280 @@
+"""
+In-memory stand-ins for the BigQuery and GCS clients used by main.py.
+
+FakeBigQueryClient runs no SQL. Each submitted job finishes after a
+configurable latency and can be made to fail, and finished jobs mark the
+tables their script creates as modified. FakeStorageClient keeps objects
+in memory with generations and honours if_generation_match, which the
+lease and SQL cache logic rely on.
+
+install() points main.py at a pair of fakes loaded with the SQL scripts
+from scripts/conflict-resolution-analysis.
+"""
+
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import main  # noqa: E402
+from google.api_core.exceptions import (  # noqa: E402
+    Conflict,
+    NotFound,
+    PreconditionFailed,
+)
+
+SQL_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "..", "scripts", "conflict-resolution-analysis"
+)
+
+
+class FakeQueryJob:
+    """A query job that is DONE once its latency has elapsed."""
+
+    def __init__(self, client, job_id, outputs, latency, error=None, bytes_processed=0):
+        self.client = client
+        self.job_id = job_id
+        self.location = "US"
+        self.outputs = outputs
+        self.latency = latency
+        self.error = error
+        self.created = datetime.now(timezone.utc)
+        self.started_at = time.monotonic()
+        self.ended = None
+        self.error_result = None
+        self.total_bytes_processed = bytes_processed
+        self.total_bytes_billed = bytes_processed
+        self.slot_millis = int(latency * 1000)
+        self.cache_hit = False
+        self.timeline = []
+
+    @property
+    def state(self):
+        if self.ended is None and time.monotonic() - self.started_at >= self.latency:
+            self.ended = self.created + timedelta(seconds=self.latency)
+            if self.error:
+                self.error_result = {"reason": "invalidQuery", "message": self.error}
+            else:
+                self.client.touch(self.outputs)
+        return "DONE" if self.ended else "RUNNING"
+
+    def result(self):
+        while self.state != "DONE":
+            time.sleep(0.001)
+        return []
+
+
+class FakeBigQueryClient:
+    """
+    BigQuery client stand-in.
+
+    Args:
+        latency (float or dict): Seconds each script's job takes, or a dict
+            of script stem (e.g. "02-monthly-conflict-changes") -> seconds
+        jitter (float): Random extra seconds added to each job
+        fail (set): Script stems whose jobs end with an error
+        latest_snapshot (date): Watermark date, or None for no snapshots
+        releases (list): Release dates with a completed ClinVar dataset
+    """
+
+    def __init__(self, project=main.DEFAULT_PROJECT, latency=0.0, jitter=0.0, fail=(),
+                 latest_snapshot=None, releases=()):
+        self.project = project
+        self.latency = latency
+        self.jitter = jitter
+        self.fail = set(fail)
+        self.latest_snapshot = latest_snapshot
+        self.releases = list(releases)
+        self.jobs = {}
+        self.submitted = []
+        self.tables = {}
+        self.history = []
+        self.history_loads = []
+        self.load_job_ids = set()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def touch(self, tables):
+        with self._lock:
+            for table in tables:
+                self.tables[table] = datetime.now(timezone.utc)
+
+    def job_latency(self, stem):
+        latency = self.latency.get(stem, 0.0) if isinstance(self.latency, dict) else self.latency
+        return latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def query(self, sql, job_config=None, job_id=None):
+        self.calls.append("query")
+        if job_config is not None and job_config.dry_run:
+            return SimpleNamespace(total_bytes_processed=len(sql))
+        if job_id is None:
+            # Ad hoc query (the snapshot fallback of the new-data check)
+            if "monthly_conflict_snapshots" not in self.tables:
+                raise NotFound("monthly_conflict_snapshots")
+            row = SimpleNamespace(latest_snapshot_date=self.latest_snapshot)
+            return SimpleNamespace(result=lambda: [row])
+        with self._lock:
+            if job_id in self.jobs:
+                raise Conflict(f"Already Exists: Job {job_id}")
+            stem = re.sub(r"^conflict_analytics_\d{8}_\d{6}_[0-9a-f]{8}_", "", job_id)
+            outputs, _ = main.parse_sql_tables(sql)
+            job = FakeQueryJob(
+                self, job_id, outputs, self.job_latency(stem),
+                error=f"{stem} failed" if stem in self.fail else None,
+                bytes_processed=len(sql)
+            )
+            job.query_parameters = list(job_config.query_parameters) if job_config else []
+            self.jobs[job_id] = job
+            self.submitted.append((time.monotonic(), stem))
+        return job
+
+    def get_job(self, job_id, location=None):
+        return self.jobs[job_id]
+
+    def get_table(self, table):
+        self.calls.append("get_table")
+        if table.endswith(".scv_summary"):
+            if not any(table.startswith(f"clinvar_{r:%Y_%m_%d}_") for r in self.releases):
+                raise NotFound(table)
+            return SimpleNamespace(modified=None)
+        if table not in self.tables:
+            raise NotFound(table)
+        return SimpleNamespace(modified=self.tables[table])
+
+    def list_rows(self, table, max_results=None):
+        self.calls.append("list_rows")
+        if self.latest_snapshot is None:
+            raise NotFound(table)
+        return [{"latest_snapshot_date": self.latest_snapshot}]
+
+    def list_datasets(self):
+        self.calls.append("list_datasets")
+        return [
+            SimpleNamespace(dataset_id=f"clinvar_{r:%Y_%m_%d}_v2_3_1") for r in self.releases
+        ] + [SimpleNamespace(dataset_id="clinvar_ingest")]
+
+    def load_table_from_json(self, rows, destination, job_config=None, job_id=None):
+        self.calls.append("load_table_from_json")
+        with self._lock:
+            if job_id is not None:
+                if job_id in self.load_job_ids:
+                    raise Conflict(f"Already Exists: Job {job_id}")
+                self.load_job_ids.add(job_id)
+            self.history_loads.append((destination, job_config))
+            self.history.extend(rows)
+        return SimpleNamespace(result=lambda: None)
+
+
+class FakeBlob:
+    def __init__(self, store, name, generation=None):
+        self.store = store
+        self.name = name
+        self.generation = generation
+
+    def _check(self, if_generation_match):
+        current = self.store.objects.get(self.name, (0, None))[0]
+        if if_generation_match is not None and current != if_generation_match:
+            raise PreconditionFailed(f"{self.name}: generation {current}")
+
+    def reload(self):
+        if self.name not in self.store.objects:
+            raise NotFound(self.name)
+        self.generation = self.store.objects[self.name][0]
+
+    def download_as_text(self, if_generation_match=None):
+        with self.store.lock:
+            self.store.downloads.append(self.name)
+            if self.name not in self.store.objects:
+                raise NotFound(self.name)
+            self._check(if_generation_match)
+            generation, data = self.store.objects[self.name]
+            if self.generation is None:
+                self.generation = generation
+            return data
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        with self.store.lock:
+            self._check(if_generation_match)
+            self.store.generation += 1
+            self.store.objects[self.name] = (self.store.generation, data)
+            self.generation = self.store.generation
+
+    def delete(self, if_generation_match=None):
+        with self.store.lock:
+            if self.name not in self.store.objects:
+                raise NotFound(self.name)
+            self._check(if_generation_match)
+            del self.store.objects[self.name]
+
+
+class FakeBucket:
+    def __init__(self, store):
+        self.store = store
+
+    def blob(self, name, generation=None):
+        return FakeBlob(self.store, name, generation)
+
+    def get_blob(self, name):
+        self.store.metadata_requests += 1
+        if name not in self.store.objects:
+            return None
+        return FakeBlob(self.store, name, self.store.objects[name][0])
+
+
+class FakeStorageClient:
+    """GCS client stand-in holding every object of every bucket in one dict."""
+
+    def __init__(self):
+        self.objects = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.downloads = []
+        self.metadata_requests = 0
+
+    def bucket(self, name):
+        return FakeBucket(self)
+
+    def list_blobs(self, bucket, prefix=""):
+        return [FakeBlob(self, name) for name in sorted(self.objects) if name.startswith(prefix)]
+
+    def add_sql_scripts(self, sql_dir=SQL_DIR):
+        for script_name, _ in main.SQL_SCRIPTS:
+            with open(os.path.join(sql_dir, script_name)) as f:
+                self.bucket(main.SQL_BUCKET).blob(
+                    f"{main.SQL_FOLDER}/{script_name}"
+                ).upload_from_string(f.read())
+
+
+def install(bigquery_client, storage_client=None):
+    """
+    Point main.py at the given fakes and clear its warm-instance caches.
+
+    Returns:
+        a function that restores the real clients
+    """
+    if storage_client is None:
+        storage_client = FakeStorageClient()
+        storage_client.add_sql_scripts()
+    patchers = [
+        mock.patch.object(main.bigquery, "Client", return_value=bigquery_client),
+        mock.patch.object(main, "_storage_client", storage_client),
+        mock.patch.object(main, "POLL_INTERVAL_SECONDS", 0.001),
+    ]
+    for patcher in patchers:
+        patcher.start()
+    main._sql_cache.clear()
+    main._new_data_cache.clear()
+
+    def restore():
+        for patcher in reversed(patchers):
+            patcher.stop()
+        main._sql_cache.clear()
+        main._new_data_cache.clear()
+
+    return restore
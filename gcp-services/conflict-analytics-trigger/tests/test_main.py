@@ -0,0 +1,413 @@
+import json
+import unittest
+import sys
+import os
+from datetime import date
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+# main.py needs functions-framework and the Google Cloud client libraries
+try:
+    import flask
+    from google.api_core.exceptions import ServiceUnavailable
+    import fakes  # noqa: E402
+    from fakes import main  # noqa: E402
+
+    MAIN_AVAILABLE = True
+except ImportError:
+    MAIN_AVAILABLE = False
+
+ALL_STEPS = [script for script, _ in main.SQL_SCRIPTS] if MAIN_AVAILABLE else []
+
+
+@unittest.skipUnless(MAIN_AVAILABLE, "main.py dependencies not installed")
+class PipelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = flask.Flask(__name__)
+        self.storage = fakes.FakeStorageClient()
+        self.storage.add_sql_scripts()
+
+    def use_bigquery(self, **kwargs):
+        self.bigquery = fakes.FakeBigQueryClient(**kwargs)
+        self.addCleanup(fakes.install(self.bigquery, self.storage))
+        return self.bigquery
+
+    def call(self, query=""):
+        """Invoke run_analytics_pipeline, returning (status code, JSON body)."""
+        with self.app.test_request_context(f"/?{query}"):
+            response = main.run_analytics_pipeline(flask.request)
+        if isinstance(response, tuple):
+            response, status = response
+        else:
+            status = response.status_code
+        return status, response.get_json()
+
+    def statuses(self, body):
+        return {step["script"]: step["status"] for step in body["steps"]}
+
+
+class TestNewDataCheck(PipelineTestCase):
+    def test_check_only_without_new_data(self):
+        self.use_bigquery(
+            latest_snapshot=date(2025, 3, 2), releases=[date(2025, 3, 2), date(2025, 3, 16)]
+        )
+        status, body = self.call("check_only=true")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["status"], "skipped")
+        self.assertFalse(body["rebuild_needed"])
+        self.assertEqual(self.bigquery.jobs, {})
+
+    def test_check_only_counts_completed_months_and_caches(self):
+        bigquery = self.use_bigquery(
+            latest_snapshot=date(2025, 3, 2),
+            releases=[date(2025, 3, 2), date(2025, 4, 6), date(2025, 5, 4)],
+        )
+        _, body = self.call("check_only=true")
+        calls = len(bigquery.calls)
+        _, again = self.call("check_only=true")
+
+        self.assertTrue(body["rebuild_needed"])
+        self.assertEqual(body["new_months_found"], 2)
+        self.assertEqual(again["new_months_found"], 2)
+        self.assertEqual(len(bigquery.calls), calls)
+        self.assertNotIn("query", bigquery.calls)
+
+    def test_dry_run_estimates_every_script(self):
+        self.use_bigquery()
+        _, body = self.call("dry_run=true")
+
+        self.assertEqual(body["status"], "dry_run")
+        self.assertEqual(set(self.statuses(body).values()), {"estimated"})
+        self.assertGreater(body["estimated_bytes_processed"], 0)
+        self.assertEqual(self.bigquery.jobs, {})
+
+
+class TestPipelineRuns(PipelineTestCase):
+    def test_force_runs_independent_chains_concurrently(self):
+        bigquery = self.use_bigquery(latency=0.02)
+        status, body = self.call("force=true")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["status"], "success")
+        self.assertEqual(self.statuses(body), {script: "success" for script in ALL_STEPS})
+        # 04 does not wait for 01, so both are submitted before anything else
+        first_wave = {stem for _, stem in bigquery.submitted[:2]}
+        self.assertEqual(
+            first_wave, {"01-get-monthly-conflicts", "04-monthly-conflict-scv-snapshots"}
+        )
+        self.assertEqual(len(bigquery.history), len(ALL_STEPS))
+
+    def test_step_history_is_appended_with_a_load_job(self):
+        bigquery = self.use_bigquery()
+        self.call("views_only=true")
+
+        destination, job_config = bigquery.history_loads[0]
+        self.assertEqual(destination, f"{main.DEFAULT_PROJECT}.{main.HISTORY_TABLE}")
+        self.assertEqual(job_config.write_disposition, "WRITE_APPEND")
+        self.assertEqual(job_config.schema, main.HISTORY_SCHEMA)
+        self.assertEqual(bigquery.history[0]["script"], "07-google-sheets-analytics.sql")
+
+    def test_concurrent_finishes_record_history_once(self):
+        bigquery = self.use_bigquery()
+        _, body = self.call("views_only=true")
+        # Two polls that both finished the run before either saved it
+        run = {key: value for key, value in body.items() if key != "history_recorded"}
+
+        for copy in (dict(run), dict(run)):
+            main.record_step_history(bigquery, copy)
+            self.assertTrue(copy["history_recorded"])
+
+        self.assertEqual(len(bigquery.history_loads), 1)
+        self.assertEqual(len(bigquery.history), 1)
+
+    def test_skip_check_runs_without_checking(self):
+        bigquery = self.use_bigquery()
+        _, body = self.call("skip_check=true")
+
+        self.assertEqual(body["status"], "success")
+        self.assertNotIn("new_months_found", body)
+        self.assertNotIn("list_datasets", bigquery.calls)
+
+    def test_views_only_runs_only_views(self):
+        self.use_bigquery()
+        _, body = self.call("views_only=true")
+
+        self.assertEqual(self.statuses(body), {"07-google-sheets-analytics.sql": "success"})
+
+    def test_failed_step_skips_its_dependents(self):
+        self.use_bigquery(fail={"02-monthly-conflict-changes"})
+        _, body = self.call("force=true")
+
+        self.assertEqual(body["status"], "partial_failure")
+        statuses = self.statuses(body)
+        self.assertEqual(statuses["02-monthly-conflict-changes.sql"], "error")
+        self.assertEqual(statuses["05-monthly-conflict-scv-changes.sql"], "success")
+        self.assertEqual(statuses["06-resolution-modification-analytics.sql"], "skipped")
+        self.assertEqual(statuses["07-google-sheets-analytics.sql"], "skipped")
+
+    def test_resume_reruns_only_failed_and_dependent_steps(self):
+        bigquery = self.use_bigquery(fail={"02-monthly-conflict-changes"})
+        self.call("force=true")
+        bigquery.fail.clear()
+        submitted = len(bigquery.submitted)
+
+        _, body = self.call("resume=true")
+
+        self.assertEqual(body["status"], "success")
+        rerun = sorted(stem for _, stem in bigquery.submitted[submitted:])
+        self.assertEqual(
+            rerun,
+            [
+                "02-monthly-conflict-changes",
+                "06-resolution-modification-analytics",
+                "07-google-sheets-analytics",
+            ],
+        )
+
+    def test_incremental_passes_start_month(self):
+        bigquery = self.use_bigquery(latest_snapshot=date(2025, 3, 2))
+        _, body = self.call("force=true&incremental=true")
+
+        self.assertEqual(body["start_month"], "2025-04-01")
+        parameters = {
+            job.job_id.rsplit("_", 1)[-1]: job.query_parameters
+            for job in bigquery.jobs.values()
+        }
+        self.assertEqual(parameters["01-get-monthly-conflicts"][0].value, date(2025, 4, 1))
+        self.assertEqual(parameters["07-google-sheets-analytics"], [])
+
+
+class TestDependencyGraph(PipelineTestCase):
+    def test_graph_follows_table_references(self):
+        graph = main.build_dependency_graph({
+            "a.sql": "CREATE TABLE `ds.a` AS SELECT 1",
+            "b.sql": "CREATE TABLE `ds.b` AS SELECT * FROM `ds.a`",
+        })
+
+        self.assertEqual(graph, {"a.sql": set(), "b.sql": {"a.sql"}})
+
+    def test_circular_dependency_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "a.sql -> b.sql -> a.sql"):
+            main.build_dependency_graph({
+                "a.sql": "CREATE TABLE `ds.a` AS SELECT * FROM `ds.b`",
+                "b.sql": "CREATE TABLE `ds.b` AS SELECT * FROM `ds.a`",
+            })
+
+
+    def unload(self, script):
+        del self.storage.objects[f"{main.SQL_FOLDER}/{script}"]
+
+    def test_steps_reading_an_unloadable_script_are_skipped(self):
+        self.use_bigquery()
+        self.unload("04-monthly-conflict-scv-snapshots.sql")
+
+        with mock.patch.object(main, "LOCAL_SQL_DIR", fakes.SQL_DIR):
+            _, body = self.call("force=true")
+
+        statuses = self.statuses(body)
+        self.assertEqual(body["status"], "partial_failure")
+        self.assertEqual(statuses["04-monthly-conflict-scv-snapshots.sql"], "error")
+        self.assertEqual(statuses["05-monthly-conflict-scv-changes.sql"], "skipped")
+        self.assertEqual(statuses["02-monthly-conflict-changes.sql"], "success")
+
+    def test_unloadable_script_without_bundled_copy_blocks_later_steps(self):
+        self.use_bigquery()
+        self.unload("04-monthly-conflict-scv-snapshots.sql")
+
+        with mock.patch.object(main, "LOCAL_SQL_DIR", "/nonexistent"):
+            _, body = self.call("force=true")
+
+        statuses = self.statuses(body)
+        self.assertEqual(statuses["01-get-monthly-conflicts.sql"], "success")
+        self.assertEqual(statuses["02-monthly-conflict-changes.sql"], "success")
+        self.assertEqual(statuses["05-monthly-conflict-scv-changes.sql"], "skipped")
+        self.assertEqual(statuses["07-google-sheets-analytics.sql"], "skipped")
+
+
+class TestAsyncRuns(PipelineTestCase):
+    def test_async_run_polled_to_completion(self):
+        self.use_bigquery()
+        status, body = self.call("async=true&force=true")
+        self.assertEqual(status, 202)
+
+        for _ in range(20):
+            status, progress = self.call(f"run_id={body['run_id']}")
+            if progress["status"] != "running":
+                break
+
+        self.assertEqual(status, 200)
+        self.assertEqual(progress["status"], "success")
+        self.assertEqual(progress["step_counts"], {"success": len(ALL_STEPS)})
+
+    def test_scheduled_advance_completes_unpolled_run(self):
+        self.use_bigquery()
+        _, body = self.call("async=true&force=true")
+
+        for _ in range(20):
+            _, advanced = self.call("advance=true")
+            if not advanced["runs"]:
+                break
+
+        run = main.load_run_state(body["run_id"])
+        self.assertEqual(run["status"], "success")
+        self.assertEqual(advanced["runs"], [])
+
+    def test_stale_run_expires_and_releases_its_lease(self):
+        self.use_bigquery(latency=60)
+        _, body = self.call("async=true&force=true")
+        run = main.load_run_state(body["run_id"])
+        run["started_at"] = "2025-01-01T00:00:00"
+        main.save_run_state(run)
+
+        _, progress = self.call(f"run_id={body['run_id']}")
+
+        self.assertEqual(progress["status"], "expired")
+        self.assertEqual(progress["step_counts"], {"running": 2, "skipped": 4})
+        lease = main.lease_blob(main.DEFAULT_PROJECT, "full")
+        self.assertNotIn(lease.name, self.storage.objects)
+
+    def start_sync_run(self, started_at=None):
+        """Record a synchronous run as its request would, without running it."""
+        run = main.new_run(main.SQL_SCRIPTS, main.DEFAULT_PROJECT)
+        if started_at:
+            run["started_at"] = started_at
+        main.acquire_lease(run, "full")
+        main.save_run_state(run)
+        return run
+
+    def test_polling_a_sync_run_does_not_advance_it(self):
+        bigquery = self.use_bigquery()
+        run = self.start_sync_run()
+        # Even with its lease taken over, only the sync loop may abandon it
+        self.expire_lease("other")
+
+        status, progress = self.call(f"run_id={run['run_id']}")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(progress["status"], "running")
+        self.assertEqual(progress["step_counts"], {"waiting": len(ALL_STEPS)})
+        self.assertEqual(bigquery.jobs, {})
+        self.assertEqual(main.load_run_state(run["run_id"])["status"], "running")
+
+    def test_sync_run_killed_by_timeout_expires(self):
+        self.use_bigquery()
+        run = self.start_sync_run(started_at="2025-01-01T00:00:00")
+
+        _, advanced = self.call("advance=true")
+
+        self.assertEqual([r["run_id"] for r in advanced["runs"]], [run["run_id"]])
+        self.assertEqual(main.load_run_state(run["run_id"])["status"], "expired")
+        self.assertEqual(self.bigquery.jobs, {})
+        lease = main.lease_blob(main.DEFAULT_PROJECT, "full")
+        self.assertNotIn(lease.name, self.storage.objects)
+
+    def test_unknown_run_id(self):
+        self.use_bigquery()
+        status, _ = self.call("run_id=20250101_000000_deadbeef")
+
+        self.assertEqual(status, 404)
+
+    def test_overlapping_run_attaches_to_in_flight_run(self):
+        bigquery = self.use_bigquery(latency=60)
+        _, first = self.call("async=true&force=true")
+        status, second = self.call("force=true")
+
+        self.assertEqual(status, 202)
+        self.assertTrue(second["attached"])
+        self.assertEqual(second["run_id"], first["run_id"])
+        self.assertEqual(len(bigquery.jobs), 2)
+
+    def expire_lease(self, run_id):
+        blob = main.lease_blob(main.DEFAULT_PROJECT, "full")
+        blob.upload_from_string(json.dumps({"run_id": run_id, "expires_at": 0}))
+
+    def test_run_that_lost_its_lease_submits_nothing(self):
+        bigquery = self.use_bigquery()
+        _, first = self.call("async=true&force=true")
+        self.expire_lease(first["run_id"])
+        _, second = self.call("async=true&force=true")
+        self.assertNotEqual(second["run_id"], first["run_id"])
+
+        _, progress = self.call(f"run_id={first['run_id']}")
+
+        self.assertEqual(progress["status"], "abandoned")
+        first_jobs = [
+            job_id for job_id in bigquery.jobs
+            if job_id.startswith(f"conflict_analytics_{first['run_id']}_")
+        ]
+        self.assertEqual(len(first_jobs), 2)
+        self.assertEqual(progress["step_counts"], {"running": 2, "skipped": 4})
+
+    def test_expired_lease_is_kept_while_jobs_are_in_flight(self):
+        self.use_bigquery(latency=60)
+        _, first = self.call("async=true&force=true")
+        self.expire_lease(first["run_id"])
+
+        status, second = self.call("async=true&force=true")
+
+        self.assertEqual(status, 202)
+        self.assertTrue(second["attached"])
+        self.assertEqual(second["run_id"], first["run_id"])
+
+    def test_stale_lease_is_taken_over(self):
+        self.use_bigquery()
+        blob = main.lease_blob(main.DEFAULT_PROJECT, "full")
+        blob.upload_from_string(json.dumps({"run_id": "dead", "expires_at": 0}))
+
+        _, body = self.call("force=true")
+
+        self.assertEqual(body["status"], "success")
+        self.assertNotIn(blob.name, self.storage.objects)
+
+
+class TestSqlCache(PipelineTestCase):
+    def test_warm_run_revalidates_without_downloading(self):
+        self.use_bigquery()
+        self.call("force=true")
+        downloads = len(self.storage.downloads)
+        self.call("views_only=true")
+
+        sql_downloads = [
+            name for name in self.storage.downloads[downloads:]
+            if name.startswith(main.SQL_FOLDER)
+        ]
+        self.assertEqual(sql_downloads, [])
+
+    def test_bundled_fallback_is_recorded_and_mixed_sources_warned(self):
+        self.use_bigquery()
+        unreachable = f"{main.SQL_FOLDER}/07-google-sheets-analytics.sql"
+        get_blob = fakes.FakeBucket.get_blob
+
+        def flaky_get_blob(bucket, name):
+            if name == unreachable:
+                raise ServiceUnavailable(name)
+            return get_blob(bucket, name)
+
+        with (
+            mock.patch.object(fakes.FakeBucket, "get_blob", flaky_get_blob),
+            mock.patch.object(main, "LOCAL_SQL_DIR", fakes.SQL_DIR),
+        ):
+            _, body = self.call("force=true")
+
+        sources = {step["script"]: step["sql_source"] for step in body["steps"]}
+        self.assertEqual(sources.pop("07-google-sheets-analytics.sql"), "bundled")
+        self.assertEqual(set(sources.values()), {"gcs"})
+        self.assertEqual(body["sql_sources"], ["bundled", "gcs"])
+        self.assertIn("07-google-sheets-analytics.sql", body["sql_source_warning"])
+
+    def test_changed_script_is_downloaded_again(self):
+        self.use_bigquery()
+        main.load_sql("07-google-sheets-analytics.sql")
+        path = f"{main.SQL_FOLDER}/07-google-sheets-analytics.sql"
+        self.storage.bucket(main.SQL_BUCKET).blob(path).upload_from_string("SELECT 1")
+
+        generation, sql = main.load_sql("07-google-sheets-analytics.sql")
+
+        self.assertEqual(sql, "SELECT 1")
+        self.assertEqual(generation, self.storage.objects[path][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ gcloud run deploy gcs-file-ingest-service \
     --platform managed \
     --allow-unauthenticated \
     --memory=2Gi \
-    --set-env-vars GCS_BUCKET=external-dataset-ingest,BQ_PROJECT=clingen-dev,BQ_DATASET=clinvar_ingest
+    --set-env-vars GCS_BUCKET=external-dataset-ingest,BQ_PROJECT=clingen-dev,BQ_DATASET=clinvar_ingest,STREAMING_MODE=true
 
 
 # # modify the memory allocation
@@ -0,0 +1,64 @@
+import os
+import threading
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import storage, bigquery
+from requests.adapters import HTTPAdapter
+
+# Connections kept open per host by each shared client's HTTP session.
+# Should be at least INGEST_WORKERS so concurrent ingests don't queue for
+# a connection or reopen TLS sessions.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+# Process-wide clients (initialized on first use)
+_storage_client = None
+_bigquery_client = None
+_lock = threading.Lock()
+
+
+def build_session(scopes, pool_size=HTTP_POOL_SIZE):
+    """
+    Create an authorized HTTP session with a sized connection pool.
+    Args:
+        scopes (tuple): OAuth scopes required by the client.
+        pool_size (int): Maximum connections kept open per host.
+    Returns:
+        tuple: (session, project) from the default credentials.
+    """
+    credentials, project = google.auth.default(scopes=scopes)
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session, project
+
+
+def get_storage_client():
+    """Get or create the shared storage client."""
+    global _storage_client
+    if _storage_client is None:
+        with _lock:
+            if _storage_client is None:
+                session, project = build_session(storage.Client.SCOPE)
+                _storage_client = storage.Client(
+                    project=project,
+                    credentials=session.credentials,
+                    _http=session,
+                )
+    return _storage_client
+
+
+def get_bigquery_client():
+    """Get or create the shared BigQuery client."""
+    global _bigquery_client
+    if _bigquery_client is None:
+        with _lock:
+            if _bigquery_client is None:
+                session, project = build_session(bigquery.Client.SCOPE)
+                _bigquery_client = bigquery.Client(
+                    project=project,
+                    credentials=session.credentials,
+                    _http=session,
+                )
+    return _bigquery_client
@@ -0,0 +1,194 @@
+import http.client
+import logging
+import os
+import random
+import re
+import time
+import urllib.error
+import urllib.request
+
+# Seconds to wait for the server to connect or send the next bytes
+FETCH_TIMEOUT = int(os.getenv("FETCH_TIMEOUT", "60"))
+
+# Retries after the first attempt, with exponential backoff from
+# FETCH_BACKOFF seconds (plus jitter) between attempts
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "4"))
+FETCH_BACKOFF = float(os.getenv("FETCH_BACKOFF", "1.0"))
+
+# Bytes read from the response per write to disk
+FETCH_CHUNK_SIZE = 1024 * 1024
+
+# Responses worth retrying; anything else is raised at once
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+
+def backoff_delay(attempt, backoff, retry_after=None):
+    """
+    Seconds to wait before retry number `attempt` (from 1).
+    Args:
+        attempt (int): Number of the retry about to be made.
+        backoff (float): Delay before the first retry.
+        retry_after (str): Retry-After header of the failed response, if any.
+    Returns:
+        float: The server's Retry-After in seconds, else exponential backoff
+        with up to 50% jitter.
+    """
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    delay = backoff * 2 ** (attempt - 1)
+    return delay + random.uniform(0, delay / 2)
+
+
+def parse_content_range(value):
+    """
+    Return (first byte, full length or None) from a Content-Range header, or
+    None when the header is missing or cannot be parsed.
+    """
+    match = CONTENT_RANGE.match(value or "")
+    if not match:
+        return None
+    total = match.group(2)
+    return int(match.group(1)), None if total == "*" else int(total)
+
+
+def fetch_url(
+    url,
+    path,
+    etag=None,
+    last_modified=None,
+    retries=FETCH_RETRIES,
+    backoff=FETCH_BACKOFF,
+    timeout=FETCH_TIMEOUT,
+):
+    """
+    Download url to path, unless it has not changed since a previous fetch.
+
+    The first request carries If-None-Match / If-Modified-Since from the
+    previous fetch's validators, and a 304 response ends the fetch without
+    a body. Otherwise the body is streamed to path in FETCH_CHUNK_SIZE
+    pieces. When the connection drops or a retryable status comes back,
+    the fetch backs off and asks for the rest of the body with a Range
+    request guarded by If-Range, so a file that changed in between is
+    downloaded again from the start. Without an ETag or Last-Modified to
+    send in If-Range, or when a partial response has no usable
+    Content-Range, the download restarts from the first byte instead.
+    Args:
+        url (str): URL to fetch.
+        path (str): File the body is written to (replaced).
+        etag (str): ETag returned by the previous fetch.
+        last_modified (str): Last-Modified returned by the previous fetch.
+        retries (int): Retries after the first attempt.
+        backoff (float): Seconds before the first retry, doubled per retry.
+        timeout (float): Socket timeout in seconds.
+    Returns:
+        dict: status ("not_modified" or "fetched"), bytes written, the new
+        etag and last_modified validators, and the number of attempts.
+    """
+    received = 0
+    validators = {"etag": None, "last_modified": None}
+    attempt = 0
+
+    with open(path, "wb") as out:
+        while True:
+            attempt += 1
+            headers = {}
+            if_range = validators["etag"] or validators["last_modified"]
+            if received and not if_range:
+                # A resumed body could not be checked against the first one
+                logging.info(f"Restarting download of {url}: no validator")
+                out.seek(0)
+                out.truncate()
+                received = 0
+            if received:
+                headers["Range"] = f"bytes={received}-"
+                headers["If-Range"] = if_range
+            else:
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+            retry_after = None
+            try:
+                request = urllib.request.Request(url, headers=headers)
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    if response.status == 206:
+                        content_range = parse_content_range(
+                            response.headers.get("Content-Range")
+                        )
+                        start, total = content_range or (None, None)
+                    else:
+                        start, total = 0, response.headers.get("Content-Length")
+                        total = int(total) if total else None
+                    if start is None or start > received:
+                        # The partial body cannot be placed; start over
+                        out.seek(0)
+                        out.truncate()
+                        received = 0
+                        raise http.client.HTTPException(
+                            f"Unexpected Content-Range from {url}"
+                        )
+                    if start < received:
+                        # Full body (Range ignored or file changed); start over
+                        logging.info(f"Restarting download of {url} from byte {start}")
+                        out.seek(start)
+                        out.truncate()
+                        received = start
+                    if response.status != 206:
+                        validators = {
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                        }
+
+                    while chunk := response.read(FETCH_CHUNK_SIZE):
+                        out.write(chunk)
+                        received += len(chunk)
+                    if total is not None and received < total:
+                        raise http.client.IncompleteRead(b"", total - received)
+
+                logging.info(
+                    f"Fetched {received} bytes from {url} in {attempt} attempt(s)"
+                )
+                return {
+                    "status": "fetched",
+                    "bytes": received,
+                    **validators,
+                    "attempts": attempt,
+                }
+
+            except urllib.error.HTTPError as e:
+                if e.code == 304:
+                    logging.info(f"{url} not modified since the previous fetch")
+                    return {
+                        "status": "not_modified",
+                        "bytes": 0,
+                        "etag": e.headers.get("ETag") or etag,
+                        "last_modified": (
+                            e.headers.get("Last-Modified") or last_modified
+                        ),
+                        "attempts": attempt,
+                    }
+                if e.code == 416:
+                    # The partial body no longer fits the file; start over
+                    out.seek(0)
+                    out.truncate()
+                    received = 0
+                elif e.code not in RETRY_STATUSES:
+                    raise
+                if attempt > retries:
+                    raise
+                retry_after = e.headers.get("Retry-After")
+                error = e
+            except (http.client.HTTPException, OSError) as e:
+                if attempt > retries:
+                    raise
+                error = e
+
+            delay = backoff_delay(attempt, backoff, retry_after)
+            logging.warning(
+                f"Fetch of {url} failed after {received} bytes ({error}); "
+                f"retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
@@ -1,11 +1,30 @@
+import io
 import logging
 import json
 import os
-import urllib.request
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import ijson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from flask import Flask, request, jsonify
-from google.cloud import storage, bigquery
-from utils import process_tsv_data
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+from clients import get_bigquery_client, get_storage_client
+from fetch import fetch_url
+from metrics import TimedReader, collect, count, stage, totals
+from utils import (
+    dataframe_to_arrow,
+    header_mapping,
+    iter_batches,
+    iter_tsv_batches,
+    process_tsv_data,
+    records_to_arrow,
+)
 
 # ClinVar FTP URL for organization summary
 CLINVAR_ORG_SUMMARY_URL = (
@@ -19,9 +38,78 @@ BQ_PROJECT = os.getenv("BQ_PROJECT")
 BQ_DATASET = os.getenv("BQ_DATASET")
 GCS_BUCKET = os.getenv("GCS_BUCKET")
 
+# Streaming mode reads blobs in chunks and loads bounded batches of rows
+# instead of holding the whole file and DataFrame in memory.
+STREAMING_MODE = os.getenv("STREAMING_MODE", "false").lower() == "true"
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(8 * 1024 * 1024)))
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "50000"))
+
+# Arrow load mode builds pyarrow Tables straight from the extracted records
+# and loads them as a Parquet file, skipping the object-dtype DataFrame.
+ARROW_LOAD = os.getenv("ARROW_LOAD", "false").lower() == "true"
+
+# Suffix for the staging table that streamed batches are appended to
+STAGING_SUFFIX = "_staging"
+
+# "truncate" replaces each table on every load; "merge" stages the new rows
+# and applies only the inserts, updates and deletes to tables in MERGE_KEYS
+WRITE_MODE = os.getenv("WRITE_MODE", "truncate").lower()
+
+# Skip reloading a table when the uploaded blob's content hash matches the
+# last load recorded in the manifest table (opt-in: costs a manifest query
+# and a manifest load job per ingest)
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "false").lower() == "true"
+MANIFEST_TABLE = os.getenv("MANIFEST_TABLE", "ingest_manifest")
+
+# Maximum number of files the /batch endpoint ingests concurrently
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+
+# Request header that turns on profiling for one request ("cpu", "memory"
+# or "cpu,memory"; PROFILE_MODE in metrics.py does it for every request)
+PROFILE_HEADER = "X-Ingest-Profile"
+
 # Mapping JSON file names to BQ table names
 JSON_TABLES = {"hp.json": "hpo_terms", "mondo.json": "mondo_terms"}
 
+hpo_terms_schema = [
+    bigquery.SchemaField("id", "STRING"),
+    bigquery.SchemaField("lbl", "STRING"),
+]
+
+mondo_terms_schema = [
+    bigquery.SchemaField("id", "STRING"),
+    bigquery.SchemaField("lbl", "STRING"),
+    bigquery.SchemaField(
+        "skos_matches",
+        "RECORD",
+        mode="REPEATED",
+        fields=[
+            bigquery.SchemaField("relation", "STRING"),
+            bigquery.SchemaField("value", "STRING"),
+        ],
+    ),
+]
+
+# Explicit schemas keep every streamed batch of JSON rows type-compatible
+JSON_SCHEMAS = {"hpo_terms": hpo_terms_schema, "mondo_terms": mondo_terms_schema}
+
+# Key columns identifying a row in each table for WRITE_MODE=merge
+MERGE_KEYS = {
+    "hgnc_gene": ["hgnc_id"],
+    "hpo_terms": ["id"],
+    "mondo_terms": ["id"],
+    "ncbi_gene": ["id"],
+    "submitter_organization": ["id"],
+}
+
+# Tables loaded from the content of an uploaded GCS file, eligible for
+# unchanged-file detection (organization_summary.txt is fetched from FTP)
+GCS_FILE_TABLES = {
+    **JSON_TABLES,
+    "hgnc_gene.json": "hgnc_gene",
+    "ncbi_gene.txt": "ncbi_gene",
+}
+
 hgnc_gene_schema = [
     bigquery.SchemaField("hgnc_id", "STRING"),
     bigquery.SchemaField("symbol", "STRING"),
@@ -93,162 +181,330 @@ submitter_organization_schema = [
     ),
 ]
 
+ingest_manifest_schema = [
+    bigquery.SchemaField("table_name", "STRING"),
+    bigquery.SchemaField("source_uri", "STRING"),
+    bigquery.SchemaField("generation", "INTEGER"),
+    bigquery.SchemaField("md5_hash", "STRING"),
+    bigquery.SchemaField("crc32c", "STRING"),
+    bigquery.SchemaField("loaded_at", "TIMESTAMP"),
+    # HTTP validators of files fetched from a URL rather than GCS
+    bigquery.SchemaField("etag", "STRING"),
+    bigquery.SchemaField("last_modified", "STRING"),
+]
+
 # Table configuration map: table_name -> config dict
+# headers lists the file's header row as written by get-ncbi-gene-txt.sh
+# and published by ClinVar; column_map is precomputed from it below.
 TABLE_CONFIGS = {
     "ncbi_gene": {
         "schema": ncbi_gene_schema,
         "id_column": "GeneID",
         "delimiter": "|",
+        "headers": [
+            "GeneID",
+            "Symbol",
+            "Description",
+            "GeneType",
+            "NomenclatureID",
+            "Synonyms",
+            "OMIM_ID",
+        ],
     },
     "submitter_organization": {
         "schema": submitter_organization_schema,
         "id_column": "organization ID",
         "delimiter": ",",
+        "headers": [
+            "#organization",
+            "organization ID",
+            "institution type",
+            "street address",
+            "city",
+            "country",
+            "number of ClinVar submissions",
+            "date last submitted",
+            "maximum review status",
+            "collection methods",
+            "novel and updates",
+            "clinical significance categories submitted",
+            "number of submissions from clinical testing",
+            "number of submissions from research",
+            "number of submissions from literature only",
+            "number of submissions from curation",
+            "number of submissions from phenotyping",
+            "somatic clinical impact values submitted",
+            "somatic oncogenicity values submitted",
+        ],
     },
     # Add more table configs as needed
 }
 
+# Header -> column mapping for each table's known layout, so loads of the
+# same layout skip header normalization (other layouts are mapped on the fly)
+for config in TABLE_CONFIGS.values():
+    config["column_map"] = header_mapping(config["headers"], config["id_column"])
 
-def fetch_organization_summary_from_ftp():
-    """Fetch the latest organization_summary.txt directly from ClinVar FTP."""
-    logging.info(f"Fetching organization_summary.txt from {CLINVAR_ORG_SUMMARY_URL}")
-    try:
-        with urllib.request.urlopen(CLINVAR_ORG_SUMMARY_URL, timeout=60) as response:
-            content = response.read().decode("utf-8")
-            logging.info(f"Successfully fetched {len(content)} bytes from ClinVar FTP")
-            return content
-    except Exception as e:
-        logging.exception(f"Failed to fetch from ClinVar FTP: {e}")
-        raise
 
+def get_fetch_validators(table_name):
+    """
+    Return the (etag, last_modified) recorded with the last load of
+    table_name, or (None, None) if it has not been loaded from a URL.
+    """
+    last_load = get_last_load(table_name) or {}
+    return last_load.get("etag"), last_load.get("last_modified")
 
-def process_organization_summary_from_ftp():
-    """Fetch organization_summary from ClinVar FTP and load into BigQuery."""
-    config = TABLE_CONFIGS.get("submitter_organization")
+
+def process_organization_summary_from_ftp(force=False):
+    """
+    Fetch organization_summary from ClinVar FTP and load into BigQuery.
+
+    The request is conditional on the ETag / Last-Modified recorded with
+    the last load, so an unchanged file is neither downloaded nor loaded.
+    The body is streamed to a temporary file (with retries that resume
+    where a dropped download stopped) and parsed from there.
+    Args:
+        force (bool): Fetch and reload even if the file is unchanged.
+    """
+    table_name = "submitter_organization"
+    config = TABLE_CONFIGS.get(table_name)
     if not config:
-        logging.error("Table 'submitter_organization' is not configured.")
-        return "Table 'submitter_organization' is not configured."
+        logging.error(f"Table '{table_name}' is not configured.")
+        return f"Table '{table_name}' is not configured."
 
     schema = config.get("schema")
 
-    try:
-        # Fetch latest data directly from ClinVar FTP
-        tsv_data = fetch_organization_summary_from_ftp()
+    etag = last_modified = None
+    if SKIP_UNCHANGED and not force:
+        try:
+            etag, last_modified = get_fetch_validators(table_name)
+        except Exception:
+            # Change detection is an optimization; never let it block a load
+            logging.exception(f"Change detection failed for {table_name}")
 
-        df = process_tsv_data(tsv_data, config)
-        return load_to_bigquery(df, "submitter_organization", schema=schema)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "organization_summary.txt")
+            logging.info(
+                f"Fetching organization_summary.txt from {CLINVAR_ORG_SUMMARY_URL}"
+            )
+            with stage("download"):
+                fetched = fetch_url(
+                    CLINVAR_ORG_SUMMARY_URL,
+                    path,
+                    etag=etag,
+                    last_modified=last_modified,
+                )
+            count("bytes_downloaded", fetched["bytes"])
+            if fetched["status"] == "not_modified":
+                return (
+                    f"skipped: unchanged {CLINVAR_ORG_SUMMARY_URL} "
+                    f"is already in {table_name}"
+                )
+
+            if STREAMING_MODE:
+                with open(path, "rb") as stream:
+                    batches = (
+                        tsv_frame(df, schema)
+                        for df in iter_tsv_batches(stream, config, STREAM_BATCH_ROWS)
+                    )
+                    message = load_batches_to_bigquery(
+                        batches, table_name, schema=schema
+                    )
+            else:
+                with stage("parse"), open(path, encoding="utf-8") as f:
+                    df = process_tsv_data(f.read(), config)
+                message = write_table(tsv_frame(df, schema), table_name, schema=schema)
 
     except Exception as e:
         logging.exception("Failed to process organization_summary from FTP")
         return f"Error processing organization_summary from FTP: {str(e)}"
 
+    if SKIP_UNCHANGED and message.startswith("Loaded"):
+        try:
+            record_load(table_name, CLINVAR_ORG_SUMMARY_URL, fetched)
+        except Exception:
+            logging.exception(f"Failed to record manifest entry for {table_name}")
 
-def extract_json_nodes(content, file_name):
-    """Extract fields from hp.json, mondo.json based on structure."""
-    data = json.loads(content)
-    nodes = data["graphs"][0]["nodes"]
-    results = []
+    return message
 
-    for node in nodes:
-        if "id" not in node or "lbl" not in node:
-            continue
 
-        id_compact = node["id"].rsplit("/", 1)[-1].replace("_", ":")
-        lbl = node["lbl"]
+def json_node_to_row(node, file_name):
+    """Convert one obographs node into a row dict, or None if it is not kept."""
+    if "id" not in node or "lbl" not in node:
+        return None
 
-        if "hp" in node["id"].lower() and file_name == "hp.json":
-            results.append({"id": id_compact, "lbl": lbl})
+    id_compact = node["id"].rsplit("/", 1)[-1].replace("_", ":")
+    lbl = node["lbl"]
 
-        elif "mondo" in node["id"].lower() and file_name == "mondo.json":
-            skos_matches = []
+    if "hp" in node["id"].lower() and file_name == "hp.json":
+        return {"id": id_compact, "lbl": lbl}
 
-            for prop in node.get("meta", {}).get("basicPropertyValues", []):
-                pred = prop.get("pred", "")
-                if pred.startswith("http://www.w3.org/2004/02/skos/core#"):
-                    match_type = pred.split("#")[-1]  # e.g., exactMatch
-                    skos_matches.append(
-                        {"relation": match_type, "value": prop.get("val")}
-                    )
+    elif "mondo" in node["id"].lower() and file_name == "mondo.json":
+        skos_matches = []
 
-            results.append({"id": id_compact, "lbl": lbl, "skos_matches": skos_matches})
+        for prop in node.get("meta", {}).get("basicPropertyValues", []):
+            pred = prop.get("pred", "")
+            if pred.startswith("http://www.w3.org/2004/02/skos/core#"):
+                match_type = pred.split("#")[-1]  # e.g., exactMatch
+                skos_matches.append({"relation": match_type, "value": prop.get("val")})
 
-    logging.info(f"Extracted {len(results)} rows from {file_name}")
-    return results
+        return {"id": id_compact, "lbl": lbl, "skos_matches": skos_matches}
+
+    return None
+
+
+def iter_json_nodes(stream, file_name):
+    """
+    Incrementally extract rows from an hp.json/mondo.json obographs stream.
+
+    Nodes are built one at a time from the ``nodes`` array by ijson's
+    event-driven parser, so edges, axioms and the rest of the document are
+    scanned but never materialized. Only the first graph is read, as in a
+    full ``json.loads`` walk of ``graphs[0].nodes``; parsing stops at the
+    end of that graph.
+    """
+    builder = None
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "graphs.item.nodes.item" and event == "end_map":
+                row = json_node_to_row(builder.value, file_name)
+                builder = None
+                if row is not None:
+                    yield row
+        elif prefix == "graphs.item.nodes.item" and event == "start_map":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == "graphs.item" and event == "end_map":
+            return
+
+
+def load_json_nodes(stream, file_name, table_name):
+    """
+    Load the nodes of an hp.json/mondo.json stream in STREAM_BATCH_ROWS batches.
+    Args:
+        stream: Binary file-like object holding the obographs document.
+        file_name (str): File name, selecting the node fields to extract.
+        table_name (str): Destination BigQuery table.
+    """
+    schema = JSON_SCHEMAS.get(table_name)
+    batches = (
+        records_to_frame(batch, schema)
+        for batch in iter_batches(iter_json_nodes(stream, file_name), STREAM_BATCH_ROWS)
+    )
+    return load_batches_to_bigquery(batches, table_name, schema=schema)
+
+
+def hgnc_gene_record(doc):
+    """Map one HGNC API doc onto the hgnc_gene columns."""
+    return {
+        "hgnc_id": doc.get("hgnc_id"),
+        "symbol": doc.get("symbol"),
+        "name": doc.get("name"),
+        "locus_group": doc.get("locus_group"),
+        "locus_type": doc.get("locus_type"),
+        "status": doc.get("status"),
+        "location": doc.get("location"),
+        "alias_symbol": doc.get("alias_symbol", []),
+        "alias_name": doc.get("alias_name", []),
+        "prev_symbol": doc.get("prev_symbol", []),
+        "prev_name": doc.get("prev_name", []),
+        "gene_group": doc.get("gene_group", []),
+        "gene_group_id": doc.get("gene_group_id", []),
+        "date_approved_reserved": doc.get("date_approved_reserved"),
+        "date_symbol_changed": doc.get("date_symbol_changed"),
+        "date_name_changed": doc.get("date_name_changed"),
+        "date_modified": doc.get("date_modified"),
+        "entrez_id": doc.get("entrez_id"),
+        "ensembl_gene_id": doc.get("ensembl_gene_id"),
+        "vega_id": doc.get("vega_id"),
+        "ucsc_id": doc.get("ucsc_id"),
+        "refseq_accession": doc.get("refseq_accession", []),
+        "ccds_id": doc.get("ccds_id", []),
+        "uniprot_ids": doc.get("uniprot_ids", []),
+        "pubmed_id": doc.get("pubmed_id", []),
+        "omim_id": doc.get("omim_id", []),
+        "orphanet": doc.get("orphanet"),
+        "enzyme_id": doc.get("enzyme_id", []),
+        "mane_select": doc.get("mane_select", []),
+        "agr": doc.get("agr"),
+    }
 
 
 def extract_hgnc_genes(content):
     """Extract gene records from HGNC gene_with_protein_product.json."""
-    data = json.loads(content)
-    docs = data.get("response", {}).get("docs", [])
-    results = []
-
-    for doc in docs:
-        record = {
-            "hgnc_id": doc.get("hgnc_id"),
-            "symbol": doc.get("symbol"),
-            "name": doc.get("name"),
-            "locus_group": doc.get("locus_group"),
-            "locus_type": doc.get("locus_type"),
-            "status": doc.get("status"),
-            "location": doc.get("location"),
-            "alias_symbol": doc.get("alias_symbol", []),
-            "alias_name": doc.get("alias_name", []),
-            "prev_symbol": doc.get("prev_symbol", []),
-            "prev_name": doc.get("prev_name", []),
-            "gene_group": doc.get("gene_group", []),
-            "gene_group_id": doc.get("gene_group_id", []),
-            "date_approved_reserved": doc.get("date_approved_reserved"),
-            "date_symbol_changed": doc.get("date_symbol_changed"),
-            "date_name_changed": doc.get("date_name_changed"),
-            "date_modified": doc.get("date_modified"),
-            "entrez_id": doc.get("entrez_id"),
-            "ensembl_gene_id": doc.get("ensembl_gene_id"),
-            "vega_id": doc.get("vega_id"),
-            "ucsc_id": doc.get("ucsc_id"),
-            "refseq_accession": doc.get("refseq_accession", []),
-            "ccds_id": doc.get("ccds_id", []),
-            "uniprot_ids": doc.get("uniprot_ids", []),
-            "pubmed_id": doc.get("pubmed_id", []),
-            "omim_id": doc.get("omim_id", []),
-            "orphanet": doc.get("orphanet"),
-            "enzyme_id": doc.get("enzyme_id", []),
-            "mane_select": doc.get("mane_select", []),
-            "agr": doc.get("agr"),
-        }
-        results.append(record)
+    with stage("parse"):
+        data = json.loads(content)
+        docs = data.get("response", {}).get("docs", [])
+        results = [hgnc_gene_record(doc) for doc in docs]
 
     logging.info(f"Extracted {len(results)} HGNC gene records")
     return results
 
 
-def process_hgnc_from_gcs(bucket_name, file_name):
-    """Load HGNC gene data into BigQuery."""
-    storage_client = storage.Client()
+def open_blob_stream(bucket_name, file_name):
+    """
+    Open a GCS blob as a binary file-like object that downloads in chunks.
+    Reads are charged to the request's "download" stage.
+    """
+    storage_client = get_storage_client()
+    bucket = storage_client.bucket(bucket_name)
+    blob = bucket.blob(file_name)
+    return TimedReader(blob.open("rb", chunk_size=STREAM_CHUNK_SIZE))
+
+
+def download_blob_bytes(bucket_name, file_name):
+    """Download a whole GCS blob."""
+    storage_client = get_storage_client()
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(file_name)
-    file_content = blob.download_as_text()
+    with stage("download"):
+        data = blob.download_as_bytes()
+    count("bytes_downloaded", len(data))
+    return data
+
+
+def download_blob_text(bucket_name, file_name):
+    """Download a whole GCS blob and decode it as UTF-8 text."""
+    return download_blob_bytes(bucket_name, file_name).decode("utf-8")
+
+
+def process_hgnc_from_gcs(bucket_name, file_name):
+    """Load HGNC gene data into BigQuery."""
+    if STREAMING_MODE:
+        with open_blob_stream(bucket_name, file_name) as stream:
+            docs = ijson.items(stream, "response.docs.item", use_float=True)
+            batches = (
+                records_to_frame(
+                    [hgnc_gene_record(doc) for doc in batch], hgnc_gene_schema
+                )
+                for batch in iter_batches(docs, STREAM_BATCH_ROWS)
+            )
+            return load_batches_to_bigquery(
+                batches, "hgnc_gene", schema=hgnc_gene_schema
+            )
+
+    file_content = download_blob_text(bucket_name, file_name)
 
     genes = extract_hgnc_genes(file_content)
     if not genes:
         return f"No gene data found in {file_name}"
 
-    df = pd.DataFrame(genes)
-    return load_to_bigquery(df, "hgnc_gene", schema=hgnc_gene_schema)
+    df = records_to_frame(genes, hgnc_gene_schema)
+    return write_table(df, "hgnc_gene", schema=hgnc_gene_schema)
 
 
 def process_json_from_gcs(bucket_name, file_name, table_name):
     """Load filtered JSON node data into BigQuery."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(file_name)
-    file_content = blob.download_as_text()
+    if STREAMING_MODE:
+        with open_blob_stream(bucket_name, file_name) as stream:
+            return load_json_nodes(stream, file_name, table_name)
 
-    filtered_data = extract_json_nodes(file_content, file_name)
-    if not filtered_data:
-        return f"No relevant data found in {file_name}"
-
-    df = pd.DataFrame(filtered_data)
-    return load_to_bigquery(df, table_name)
+    # Downloaded in one request, then parsed from the bytes as they are,
+    # without a decoded copy of the whole file
+    data = download_blob_bytes(bucket_name, file_name)
+    return load_json_nodes(io.BytesIO(data), file_name, table_name)
 
 
 def process_tsv_from_gcs(bucket_name, file_name, table_name):
@@ -267,33 +523,424 @@ def process_tsv_from_gcs(bucket_name, file_name, table_name):
     schema = config.get("schema")
 
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(file_name)
-        tsv_data = blob.download_as_text()
+        if STREAMING_MODE:
+            with open_blob_stream(bucket_name, file_name) as stream:
+                batches = (
+                    tsv_frame(df, schema)
+                    for df in iter_tsv_batches(stream, config, STREAM_BATCH_ROWS)
+                )
+                return load_batches_to_bigquery(batches, table_name, schema=schema)
+
+        tsv_data = download_blob_text(bucket_name, file_name)
 
-        df = process_tsv_data(tsv_data, config)
-        return load_to_bigquery(df, table_name, schema=schema)
+        with stage("parse"):
+            df = process_tsv_data(tsv_data, config)
+        return write_table(tsv_frame(df, schema), table_name, schema=schema)
 
     except Exception as e:
         logging.exception(f"Failed to process TSV {file_name}")
         return f"Error processing {file_name}: {str(e)}"
 
 
-def load_to_bigquery(df, table_name, schema=None):
+def records_to_frame(records, schema):
+    """Build the load input for a list of row dicts (a pyarrow Table in Arrow mode)."""
+    with stage("frame"):
+        if ARROW_LOAD:
+            return records_to_arrow(records, schema)
+        return pd.DataFrame(records)
+
+
+def tsv_frame(df, schema):
+    """Return the load input for a processed TSV DataFrame."""
+    if ARROW_LOAD:
+        with stage("frame"):
+            return dataframe_to_arrow(df, schema)
+    return df
+
+
+def load_to_bigquery(
+    df,
+    table_name,
+    schema=None,
+    write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+):
+    """
+    Load a DataFrame or pyarrow Table into BigQuery.
+    pyarrow Tables are written to a single Parquet file and loaded from it.
+    """
     table_id = f"{BQ_PROJECT}.{BQ_DATASET}.{table_name}"
-    bq_client = bigquery.Client()
+    bq_client = get_bigquery_client()
 
     job_config = bigquery.LoadJobConfig(
-        schema=schema, write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        schema=schema, write_disposition=write_disposition
     )
 
-    job = bq_client.load_table_from_dataframe(df, table_id, job_config=job_config)
-    job.result()
+    with stage("load"):
+        if isinstance(df, pa.Table):
+            job = load_arrow_table(bq_client, df, table_id, job_config)
+        else:
+            job = bq_client.load_table_from_dataframe(
+                df, table_id, job_config=job_config
+            )
+        job.result()
+    count("rows_loaded", len(df))
+    count("load_jobs")
     logging.info(f"Loaded {len(df)} rows into {table_id}")
     return f"Loaded {len(df)} rows into {table_id}"
 
 
+def load_arrow_table(bq_client, table, table_id, job_config):
+    """Write a pyarrow Table to a temporary Parquet file and start a load job."""
+    job_config.source_format = bigquery.SourceFormat.PARQUET
+    parquet_options = bigquery.ParquetOptions()
+    # Load Parquet LIST columns as REPEATED fields rather than nested records
+    parquet_options.enable_list_inference = True
+    job_config.parquet_options = parquet_options
+
+    with tempfile.NamedTemporaryFile(suffix=".parquet") as tmp:
+        pq.write_table(table, tmp.name)
+        with open(tmp.name, "rb") as parquet_file:
+            job = bq_client.load_table_from_file(
+                parquet_file, table_id, job_config=job_config
+            )
+    return job
+
+
+def write_table(df, table_name, schema=None):
+    """Load the full contents of a table, replacing or merging per WRITE_MODE."""
+    if WRITE_MODE == "merge" and table_name in MERGE_KEYS:
+        return load_batches_to_bigquery([df], table_name, schema=schema)
+    return load_to_bigquery(df, table_name, schema=schema)
+
+
+def load_batches_to_bigquery(batches, table_name, schema=None):
+    """
+    Load an iterable of DataFrame batches into BigQuery.
+
+    Batches are appended to a staging table one at a time, so only a single
+    batch is held in memory. The staging table then replaces the destination
+    table in one copy job, so readers never see a partially loaded table.
+    With WRITE_MODE=merge the staged rows are merged into the destination
+    instead (see merge_from_staging).
+
+    Each call stages into its own <table>_staging_<id> table, so concurrent
+    loads of the same table never share staged rows, and the staging table
+    is dropped however the load ends.
+    """
+    table_id = f"{BQ_PROJECT}.{BQ_DATASET}.{table_name}"
+    staging_name = f"{table_name}{STAGING_SUFFIX}_{uuid.uuid4().hex[:8]}"
+    staging_id = f"{BQ_PROJECT}.{BQ_DATASET}.{staging_name}"
+
+    bq_client = get_bigquery_client()
+    try:
+        total_rows = 0
+        write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+        batches = iter(batches)
+        while True:
+            # Streaming batches are downloaded and parsed as they are pulled
+            with stage("parse"):
+                df = next(batches, None)
+            if df is None:
+                break
+            if len(df) == 0:
+                continue
+            load_to_bigquery(
+                df, staging_name, schema=schema, write_disposition=write_disposition
+            )
+            write_disposition = bigquery.WriteDisposition.WRITE_APPEND
+            total_rows += len(df)
+
+        if total_rows == 0:
+            return f"No rows found to load into {table_id}"
+
+        if WRITE_MODE == "merge" and table_name in MERGE_KEYS:
+            with stage("merge"):
+                counts = merge_from_staging(bq_client, table_name, staging_id, table_id)
+            if counts is not None:
+                message = (
+                    f"Loaded {total_rows} rows into {table_id} "
+                    f"(merge: {counts['inserted']} inserted, "
+                    f"{counts['updated']} updated, {counts['deleted']} deleted)"
+                )
+                logging.info(message)
+                return message
+
+        copy_config = bigquery.CopyJobConfig(
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+        )
+        with stage("copy"):
+            bq_client.copy_table(staging_id, table_id, job_config=copy_config).result()
+    finally:
+        bq_client.delete_table(staging_id, not_found_ok=True)
+
+    logging.info(f"Loaded {total_rows} rows into {table_id} via {staging_id}")
+    return f"Loaded {total_rows} rows into {table_id}"
+
+
+def merge_from_staging(bq_client, table_name, staging_id, table_id):
+    """
+    Apply the difference between the staging table and the destination table.
+
+    Rows are matched on MERGE_KEYS[table_name]. Matched rows are only updated
+    when a column value differs, so unchanged rows are left untouched.
+    Returns:
+        dict: inserted/updated/deleted row counts, or None when the
+        destination table does not exist yet and must be created by a copy.
+    """
+    try:
+        bq_client.get_table(table_id)
+    except NotFound:
+        return None
+
+    keys = MERGE_KEYS[table_name]
+    columns = [field.name for field in bq_client.get_table(staging_id).schema]
+    values = [column for column in columns if column not in keys]
+
+    on_clause = " AND ".join(f"T.{key} = S.{key}" for key in keys)
+    target_row = ", ".join(f"T.{column}" for column in values)
+    source_row = ", ".join(f"S.{column}" for column in values)
+    set_clause = ", ".join(f"{column} = S.{column}" for column in values)
+    insert_columns = ", ".join(columns)
+    insert_values = ", ".join(f"S.{column}" for column in columns)
+
+    # REPEATED and RECORD columns cannot be compared with !=, so compare the
+    # JSON encoding of the non-key columns instead
+    query = f"""
+        MERGE `{table_id}` T
+        USING `{staging_id}` S
+        ON {on_clause}
+        WHEN MATCHED
+          AND TO_JSON_STRING(STRUCT({target_row}))
+            != TO_JSON_STRING(STRUCT({source_row})) THEN
+          UPDATE SET {set_clause}
+        WHEN NOT MATCHED BY TARGET THEN
+          INSERT ({insert_columns}) VALUES ({insert_values})
+        WHEN NOT MATCHED BY SOURCE THEN
+          DELETE
+    """
+    job = bq_client.query(query)
+    job.result()
+
+    stats = job.dml_stats
+    return {
+        "inserted": stats.inserted_row_count if stats else 0,
+        "updated": stats.updated_row_count if stats else 0,
+        "deleted": stats.deleted_row_count if stats else 0,
+    }
+
+
+def get_blob_fingerprint(bucket_name, file_name, event=None):
+    """
+    Return the generation, md5 and crc32c of a GCS object.
+    The GCS finalize event payload already carries these, so the object
+    metadata is only fetched when the event does not include them.
+    """
+    event = event or {}
+    if event.get("md5Hash") or event.get("crc32c"):
+        generation = event.get("generation")
+        return {
+            "generation": int(generation) if generation else None,
+            "md5_hash": event.get("md5Hash"),
+            "crc32c": event.get("crc32c"),
+        }
+
+    storage_client = get_storage_client()
+    blob = storage_client.bucket(bucket_name).get_blob(file_name)
+    if blob is None:
+        return None
+    return {
+        "generation": blob.generation,
+        "md5_hash": blob.md5_hash,
+        "crc32c": blob.crc32c,
+    }
+
+
+def get_last_load(table_name):
+    """Return the most recent manifest entry for table_name, or None."""
+    manifest_id = f"{BQ_PROJECT}.{BQ_DATASET}.{MANIFEST_TABLE}"
+    # SELECT * so manifests created before the etag and last_modified
+    # columns were added can still be read
+    query = f"""
+        SELECT *
+        FROM `{manifest_id}`
+        WHERE table_name = @table_name
+        ORDER BY loaded_at DESC
+        LIMIT 1
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("table_name", "STRING", table_name)
+        ]
+    )
+    bq_client = get_bigquery_client()
+    try:
+        rows = list(bq_client.query(query, job_config=job_config).result())
+    except NotFound:
+        return None
+    return dict(rows[0].items()) if rows else None
+
+
+def is_unchanged(fingerprint, last_load):
+    """
+    True when every content hash known for both the blob and the last load
+    matches. The generation is not compared, since re-uploading identical
+    bytes creates a new generation.
+    """
+    if not fingerprint or not last_load:
+        return False
+
+    compared = False
+    for key in ("md5_hash", "crc32c"):
+        if fingerprint.get(key) and last_load.get(key):
+            if fingerprint[key] != last_load[key]:
+                return False
+            compared = True
+    return compared
+
+
+def record_load(table_name, source_uri, fingerprint):
+    """
+    Append a manifest entry for a successful load of table_name.
+    Args:
+        table_name (str): Table that was loaded.
+        source_uri (str): gs:// URI or URL the data came from.
+        fingerprint (dict): GCS generation/md5_hash/crc32c or HTTP
+            etag/last_modified of the loaded file.
+    """
+    manifest_id = f"{BQ_PROJECT}.{BQ_DATASET}.{MANIFEST_TABLE}"
+    row = {
+        "table_name": table_name,
+        "source_uri": source_uri,
+        "generation": fingerprint.get("generation"),
+        "md5_hash": fingerprint.get("md5_hash"),
+        "crc32c": fingerprint.get("crc32c"),
+        "loaded_at": datetime.now(timezone.utc).isoformat(),
+        "etag": fingerprint.get("etag"),
+        "last_modified": fingerprint.get("last_modified"),
+    }
+    # A load job (unlike a streaming insert) creates the table on first use,
+    # and adds columns missing from a manifest created by an older version
+    job_config = bigquery.LoadJobConfig(
+        schema=ingest_manifest_schema,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION],
+    )
+    bq_client = get_bigquery_client()
+    bq_client.load_table_from_json([row], manifest_id, job_config=job_config).result()
+
+
+def ingest_file(bucket_name, file_name, event=None, force=False):
+    """
+    Dispatch one uploaded file to its processor.
+    Args:
+        bucket_name (str): GCS bucket name.
+        file_name (str): File name in GCS.
+        event (dict): GCS event payload, used for the blob's content hashes.
+        force (bool): Reload even if the file is unchanged since the last load.
+    Returns:
+        tuple: (status, message) where status is "success" or "skipped".
+    """
+    table_name = GCS_FILE_TABLES.get(file_name)
+    fingerprint = None
+
+    if table_name and SKIP_UNCHANGED:
+        try:
+            fingerprint = get_blob_fingerprint(bucket_name, file_name, event)
+            if not force and is_unchanged(fingerprint, get_last_load(table_name)):
+                message = f"skipped: unchanged {file_name} is already in {table_name}"
+                logging.info(message)
+                return "skipped", message
+        except Exception:
+            # Change detection is an optimization; never let it block a load
+            logging.exception(f"Change detection failed for {file_name}")
+
+    if file_name in JSON_TABLES:
+        table = JSON_TABLES[file_name]
+        message = process_json_from_gcs(bucket_name, file_name, table)
+    elif file_name == "hgnc_gene.json":
+        message = process_hgnc_from_gcs(bucket_name, file_name)
+    elif file_name == "ncbi_gene.txt":
+        message = process_tsv_from_gcs(bucket_name, file_name, "ncbi_gene")
+    elif file_name == "organization_summary.txt":
+        # Fetch latest from ClinVar FTP instead of using uploaded file
+        message = process_organization_summary_from_ftp(force=force)
+        if message.startswith("skipped"):
+            return "skipped", message
+    else:
+        logging.info(f"Ignored file: {file_name}")
+        message = f"Ignored file: {file_name}"
+
+    # Processors report failures in their message rather than raising
+    if table_name and SKIP_UNCHANGED and fingerprint and message.startswith("Loaded"):
+        try:
+            record_load(table_name, f"gs://{bucket_name}/{file_name}", fingerprint)
+        except Exception:
+            logging.exception(f"Failed to record manifest entry for {table_name}")
+
+    return "success", message
+
+
+def timed_ingest_file(bucket_name, file_name, event=None, force=False, profile=None):
+    """
+    Run ingest_file and report its outcome, duration and stage metrics.
+    Args:
+        bucket_name (str): GCS bucket name.
+        file_name (str): File name in GCS.
+        event (dict): GCS event payload for the file, if any.
+        force (bool): Reload even if the file is unchanged since the last load.
+        profile (str): Profile modes for this file (see metrics.profile_modes).
+    Returns:
+        dict: bucket, name, status, message, elapsed seconds and metrics
+        for the file.
+    """
+    start = time.perf_counter()
+    with collect(file_name, profile=profile) as file_metrics:
+        try:
+            status, message = ingest_file(
+                bucket_name, file_name, event=event, force=force
+            )
+        except Exception as e:
+            logging.exception(f"Failed to ingest {file_name}")
+            status, message = "error", str(e)
+    return {
+        "bucket": bucket_name,
+        "name": file_name,
+        "status": status,
+        "message": message,
+        "seconds": round(time.perf_counter() - start, 3),
+        "metrics": file_metrics.to_dict(),
+    }
+
+
+def ingest_files(files, force=False, profile=None):
+    """
+    Ingest several files concurrently on a bounded thread pool.
+
+    Downloads and BigQuery jobs spend most of their time waiting on the
+    network, so one file's download overlaps with another's parse and load.
+    Each file loads a different table, so the workers never share a staging
+    table; duplicate entries are ingested once.
+    Args:
+        files (list): Event dicts with "bucket" (defaults to GCS_BUCKET) and "name".
+        force (bool): Reload even if a file is unchanged since the last load.
+        profile (str): Profile modes for each file (see metrics.profile_modes).
+    Returns:
+        list: One timed_ingest_file result per unique file, in request order.
+    """
+    unique = {}
+    for file in files:
+        key = (file.get("bucket") or GCS_BUCKET, file["name"])
+        unique.setdefault(key, file)
+
+    workers = max(1, min(INGEST_WORKERS, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(timed_ingest_file, bucket, name, event, force, profile)
+            for (bucket, name), event in unique.items()
+        ]
+        return [future.result() for future in futures]
+
+
 @app.route("/", methods=["POST"])
 def handle_gcs_event():
     try:
@@ -311,26 +958,60 @@ def handle_gcs_event():
 
         logging.info(f"Triggered by file: {file_name}")
 
-        if file_name in JSON_TABLES:
-            table = JSON_TABLES[file_name]
-            message = process_json_from_gcs(bucket_name, file_name, table)
-        elif file_name == "hgnc_gene.json":
-            message = process_hgnc_from_gcs(bucket_name, file_name)
-        elif file_name == "ncbi_gene.txt":
-            message = process_tsv_from_gcs(bucket_name, file_name, "ncbi_gene")
-        elif file_name == "organization_summary.txt":
-            # Fetch latest from ClinVar FTP instead of using uploaded file
-            message = process_organization_summary_from_ftp()
-        else:
-            logging.info(f"Ignored file: {file_name}")
-            message = f"Ignored file: {file_name}"
+        force = str(request_json.get("force", "false")).lower() == "true"
+        profile = request.headers.get(PROFILE_HEADER)
+        with collect(file_name, profile=profile) as file_metrics:
+            status, message = ingest_file(
+                bucket_name, file_name, event=request_json, force=force
+            )
 
-        return jsonify({"status": "success", "message": message}), 200
+        metrics = file_metrics.to_dict()
+        logging.info(f"Metrics for {file_name}: {json.dumps(metrics)}")
+        return jsonify({"status": status, "message": message, "metrics": metrics}), 200
 
     except Exception as e:
         logging.exception("Unexpected error")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/batch", methods=["POST"])
+def handle_batch():
+    """Ingest a list of {"bucket", "name"} files in one request."""
+    try:
+        request_json = request.get_json(silent=True)
+        files = (request_json or {}).get("files")
+        if not files or not all(isinstance(f, dict) and f.get("name") for f in files):
+            return jsonify(
+                {"status": "error", "message": "Missing files or file name"}
+            ), 400
+
+        logging.info(f"Batch triggered for {len(files)} files")
+
+        force = str(request_json.get("force", "false")).lower() == "true"
+        profile = request.headers.get(PROFILE_HEADER)
+        start = time.perf_counter()
+        results = ingest_files(files, force=force, profile=profile)
+        elapsed = round(time.perf_counter() - start, 3)
+
+        failed = any(result["status"] == "error" for result in results)
+        return jsonify(
+            {
+                "status": "error" if failed else "success",
+                "seconds": elapsed,
+                "results": results,
+            }
+        ), 200
+
+    except Exception as e:
+        logging.exception("Unexpected error")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/metrics", methods=["GET"])
+def handle_metrics():
+    """Stage timings, counters and memory totals since the instance started."""
+    return jsonify(totals()), 200
+
+
 if __name__ == "__main__":
     app.run(debug=True)
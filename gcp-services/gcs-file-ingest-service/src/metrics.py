@@ -0,0 +1,321 @@
+import contextvars
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Opt-in profiling of every request: "cpu" (cProfile), "memory"
+# (tracemalloc) or "cpu,memory"; the X-Ingest-Profile header does the same
+# for a single request
+PROFILE_MODE = os.getenv("PROFILE_MODE", "")
+# Where profiles are written: a local directory or a gs://bucket/prefix
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT", "/tmp/ingest-profiles")
+# Entries listed in the text summaries of each profile
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+
+# The metrics of the request running in the current thread
+_current = contextvars.ContextVar("ingest_metrics", default=None)
+
+# Totals since the process started, served by the /metrics endpoint
+_totals = {"requests": 0, "errors": 0, "stages": {}, "counters": {}, "last": {}}
+_totals_lock = threading.Lock()
+_started = time.time()
+
+# cProfile and tracemalloc are process-wide, so one request profiles at a time
+_profile_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    """Return the process's peak resident set size so far, in MiB."""
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def rss_mb():
+    """Return the process's current resident set size in MiB, if known."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def profile_modes(value):
+    """Parse a PROFILE_MODE / X-Ingest-Profile value into a set of modes."""
+    modes = {mode.strip().lower() for mode in (value or "").split(",")}
+    if modes & {"true", "all", "1"}:
+        return {"cpu", "memory"}
+    return modes & {"cpu", "memory"}
+
+
+class RequestMetrics:
+    """
+    Stage timings and counters for the ingest of one file.
+
+    Stages may nest (e.g. "download" reads inside "parse" in streaming
+    mode); each stage is charged only for the time not spent in the stages
+    nested in it, so the stage seconds add up to the time measured.
+    Outermost stages also record rss_delta_mb, the change in resident
+    memory across their calls (nested stages, which may run per read, are
+    not sampled).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.counters = {}
+        self.profiles = []
+        self.rss_mb_start = rss_mb()
+        self.seconds = None
+        self._started = time.perf_counter()
+        # Seconds spent in nested stages, one entry per open stage
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name):
+        rss_before = None if self._stack else rss_mb()
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += elapsed - nested
+            entry["calls"] += 1
+            rss_after = rss_mb() if rss_before is not None else None
+            if rss_after is not None:
+                delta = entry.get("rss_delta_mb", 0.0) + rss_after - rss_before
+                entry["rss_delta_mb"] = round(delta, 1)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+
+    def to_dict(self):
+        return {
+            "seconds": round(self.seconds or 0.0, 3),
+            "stages": {
+                name: {**entry, "seconds": round(entry["seconds"], 3)}
+                for name, entry in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "rss_mb_start": self.rss_mb_start,
+            "rss_mb_end": rss_mb(),
+            "peak_rss_mb": peak_rss_mb(),
+            "profiles": list(self.profiles),
+        }
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the current request (no-op outside collect())."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.stage(name):
+        yield
+
+
+def count(name, value=1):
+    """Add value to a counter of the current request, if any."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+class TimedReader:
+    """
+    File-like wrapper that charges reads to the "download" stage and counts
+    the bytes read, for streams that download lazily as they are read.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def _timed(self, method, *args):
+        with stage("download"):
+            data = method(*args)
+        count("bytes_downloaded", data if isinstance(data, int) else len(data))
+        return data
+
+    def read(self, *args):
+        return self._timed(self.stream.read, *args)
+
+    def read1(self, *args):
+        return self._timed(self.stream.read1, *args)
+
+    def readinto(self, buffer):
+        return self._timed(self.stream.readinto, buffer)
+
+    def readline(self, *args):
+        return self._timed(self.stream.readline, *args)
+
+    def __iter__(self):
+        return iter(self.readline, self.stream.read(0))
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stream.close()
+
+
+def write_profile(file_name, data):
+    """
+    Write a profile to PROFILE_OUTPUT (a directory or gs://bucket/prefix).
+    Returns:
+        str: Path or gs:// URI of the written profile.
+    """
+    if PROFILE_OUTPUT.startswith("gs://"):
+        from clients import get_storage_client
+
+        bucket_name, _, prefix = PROFILE_OUTPUT[len("gs://") :].partition("/")
+        blob_name = f"{prefix.rstrip('/')}/{file_name}" if prefix else file_name
+        bucket = get_storage_client().bucket(bucket_name)
+        bucket.blob(blob_name).upload_from_string(data)
+        return f"gs://{bucket_name}/{blob_name}"
+
+    os.makedirs(PROFILE_OUTPUT, exist_ok=True)
+    path = os.path.join(PROFILE_OUTPUT, file_name)
+    mode = "wb" if isinstance(data, bytes) else "w"
+    with open(path, mode) as f:
+        f.write(data)
+    return path
+
+
+def dump_profiles(metrics, profiler, memory_snapshot):
+    """Write the cProfile stats and tracemalloc top lines of a request."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    base = f"{stamp}_{re.sub(r'[^A-Za-z0-9_.-]', '_', metrics.name)}"
+
+    if profiler is not None:
+        stats = pstats.Stats(profiler)
+        # Raw stats in the Profile.dump_stats format (for pstats or
+        # snakeviz), plus a readable summary
+        raw = marshal.dumps(stats.stats)
+        metrics.profiles.append(write_profile(f"{base}.prof", raw))
+        summary = io.StringIO()
+        stats.stream = summary
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+        metrics.profiles.append(write_profile(f"{base}_cpu.txt", summary.getvalue()))
+
+    if memory_snapshot is not None:
+        lines = [
+            str(stat) for stat in memory_snapshot.statistics("lineno")[:PROFILE_TOP_N]
+        ]
+        metrics.profiles.append(
+            write_profile(f"{base}_memory.txt", "\n".join(lines) + "\n")
+        )
+
+
+@contextmanager
+def collect(name, profile=None):
+    """
+    Collect the metrics of one file's ingest, optionally profiling it.
+
+    Metrics recorded through stage() and count() in this thread go to the
+    yielded RequestMetrics, which is added to the /metrics totals on exit.
+    Args:
+        name (str): File being ingested.
+        profile (str): Profile modes for this request (see profile_modes),
+            added to PROFILE_MODE.
+    """
+    metrics = RequestMetrics(name)
+    token = _current.set(metrics)
+    modes = profile_modes(PROFILE_MODE) | profile_modes(profile)
+    profiling = bool(modes) and _profile_lock.acquire(blocking=False)
+    if modes and not profiling:
+        logging.info(f"Not profiling {name}: another request is being profiled")
+
+    profiler = None
+    tracing = False
+    if profiling:
+        if "memory" in modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracing = True
+        if "cpu" in modes:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+    failed = True
+    try:
+        yield metrics
+        failed = False
+    finally:
+        metrics.finish()
+        snapshot = None
+        if profiler is not None:
+            profiler.disable()
+        if tracing:
+            snapshot = tracemalloc.take_snapshot()
+            metrics.counters["python_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if profiling:
+            try:
+                dump_profiles(metrics, profiler, snapshot)
+            except Exception:
+                logging.exception(f"Failed to write profiles for {name}")
+            finally:
+                _profile_lock.release()
+        _current.reset(token)
+        record(metrics, failed)
+
+
+def record(metrics, failed=False):
+    """Add a finished request's metrics to the process totals."""
+    with _totals_lock:
+        _totals["requests"] += 1
+        _totals["errors"] += int(failed)
+        for name, entry in metrics.stages.items():
+            total = _totals["stages"].setdefault(name, {"seconds": 0.0, "calls": 0})
+            total["seconds"] += entry["seconds"]
+            total["calls"] += entry["calls"]
+        for name, value in metrics.counters.items():
+            if name == "python_peak_bytes":
+                continue
+            _totals["counters"][name] = _totals["counters"].get(name, 0) + value
+        _totals["last"][metrics.name] = metrics.to_dict()
+
+
+def totals():
+    """Totals since the process started, for the /metrics endpoint."""
+    with _totals_lock:
+        return {
+            "uptime_seconds": round(time.time() - _started, 1),
+            "requests": _totals["requests"],
+            "errors": _totals["errors"],
+            "stages": {
+                name: {**total, "seconds": round(total["seconds"], 3)}
+                for name, total in _totals["stages"].items()
+            },
+            "counters": dict(_totals["counters"]),
+            "rss_mb": rss_mb(),
+            "peak_rss_mb": peak_rss_mb(),
+            "last": dict(_totals["last"]),
+        }
@@ -1,29 +1,92 @@
 import re
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import io
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 
 
+# Arrow value types for BigQuery scalar field types
+ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INTEGER": pa.int64(),
+    "DATE": pa.date32(),
+}
+
+
+# Patterns used by to_snake_case, compiled once
+CLINVAR_PATTERN = re.compile(r"clinvar", flags=re.IGNORECASE)
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[^a-zA-Z0-9]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+CAMEL_CASE_PATTERN = re.compile(r"([a-z0-9])([A-Z])")
+
+
+@lru_cache(maxsize=4096)
 def to_snake_case(s):
-    """Convert a string to snake_case."""
+    """Convert a string to snake_case. Results are cached per header."""
     # Case-insensitive replacement of clinvar with Clinvar
-    s = re.sub(r"clinvar", "Clinvar", s, flags=re.IGNORECASE)
+    s = CLINVAR_PATTERN.sub("Clinvar", s)
     # Replace any non-alphanumeric characters with spaces
-    s = re.sub(r"[^a-zA-Z0-9]", " ", s)
-    s = re.sub(
-        r"\s+", "_", s.strip()
-    )  # replace multiple spaces with single underscores
-    s = re.sub(r"([a-z0-9])([A-Z])", r"\1_\2", s)  # camelCase → camel_case
+    s = NON_ALPHANUMERIC_PATTERN.sub(" ", s)
+    s = WHITESPACE_PATTERN.sub("_", s.strip())  # replace multiple spaces
+    s = CAMEL_CASE_PATTERN.sub(r"\1_\2", s)  # camelCase → camel_case
     return s.lower()
 
 
+def header_mapping(columns, id_column=None):
+    """
+    Map a whole header row to BigQuery column names.
+    Args:
+        columns (iterable): Raw header names as read from the file.
+        id_column (str): Header renamed to "id"; others become snake_case.
+    Returns:
+        dict: Raw header -> column name.
+    """
+    return dict(cached_header_mapping(tuple(columns), id_column))
+
+
+@lru_cache(maxsize=64)
+def cached_header_mapping(columns, id_column):
+    """Cached body of header_mapping, keyed by the header row tuple."""
+    return tuple(
+        (col, "id" if col.strip() == id_column else to_snake_case(col))
+        for col in columns
+    )
+
+
+# Date layouts parsed with a fixed format before falling back to flexible
+# parsing: ISO dates (HGNC, most sources) and organization_summary.txt's
+# "date last submitted" (e.g. "Jun 26, 2025")
+# pandas.read_csv options shared by the whole-file and batched TSV readers,
+# so a file loads the same values either way. Every column is read as text
+# (empty cells and the default NA markers as NaN) so that each batch infers
+# the same types; schema columns are coerced explicitly in prepare_tsv_frame.
+TSV_READ_OPTIONS = {"sep": "\t", "dtype": str, "keep_default_na": True}
+
+DATE_FORMATS = ("%Y-%m-%d", "%b %d, %Y")
+
+
+@lru_cache(maxsize=65536)
 def convert_to_bigquery_date(date_value):
     """
     Convert various date formats to BigQuery DATE format (YYYY-MM-DD).
     Returns None for invalid/empty dates to allow pandas to_datetime to handle as NaT.
+    Strings in DATE_FORMATS are parsed with strptime; anything else goes
+    through pd.to_datetime. Results are cached, since dates repeat heavily.
     """
     if pd.isna(date_value) or date_value == "" or str(date_value).strip() == "":
         return None
 
+    if isinstance(date_value, str):
+        for date_format in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(date_value.strip(), date_format)
+                return parsed.strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+
     try:
         parsed_date = pd.to_datetime(date_value, errors="raise")
         if pd.isna(parsed_date):
@@ -33,6 +96,95 @@ def convert_to_bigquery_date(date_value):
         return None
 
 
+def parse_dates(values):
+    """
+    Parse distinct date values to datetime64, trying DATE_FORMATS first.
+    Args:
+        values (pd.Series): Distinct, non-null values of a DATE column.
+    Returns:
+        pd.Series: datetime64 values aligned with values, NaT if unparseable.
+    """
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    is_text = np.array([isinstance(value, str) for value in values], dtype=bool)
+    text = values[is_text].str.strip()
+    remaining = pd.Series(True, index=values.index)
+    remaining[text.index[text == ""]] = False
+
+    # Each fixed format is one vectorized pass over the still-unparsed text
+    for date_format in DATE_FORMATS:
+        pending = text[remaining[text.index].to_numpy()]
+        if pending.empty:
+            break
+        attempt = pd.to_datetime(pending, format=date_format, errors="coerce")
+        matched = attempt.dropna()
+        parsed[matched.index] = matched
+        remaining[matched.index] = False
+
+    # Flexible parsing only for the leftovers
+    if remaining.any():
+        leftovers = values[remaining].map(convert_to_bigquery_date)
+        parsed[leftovers.index] = pd.to_datetime(
+            leftovers, format="%Y-%m-%d", errors="coerce"
+        )
+    return parsed
+
+
+def coerce_dates(values):
+    """
+    Convert a Series of date strings to datetime.date objects in one pass.
+    Blank and unparseable values become NaT, as with convert_to_bigquery_date.
+    Each distinct value is parsed once and the results broadcast back.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = parse_dates(pd.Series(uniques, dtype=object))
+    dates = parsed.dt.date.astype(object).where(parsed.notna(), pd.NaT).to_numpy()
+    # code -1 (missing value) picks the trailing NaT
+    dates = np.append(dates, pd.NaT)[codes]
+    return pd.Series(dates, index=values.index, name=values.name, dtype=object)
+
+
+def split_repeated(series, delimiter):
+    """
+    Split delimited cells of a REPEATED column into a flat Series of items.
+    Args:
+        series (pd.Series): Column of delimited strings.
+        delimiter (str): Item separator.
+    Returns:
+        tuple: (items, lengths) where items holds the stripped items of all
+        rows in order and lengths holds the item count of each row. Blank
+        cells have no items.
+    """
+    text = series.fillna("").astype(str)
+    present = text.str.strip() != ""
+    parts = text[present].str.split(delimiter, regex=False)
+
+    lengths = np.zeros(len(series), dtype=np.int64)
+    lengths[present.to_numpy()] = parts.str.len().to_numpy()
+
+    items = parts.explode().astype(str).str.strip().reset_index(drop=True)
+    return items, lengths
+
+
+def regroup_repeated(items, lengths):
+    """Rebuild per-row lists from the flat items produced by split_repeated."""
+    flat = items.tolist()
+    ends = np.cumsum(lengths)
+    return [flat[end - length : end] for end, length in zip(ends, lengths)]
+
+
+def iter_batches(iterable, batch_size):
+    """
+    Yield successive lists of at most batch_size items from iterable.
+    Only one batch is held in memory at a time.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
 def process_tsv_data(tsv_data, table_config):
     """
     Process TSV data string into a DataFrame based on table configuration.
@@ -43,26 +195,52 @@ def process_tsv_data(tsv_data, table_config):
     Returns:
         pd.DataFrame: Processed DataFrame ready for BigQuery.
     """
+    df = pd.read_csv(io.StringIO(tsv_data), **TSV_READ_OPTIONS)
+    return prepare_tsv_frame(df, table_config)
+
+
+def iter_tsv_batches(stream, table_config, batch_rows):
+    """
+    Read TSV data from a file-like object in bounded batches.
+    Args:
+        stream: Binary or text file-like object positioned at the header row.
+        table_config (dict): Table configuration (see process_tsv_data).
+        batch_rows (int): Maximum number of rows per yielded DataFrame.
+    Yields:
+        pd.DataFrame: Processed DataFrame for each batch of rows.
+    """
+    reader = pd.read_csv(stream, chunksize=batch_rows, **TSV_READ_OPTIONS)
+    for chunk in reader:
+        yield prepare_tsv_frame(chunk, table_config)
+
+
+def prepare_tsv_frame(df, table_config):
+    """
+    Rename and coerce the columns of a raw TSV DataFrame for BigQuery.
+    Args:
+        df (pd.DataFrame): DataFrame as read from the TSV file.
+        table_config (dict): Table configuration (see process_tsv_data).
+    Returns:
+        pd.DataFrame: Processed DataFrame ready for BigQuery.
+    """
     id_column = table_config.get("id_column")
     schema = table_config.get("schema", [])
     delimiter = table_config.get("delimiter", ",")
 
-    df = pd.read_csv(io.StringIO(tsv_data), sep="\t")
-
-    # Rename columns: id_column -> 'id', others to snake_case
-    renamed_columns = {}
-    for col in df.columns:
-        if col.strip() == id_column:
-            renamed_columns[col] = "id"
-        else:
-            renamed_columns[col] = to_snake_case(col)
+    # Rename columns: id_column -> 'id', others to snake_case. Use the
+    # table's precomputed mapping when the file has the expected layout.
+    renamed_columns = table_config.get("column_map") or {}
+    if not set(df.columns) <= renamed_columns.keys():
+        renamed_columns = header_mapping(df.columns, id_column)
     df.rename(columns=renamed_columns, inplace=True)
 
     # Convert 'id' to STRING
     if "id" in df.columns:
         df["id"] = df["id"].astype(str)
 
-    # Process each column based on its schema definition
+    # Process each column based on its schema definition. Every conversion
+    # works on whole columns; REPEATED columns are split and exploded into one
+    # flat Series of items, converted in a single pass, then regrouped.
     for field in schema:
         col_name = field.name
         if col_name not in df.columns:
@@ -71,47 +249,27 @@ def process_tsv_data(tsv_data, table_config):
         is_repeated = hasattr(field, "mode") and field.mode == "REPEATED"
 
         if is_repeated:
-            # First split REPEATED columns using the configured delimiter
-            df[col_name] = (
-                df[col_name]
-                .fillna("")
-                .apply(
-                    lambda x: [s.strip() for s in str(x).split(delimiter)]
-                    if str(x).strip()
-                    else []
-                )
-            )
+            items, lengths = split_repeated(df[col_name], delimiter)
 
-            # Then apply type conversion to each element in the REPEATED column
             if field.field_type == "DATE":
-                df[col_name] = df[col_name].apply(
-                    lambda x: [convert_to_bigquery_date(item) for item in x]
-                    if x
-                    else []
-                )
-                # Convert each date string to date object
-                df[col_name] = df[col_name].apply(
-                    lambda x: [
-                        pd.to_datetime(item, errors="coerce").date() if item else None
-                        for item in x
-                    ]
-                    if x
-                    else []
-                )
+                dates = coerce_dates(items)
+                items = dates.astype(object).where(dates.notna(), None)
             elif field.field_type == "INTEGER":
-                df[col_name] = df[col_name].apply(
-                    lambda x: [pd.to_numeric(item, errors="coerce") for item in x]
-                    if x
-                    else []
+                numbers = pd.to_numeric(
+                    items, errors="coerce", dtype_backend="numpy_nullable"
                 )
-            # STRING REPEATED columns are already processed (split into list of strings)
+                items = numbers.astype(object).where(numbers.notna(), np.nan)
+            # STRING REPEATED items are already stripped strings
+
+            df[col_name] = pd.Series(
+                regroup_repeated(items, lengths), index=df.index, dtype=object
+            )
 
         else:
             # Process non-REPEATED columns
             if field.field_type == "DATE":
-                df[col_name] = df[col_name].apply(convert_to_bigquery_date)
                 # Convert to date objects for PyArrow compatibility
-                df[col_name] = pd.to_datetime(df[col_name], errors="coerce").dt.date
+                df[col_name] = coerce_dates(df[col_name])
             elif field.field_type == "INTEGER":
                 # Convert to nullable integer type to handle NaN values properly
                 df[col_name] = pd.to_numeric(df[col_name], errors="coerce").astype(
@@ -122,3 +280,51 @@ def process_tsv_data(tsv_data, table_config):
                 df[col_name] = df[col_name].replace("", None)
 
     return df
+
+
+def arrow_field(field):
+    """Convert a BigQuery SchemaField into a pyarrow field."""
+    if field.field_type == "RECORD":
+        value_type = pa.struct([arrow_field(f) for f in field.fields])
+    else:
+        value_type = ARROW_TYPES[field.field_type]
+    if getattr(field, "mode", None) == "REPEATED":
+        value_type = pa.list_(value_type)
+    return pa.field(field.name, value_type)
+
+
+def arrow_schema(schema):
+    """Convert a list of BigQuery SchemaFields into a pyarrow schema."""
+    return pa.schema([arrow_field(field) for field in schema])
+
+
+def records_to_arrow(records, schema):
+    """
+    Build a pyarrow Table directly from a list of row dicts.
+    DATE values are expected as ISO "YYYY-MM-DD" strings, as in the HGNC docs.
+    Args:
+        records (list): Row dicts keyed by column name.
+        schema (list): BigQuery SchemaFields describing the columns.
+    Returns:
+        pa.Table: Table typed according to schema.
+    """
+    target = arrow_schema(schema)
+    # Read DATE columns as strings first, then cast them in one pass
+    source = pa.schema(
+        [pa.field(f.name, pa.string()) if f.type == pa.date32() else f for f in target]
+    )
+    table = pa.Table.from_pylist(records, schema=source)
+    return table.cast(target)
+
+
+def dataframe_to_arrow(df, schema):
+    """
+    Convert a processed DataFrame into a pyarrow Table typed by schema.
+    Columns that are not in the schema are dropped.
+    """
+    fields = [field for field in schema if field.name in df.columns]
+    return pa.Table.from_pandas(
+        df[[field.name for field in fields]],
+        schema=arrow_schema(fields),
+        preserve_index=False,
+    )
@@ -0,0 +1,193 @@
+"""
+Benchmark process_tsv_data against the previous row-wise implementation.
+
+Generates synthetic ncbi_gene.txt and organization_summary.txt style data,
+checks that both implementations produce the same values, and reports the
+time taken by each.
+
+Usage:
+    python tests/benchmark_process_tsv.py [--rows 200000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from utils import (  # noqa: E402
+    convert_to_bigquery_date,
+    process_tsv_data,
+    to_snake_case,
+)
+
+SchemaField = namedtuple("SchemaField", ["name", "field_type", "mode"])
+
+# One column for every type/mode combination used in TABLE_CONFIGS
+BENCH_SCHEMA = [
+    SchemaField("id", "STRING", "NULLABLE"),
+    SchemaField("symbol", "STRING", "NULLABLE"),
+    SchemaField("synonyms", "STRING", "REPEATED"),
+    SchemaField("submissions", "INTEGER", "NULLABLE"),
+    SchemaField("pubmed_ids", "INTEGER", "REPEATED"),
+    SchemaField("date_last_submitted", "DATE", "NULLABLE"),
+    SchemaField("dates_modified", "DATE", "REPEATED"),
+]
+
+DATE_FORMATS = ["%b %d, %Y", "%Y-%m-%d"]
+
+
+def legacy_process_tsv_data(tsv_data, table_config):
+    """The row-wise implementation process_tsv_data replaced."""
+    import io
+
+    id_column = table_config.get("id_column")
+    schema = table_config.get("schema", [])
+    delimiter = table_config.get("delimiter", ",")
+
+    df = pd.read_csv(io.StringIO(tsv_data), sep="\t")
+    renamed_columns = {}
+    for col in df.columns:
+        if col.strip() == id_column:
+            renamed_columns[col] = "id"
+        else:
+            renamed_columns[col] = to_snake_case(col)
+    df.rename(columns=renamed_columns, inplace=True)
+    if "id" in df.columns:
+        df["id"] = df["id"].astype(str)
+
+    for field in schema:
+        col_name = field.name
+        if col_name not in df.columns:
+            continue
+        if field.mode == "REPEATED":
+            df[col_name] = (
+                df[col_name]
+                .fillna("")
+                .apply(
+                    lambda x: (
+                        [s.strip() for s in str(x).split(delimiter)]
+                        if str(x).strip()
+                        else []
+                    )
+                )
+            )
+            if field.field_type == "DATE":
+                df[col_name] = df[col_name].apply(
+                    lambda x: (
+                        [convert_to_bigquery_date(item) for item in x] if x else []
+                    )
+                )
+                df[col_name] = df[col_name].apply(
+                    lambda x: (
+                        [
+                            pd.to_datetime(item, errors="coerce").date()
+                            if item
+                            else None
+                            for item in x
+                        ]
+                        if x
+                        else []
+                    )
+                )
+            elif field.field_type == "INTEGER":
+                df[col_name] = df[col_name].apply(
+                    lambda x: (
+                        [pd.to_numeric(item, errors="coerce") for item in x]
+                        if x
+                        else []
+                    )
+                )
+        else:
+            if field.field_type == "DATE":
+                df[col_name] = df[col_name].apply(convert_to_bigquery_date)
+                df[col_name] = pd.to_datetime(df[col_name], errors="coerce").dt.date
+            elif field.field_type == "INTEGER":
+                df[col_name] = pd.to_numeric(df[col_name], errors="coerce").astype(
+                    "Int64"
+                )
+            elif field.field_type == "STRING":
+                df[col_name] = df[col_name].replace("", None)
+    return df
+
+
+def random_date(rng):
+    day = pd.Timestamp("2015-01-01") + pd.Timedelta(days=rng.randrange(3650))
+    return day.strftime(rng.choice(DATE_FORMATS))
+
+
+def make_tsv(rows, seed=42):
+    """Build a TSV string with realistic amounts of blank and repeated values."""
+    rng = random.Random(seed)
+    lines = [
+        "GeneID\tSymbol\tSynonyms\tSubmissions\tPubmed IDs\t"
+        "date last submitted\tdates modified"
+    ]
+    for i in range(rows):
+        synonyms = "|".join(
+            f"SYN{rng.randrange(50000)}" for _ in range(rng.randrange(4))
+        )
+        pubmed = "|".join(
+            str(rng.randrange(1, 40000000)) for _ in range(rng.randrange(5))
+        )
+        modified = "|".join(random_date(rng) for _ in range(rng.randrange(3)))
+        submitted = random_date(rng) if rng.random() > 0.1 else ""
+        count = str(rng.randrange(10000)) if rng.random() > 0.1 else ""
+        lines.append(
+            f"{i}\tGENE{i}\t{synonyms}\t{count}\t{pubmed}\t{submitted}\t{modified}"
+        )
+    return "\n".join(lines)
+
+
+def assert_same(expected, actual):
+    """Compare two processed frames cell by cell, treating all nulls as equal."""
+    assert list(expected.columns) == list(actual.columns)
+    for col in expected.columns:
+        for i, (a, b) in enumerate(zip(expected[col], actual[col])):
+            if isinstance(a, list):
+                assert len(a) == len(b), (col, i, a, b)
+                for x, y in zip(a, b):
+                    assert (pd.isna(x) and pd.isna(y)) or x == y, (col, i, a, b)
+            else:
+                assert (pd.isna(a) and pd.isna(b)) or a == b, (col, i, a, b)
+
+
+def time_call(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tsv_data = make_tsv(args.rows)
+    table_config = {"id_column": "GeneID", "schema": BENCH_SCHEMA, "delimiter": "|"}
+
+    legacy_time, legacy_df = time_call(
+        lambda: legacy_process_tsv_data(tsv_data, table_config), args.repeat
+    )
+    current_time, current_df = time_call(
+        lambda: process_tsv_data(tsv_data, table_config), args.repeat
+    )
+    assert_same(legacy_df, current_df)
+
+    print(f"rows:      {args.rows}")
+    print(f"row-wise:  {legacy_time:.2f}s")
+    print(f"current:   {current_time:.2f}s")
+    print(f"speedup:   {legacy_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
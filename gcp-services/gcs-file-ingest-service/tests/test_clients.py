@@ -0,0 +1,71 @@
+import threading
+import unittest
+from unittest import mock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# clients.py needs the Google Cloud client libraries, skip if missing
+try:
+    import clients  # noqa: E402
+
+    CLIENTS_AVAILABLE = True
+except ImportError:
+    CLIENTS_AVAILABLE = False
+
+
+@unittest.skipUnless(CLIENTS_AVAILABLE, "Google Cloud libraries not installed")
+class TestSharedClients(unittest.TestCase):
+    def setUp(self):
+        clients._storage_client = None
+        clients._bigquery_client = None
+        self.addCleanup(setattr, clients, "_storage_client", None)
+        self.addCleanup(setattr, clients, "_bigquery_client", None)
+
+        credentials = mock.Mock()
+        patcher = mock.patch.object(
+            clients.google.auth, "default", return_value=(credentials, "proj")
+        )
+        self.auth_default = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_build_session_sizes_pool(self):
+        session, project = clients.build_session(("scope",), pool_size=7)
+
+        self.assertEqual(project, "proj")
+        adapter = session.get_adapter("https://storage.googleapis.com")
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter._pool_connections, 7)
+
+    def test_storage_client_created_once_across_threads(self):
+        results = []
+        with mock.patch.object(clients.storage, "Client") as client_cls:
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(clients.get_storage_client())
+                )
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        client_cls.assert_called_once()
+        self.assertEqual(client_cls.call_args.kwargs["project"], "proj")
+        self.assertIsNotNone(client_cls.call_args.kwargs["_http"])
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_bigquery_client_reused(self):
+        with mock.patch.object(clients.bigquery, "Client") as client_cls:
+            first = clients.get_bigquery_client()
+            second = clients.get_bigquery_client()
+
+        client_cls.assert_called_once()
+        self.assertIs(first, second)
+        self.auth_default.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
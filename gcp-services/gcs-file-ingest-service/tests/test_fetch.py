@@ -0,0 +1,194 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import fetch  # noqa: E402
+
+BODY = b"".join(b"org_%05d\tsubmitter\n" % i for i in range(5000))
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 06 Jan 2025 10:00:00 GMT"
+
+
+class FtpStandIn(BaseHTTPRequestHandler):
+    """
+    Serves BODY with an ETag and Last-Modified, honouring conditional and
+    Range requests. The server's `plan` list scripts the next responses:
+    an int status to send instead, "cut" to drop the connection half way
+    through the body, "no-range" to ignore a Range header, or "bad-range"
+    to answer a Range request without a Content-Range. With the server's
+    `validators` off, no ETag or Last-Modified is sent.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        action = self.server.plan.pop(0) if self.server.plan else None
+
+        if isinstance(action, int):
+            self.send_response(action)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if (
+            self.headers.get("If-None-Match") == ETAG
+            or self.headers.get("If-Modified-Since") == LAST_MODIFIED
+        ):
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and action != "no-range":
+            if self.headers.get("If-Range") in (None, ETAG, LAST_MODIFIED):
+                start = int(range_header.split("=")[1].rstrip("-"))
+        body = BODY[start:]
+
+        self.send_response(206 if start else 200)
+        if self.server.validators:
+            self.send_header("ETag", ETAG)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        if start and action != "bad-range":
+            content_range = f"bytes {start}-{len(BODY) - 1}/{len(BODY)}"
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+        if action == "cut":
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        self.wfile.write(body)
+
+
+class TestFetchUrl(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FtpStandIn)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/organization_summary.txt"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.plan = []
+        self.server.validators = True
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "organization_summary.txt")
+        # No real waiting between retries
+        patcher = mock.patch.object(fetch.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_body(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_fetch_streams_body_and_returns_validators(self):
+        result = fetch.fetch_url(self.url, self.path)
+
+        self.assertEqual(result["status"], "fetched")
+        self.assertEqual(result["bytes"], len(BODY))
+        self.assertEqual(result["etag"], ETAG)
+        self.assertEqual(result["last_modified"], LAST_MODIFIED)
+        self.assertEqual(self.read_body(), BODY)
+        self.assertNotIn("If-None-Match", self.server.requests[0])
+
+    def test_unchanged_file_is_not_downloaded(self):
+        result = fetch.fetch_url(self.url, self.path, etag=ETAG)
+
+        self.assertEqual(result["status"], "not_modified")
+        self.assertEqual(self.server.requests[0]["If-None-Match"], ETAG)
+        self.assertEqual(self.read_body(), b"")
+
+        result = fetch.fetch_url(self.url, self.path, last_modified=LAST_MODIFIED)
+        self.assertEqual(result["status"], "not_modified")
+
+    def test_changed_file_is_downloaded(self):
+        result = fetch.fetch_url(self.url, self.path, etag='"v0"')
+
+        self.assertEqual(result["status"], "fetched")
+        self.assertEqual(self.read_body(), BODY)
+
+    def test_retries_retryable_status_with_backoff(self):
+        self.server.plan = [503, 429]
+        result = fetch.fetch_url(self.url, self.path, backoff=0.5)
+
+        self.assertEqual(result["attempts"], 3)
+        self.assertEqual(self.read_body(), BODY)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_gives_up_after_retries(self):
+        self.server.plan = [503, 503, 503]
+        with self.assertRaises(urllib.error.HTTPError):
+            fetch.fetch_url(self.url, self.path, retries=2)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_error_is_not_retried(self):
+        self.server.plan = [404]
+        with self.assertRaises(urllib.error.HTTPError):
+            fetch.fetch_url(self.url, self.path)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_dropped_download_resumes_with_range(self):
+        self.server.plan = ["cut"]
+        result = fetch.fetch_url(self.url, self.path)
+
+        self.assertEqual(result["attempts"], 2)
+        self.assertEqual(self.read_body(), BODY)
+        resumed = self.server.requests[1]
+        self.assertEqual(resumed["Range"], f"bytes={len(BODY) // 2}-")
+        self.assertEqual(resumed["If-Range"], ETAG)
+        self.assertNotIn("If-None-Match", resumed)
+
+    def test_restarts_when_range_is_ignored(self):
+        self.server.plan = ["cut", "no-range"]
+        result = fetch.fetch_url(self.url, self.path)
+
+        self.assertEqual(result["bytes"], len(BODY))
+        self.assertEqual(self.read_body(), BODY)
+
+    def test_restarts_when_content_range_is_missing(self):
+        self.server.plan = ["cut", "bad-range"]
+        result = fetch.fetch_url(self.url, self.path)
+
+        self.assertEqual(result["attempts"], 3)
+        self.assertEqual(self.read_body(), BODY)
+        self.assertIn("Range", self.server.requests[1])
+        self.assertNotIn("Range", self.server.requests[2])
+
+    def test_restarts_without_range_when_no_validator(self):
+        self.server.validators = False
+        self.server.plan = ["cut"]
+        result = fetch.fetch_url(self.url, self.path)
+
+        self.assertEqual(result["attempts"], 2)
+        self.assertEqual(self.read_body(), BODY)
+        self.assertNotIn("Range", self.server.requests[1])
+
+    def test_backoff_delay(self):
+        self.assertEqual(fetch.backoff_delay(3, 1.0, retry_after="7"), 7.0)
+        delay = fetch.backoff_delay(3, 1.0)
+        self.assertGreaterEqual(delay, 4.0)
+        self.assertLessEqual(delay, 6.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,447 @@
+import io
+import json
+import threading
+import unittest
+from unittest import mock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# main.py needs the Flask and Google Cloud client libraries, skip if missing
+try:
+    import main  # noqa: E402
+
+    MAIN_AVAILABLE = True
+except ImportError:
+    MAIN_AVAILABLE = False
+
+SKOS = "http://www.w3.org/2004/02/skos/core#"
+
+OBO_DOCUMENT = {
+    "graphs": [
+        {
+            "id": "http://purl.obolibrary.org/obo/mondo.owl",
+            "meta": {"version": "2025-01-01"},
+            "nodes": [
+                {
+                    "id": "http://purl.obolibrary.org/obo/MONDO_0000001",
+                    "lbl": "disease",
+                    "type": "CLASS",
+                    "meta": {
+                        "definition": {"val": "A disease.", "xrefs": ["NCIT:C2991"]},
+                        "synonyms": [{"pred": "hasExactSynonym", "val": "illness"}],
+                        "basicPropertyValues": [
+                            {"pred": SKOS + "exactMatch", "val": "DOID:4"},
+                            {"pred": "http://purl.org/dc/terms/conformsTo", "val": "x"},
+                            {"pred": SKOS + "closeMatch", "val": "NCIT:C2991"},
+                        ],
+                    },
+                },
+                {"id": "http://purl.obolibrary.org/obo/MONDO_0000002", "lbl": "x"},
+                {"id": "http://purl.obolibrary.org/obo/MONDO_0000003"},
+                {"id": "http://purl.obolibrary.org/obo/HP_0000001", "lbl": "All"},
+                {"lbl": "no id"},
+            ],
+            "edges": [
+                {
+                    "sub": "http://purl.obolibrary.org/obo/MONDO_0000002",
+                    "pred": "is_a",
+                    "obj": "http://purl.obolibrary.org/obo/MONDO_0000001",
+                }
+            ],
+            "logicalDefinitionAxioms": [],
+        }
+    ]
+}
+
+
+@unittest.skipUnless(MAIN_AVAILABLE, "main.py dependencies not installed")
+class TestJsonNodeExtraction(unittest.TestCase):
+    def test_iter_json_nodes_mondo(self):
+        stream = io.BytesIO(json.dumps(OBO_DOCUMENT).encode("utf-8"))
+        rows = list(main.iter_json_nodes(stream, "mondo.json"))
+
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "id": "MONDO:0000001",
+                    "lbl": "disease",
+                    "skos_matches": [
+                        {"relation": "exactMatch", "value": "DOID:4"},
+                        {"relation": "closeMatch", "value": "NCIT:C2991"},
+                    ],
+                },
+                {"id": "MONDO:0000002", "lbl": "x", "skos_matches": []},
+            ],
+        )
+
+    def test_iter_json_nodes_hp(self):
+        stream = io.BytesIO(json.dumps(OBO_DOCUMENT).encode("utf-8"))
+        rows = list(main.iter_json_nodes(stream, "hp.json"))
+
+        self.assertEqual(rows, [{"id": "HP:0000001", "lbl": "All"}])
+
+    def test_iter_json_nodes_reads_first_graph_only(self):
+        document = {
+            "graphs": [
+                {"nodes": [{"id": "HP:0000001", "lbl": "All"}]},
+                {"nodes": [{"id": "HP:0000002", "lbl": "Other graph"}]},
+            ]
+        }
+        stream = io.BytesIO(json.dumps(document).encode("utf-8"))
+        rows = list(main.iter_json_nodes(stream, "hp.json"))
+
+        self.assertEqual(rows, [{"id": "HP:0000001", "lbl": "All"}])
+
+    def test_downloaded_json_matches_streaming(self):
+        data = json.dumps(OBO_DOCUMENT).encode("utf-8")
+        storage_client = mock.Mock()
+        blob = storage_client.bucket().blob()
+        blob.download_as_bytes.return_value = data
+        blob.open.side_effect = lambda *args, **kwargs: io.BytesIO(data)
+        loaded = {}
+
+        def load_batches(batches, table_name, schema=None):
+            loaded[main.STREAMING_MODE] = [
+                row for df in batches for row in df.to_dict("records")
+            ]
+            return "loaded"
+
+        with (
+            mock.patch.object(main, "ARROW_LOAD", False),
+            mock.patch.object(main, "get_storage_client", return_value=storage_client),
+            mock.patch.object(main, "load_batches_to_bigquery", load_batches),
+        ):
+            for streaming in (False, True):
+                with mock.patch.object(main, "STREAMING_MODE", streaming):
+                    main.process_json_from_gcs("b", "mondo.json", "mondo_terms")
+
+        self.assertEqual(len(loaded[False]), 2)
+        self.assertEqual(loaded[False], loaded[True])
+
+
+@unittest.skipUnless(MAIN_AVAILABLE, "main.py dependencies not installed")
+class TestChangeDetection(unittest.TestCase):
+    EVENT = {
+        "bucket": "external-dataset-ingest",
+        "name": "hgnc_gene.json",
+        "generation": "1718000000000000",
+        "md5Hash": "XrY7u+Ae7tCTyyK7j1rNww==",
+        "crc32c": "yZRlqg==",
+    }
+
+    def setUp(self):
+        patcher = mock.patch.object(main, "SKIP_UNCHANGED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_manifest_is_not_used_when_detection_is_off(self):
+        with (
+            mock.patch.object(main, "SKIP_UNCHANGED", False),
+            mock.patch.object(main, "get_last_load") as get_last_load,
+            mock.patch.object(
+                main, "process_hgnc_from_gcs", return_value="Loaded 3 rows into t"
+            ),
+            mock.patch.object(main, "record_load") as record,
+        ):
+            status, _ = main.ingest_file(
+                self.EVENT["bucket"], self.EVENT["name"], event=self.EVENT
+            )
+
+        self.assertEqual(status, "success")
+        get_last_load.assert_not_called()
+        record.assert_not_called()
+
+    def test_fingerprint_from_event(self):
+        fingerprint = main.get_blob_fingerprint("b", "hgnc_gene.json", self.EVENT)
+        self.assertEqual(
+            fingerprint,
+            {
+                "generation": 1718000000000000,
+                "md5_hash": "XrY7u+Ae7tCTyyK7j1rNww==",
+                "crc32c": "yZRlqg==",
+            },
+        )
+
+    def test_is_unchanged(self):
+        fingerprint = {"generation": 2, "md5_hash": "a", "crc32c": "c"}
+        self.assertTrue(
+            main.is_unchanged(
+                fingerprint, {"generation": 1, "md5_hash": "a", "crc32c": "c"}
+            )
+        )
+        self.assertFalse(
+            main.is_unchanged(
+                fingerprint, {"generation": 2, "md5_hash": "b", "crc32c": "c"}
+            )
+        )
+        # Composite objects have no md5; crc32c alone decides
+        self.assertTrue(
+            main.is_unchanged(
+                {"md5_hash": None, "crc32c": "c"}, {"md5_hash": "a", "crc32c": "c"}
+            )
+        )
+        self.assertFalse(main.is_unchanged(fingerprint, None))
+        self.assertFalse(main.is_unchanged({"md5_hash": None, "crc32c": None}, {}))
+
+    def test_ingest_file_skips_unchanged(self):
+        last_load = {"generation": 1, "md5_hash": self.EVENT["md5Hash"], "crc32c": None}
+        with (
+            mock.patch.object(main, "get_last_load", return_value=last_load),
+            mock.patch.object(main, "process_hgnc_from_gcs") as process,
+        ):
+            status, message = main.ingest_file(
+                self.EVENT["bucket"], self.EVENT["name"], event=self.EVENT
+            )
+
+        self.assertEqual(status, "skipped")
+        self.assertTrue(message.startswith("skipped: unchanged"))
+        process.assert_not_called()
+
+    def test_ingest_file_force_reloads_and_records(self):
+        last_load = {"generation": 1, "md5_hash": self.EVENT["md5Hash"], "crc32c": None}
+        with (
+            mock.patch.object(main, "get_last_load", return_value=last_load),
+            mock.patch.object(
+                main, "process_hgnc_from_gcs", return_value="Loaded 3 rows into t"
+            ),
+            mock.patch.object(main, "record_load") as record,
+        ):
+            status, _ = main.ingest_file(
+                self.EVENT["bucket"], self.EVENT["name"], event=self.EVENT, force=True
+            )
+
+        self.assertEqual(status, "success")
+        record.assert_called_once()
+        self.assertEqual(record.call_args.args[0], "hgnc_gene")
+
+    def test_organization_summary_skipped_when_not_modified(self):
+        last_load = {"etag": '"v1"', "last_modified": None}
+        not_modified = {
+            "status": "not_modified",
+            "bytes": 0,
+            "etag": '"v1"',
+            "last_modified": None,
+        }
+        with (
+            mock.patch.object(main, "get_last_load", return_value=last_load),
+            mock.patch.object(main, "fetch_url", return_value=not_modified) as fetch,
+            mock.patch.object(main, "write_table") as write,
+        ):
+            status, message = main.ingest_file("b", "organization_summary.txt")
+
+        self.assertEqual(status, "skipped")
+        self.assertTrue(message.startswith("skipped: unchanged"))
+        self.assertEqual(fetch.call_args.kwargs["etag"], '"v1"')
+        write.assert_not_called()
+
+    def test_organization_summary_records_validators(self):
+        tsv = "\t".join(main.TABLE_CONFIGS["submitter_organization"]["headers"])
+
+        def fetch_url(url, path, etag=None, last_modified=None):
+            with open(path, "w") as f:
+                f.write(tsv + "\n")
+            return {
+                "status": "fetched",
+                "bytes": len(tsv) + 1,
+                "etag": '"v2"',
+                "last_modified": "x",
+            }
+
+        with (
+            mock.patch.object(main, "STREAMING_MODE", False),
+            mock.patch.object(main, "get_last_load") as get_last_load,
+            mock.patch.object(main, "fetch_url", side_effect=fetch_url),
+            mock.patch.object(main, "write_table", return_value="Loaded 0 rows into t"),
+            mock.patch.object(main, "record_load") as record,
+        ):
+            status, _ = main.ingest_file("b", "organization_summary.txt", force=True)
+
+        self.assertEqual(status, "success")
+        get_last_load.assert_not_called()
+        table_name, source_uri, fingerprint = record.call_args.args
+        self.assertEqual(table_name, "submitter_organization")
+        self.assertEqual(source_uri, main.CLINVAR_ORG_SUMMARY_URL)
+        self.assertEqual(fingerprint["etag"], '"v2"')
+
+
+@unittest.skipUnless(MAIN_AVAILABLE, "main.py dependencies not installed")
+class TestMergeMode(unittest.TestCase):
+    def make_client(self, dml_stats):
+        client = mock.Mock()
+        client.get_table.return_value.schema = [
+            main.bigquery.SchemaField("id", "STRING"),
+            main.bigquery.SchemaField("symbol", "STRING"),
+            main.bigquery.SchemaField("synonyms", "STRING", mode="REPEATED"),
+        ]
+        client.query.return_value.dml_stats = dml_stats
+        return client
+
+    def test_merge_from_staging(self):
+        stats = mock.Mock(
+            inserted_row_count=2, updated_row_count=1, deleted_row_count=3
+        )
+        client = self.make_client(stats)
+
+        counts = main.merge_from_staging(
+            client, "ncbi_gene", "p.d.ncbi_gene_staging", "p.d.ncbi_gene"
+        )
+
+        self.assertEqual(counts, {"inserted": 2, "updated": 1, "deleted": 3})
+        query = client.query.call_args.args[0]
+        self.assertIn("MERGE `p.d.ncbi_gene` T", query)
+        self.assertIn("USING `p.d.ncbi_gene_staging` S", query)
+        self.assertIn("ON T.id = S.id", query)
+        self.assertIn("UPDATE SET symbol = S.symbol, synonyms = S.synonyms", query)
+        self.assertIn("WHEN NOT MATCHED BY SOURCE THEN", query)
+
+    def test_merge_from_staging_missing_target(self):
+        client = self.make_client(None)
+        client.get_table.side_effect = main.NotFound("missing")
+
+        counts = main.merge_from_staging(
+            client, "ncbi_gene", "p.d.ncbi_gene_staging", "p.d.ncbi_gene"
+        )
+
+        self.assertIsNone(counts)
+        client.query.assert_not_called()
+
+    def test_load_batches_merge_mode_reports_counts(self):
+        stats = mock.Mock(
+            inserted_row_count=1, updated_row_count=0, deleted_row_count=0
+        )
+        client = self.make_client(stats)
+
+        with (
+            mock.patch.object(main, "WRITE_MODE", "merge"),
+            mock.patch.object(main, "load_to_bigquery"),
+            mock.patch.object(main, "get_bigquery_client", return_value=client),
+        ):
+            message = main.write_table([{"id": "1"}], "ncbi_gene")
+
+        self.assertTrue(message.startswith("Loaded 1 rows into"))
+        self.assertIn("1 inserted, 0 updated, 0 deleted", message)
+        client.copy_table.assert_not_called()
+        client.delete_table.assert_called_once()
+
+    def test_staging_table_is_unique_and_dropped_on_failure(self):
+        client = self.make_client(None)
+        load = mock.Mock(side_effect=[None, RuntimeError("load failed")])
+
+        with (
+            mock.patch.object(main, "load_to_bigquery", load),
+            mock.patch.object(main, "get_bigquery_client", return_value=client),
+        ):
+            main.load_batches_to_bigquery([[{"id": "1"}]], "ncbi_gene")
+            with self.assertRaises(RuntimeError):
+                main.load_batches_to_bigquery([[{"id": "2"}]], "ncbi_gene")
+
+        first, second = (call.args[1] for call in load.call_args_list)
+        self.assertTrue(first.startswith("ncbi_gene_staging_"))
+        self.assertNotEqual(first, second)
+        dropped = [call.args[0] for call in client.delete_table.call_args_list]
+        self.assertEqual(len(dropped), 2)
+        self.assertTrue(dropped[1].endswith(f".{second}"))
+
+
+@unittest.skipUnless(MAIN_AVAILABLE, "main.py dependencies not installed")
+class TestBatchIngest(unittest.TestCase):
+    def test_ingest_files_runs_concurrently(self):
+        # Each call blocks until both files are in flight at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def fake_ingest(bucket_name, file_name, event=None, force=False):
+            barrier.wait()
+            return "success", f"Loaded 1 rows into {file_name}"
+
+        files = [
+            {"bucket": "b", "name": "hgnc_gene.json"},
+            {"bucket": "b", "name": "ncbi_gene.txt"},
+        ]
+        with (
+            mock.patch.object(main, "INGEST_WORKERS", 4),
+            mock.patch.object(main, "ingest_file", side_effect=fake_ingest),
+        ):
+            results = main.ingest_files(files)
+
+        self.assertEqual(
+            [r["name"] for r in results], ["hgnc_gene.json", "ncbi_gene.txt"]
+        )
+        self.assertTrue(all(r["status"] == "success" for r in results))
+        self.assertTrue(all(r["seconds"] >= 0 for r in results))
+        self.assertTrue(all("stages" in r["metrics"] for r in results))
+
+    def test_ingest_files_dedupes_and_reports_errors(self):
+        def fake_ingest(bucket_name, file_name, event=None, force=False):
+            if file_name == "hp.json":
+                raise RuntimeError("boom")
+            return "skipped", "skipped: unchanged"
+
+        files = [
+            {"name": "hp.json"},
+            {"bucket": "b", "name": "mondo.json"},
+            {"bucket": "b", "name": "mondo.json"},
+        ]
+        with (
+            mock.patch.object(main, "GCS_BUCKET", "default-bucket"),
+            mock.patch.object(main, "ingest_file", side_effect=fake_ingest) as ingest,
+        ):
+            results = main.ingest_files(files, force=True)
+
+        self.assertEqual(ingest.call_count, 2)
+        self.assertEqual(results[0]["bucket"], "default-bucket")
+        self.assertEqual(results[0]["status"], "error")
+        self.assertEqual(results[0]["message"], "boom")
+        self.assertEqual(results[1]["status"], "skipped")
+
+    def test_batch_endpoint(self):
+        result = {"name": "hp.json", "status": "success", "seconds": 1.0}
+        client = main.app.test_client()
+        with mock.patch.object(main, "ingest_files", return_value=[result]) as ingest:
+            response = client.post(
+                "/batch", json={"files": [{"name": "hp.json"}], "force": True}
+            )
+            bad = client.post("/batch", json={"files": [{"bucket": "b"}]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["results"], [result])
+        self.assertTrue(ingest.call_args.kwargs["force"])
+        self.assertEqual(bad.status_code, 400)
+
+
+@unittest.skipUnless(MAIN_AVAILABLE, "main.py dependencies not installed")
+class TestMetricsEndpoints(unittest.TestCase):
+    def test_event_response_reports_stage_metrics(self):
+        storage_client = mock.Mock()
+        storage_client.bucket().blob().download_as_bytes.return_value = b"HP:1"
+
+        def fake_ingest(bucket_name, file_name, event=None, force=False):
+            content = main.download_blob_text(bucket_name, file_name)
+            df = main.records_to_frame([{"id": content}], main.hpo_terms_schema)
+            return "success", main.load_to_bigquery(df, "hpo_terms")
+
+        client = main.app.test_client()
+        with (
+            mock.patch.object(main, "ARROW_LOAD", False),
+            mock.patch.object(main, "get_storage_client", return_value=storage_client),
+            mock.patch.object(main, "get_bigquery_client"),
+            mock.patch.object(main, "ingest_file", side_effect=fake_ingest),
+        ):
+            response = client.post("/", json={"bucket": "b", "name": "hp.json"})
+            totals = client.get("/metrics").get_json()
+
+        body = response.get_json()
+        self.assertEqual(body["status"], "success")
+        metrics = body["metrics"]
+        self.assertEqual(set(metrics["stages"]), {"download", "frame", "load"})
+        self.assertEqual(metrics["counters"]["bytes_downloaded"], 4)
+        self.assertEqual(metrics["counters"]["rows_loaded"], 1)
+        self.assertEqual(metrics["profiles"], [])
+        self.assertEqual(totals["last"]["hp.json"]["counters"], metrics["counters"])
+        self.assertGreaterEqual(totals["counters"]["rows_loaded"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
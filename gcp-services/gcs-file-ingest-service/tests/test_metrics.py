@@ -0,0 +1,155 @@
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import metrics  # noqa: E402
+
+
+class TestStageTimers(unittest.TestCase):
+    def test_nested_stages_are_charged_exclusive_time(self):
+        with metrics.collect("hgnc_gene.json") as request_metrics:
+            with metrics.stage("parse"):
+                time.sleep(0.02)
+                with metrics.stage("download"):
+                    time.sleep(0.05)
+            metrics.count("rows_loaded", 3)
+            metrics.count("rows_loaded", 2)
+
+        result = request_metrics.to_dict()
+        stages = result["stages"]
+        self.assertGreaterEqual(stages["download"]["seconds"], 0.05)
+        self.assertLess(stages["parse"]["seconds"], 0.05)
+        self.assertEqual(stages["parse"]["calls"], 1)
+        self.assertEqual(result["counters"], {"rows_loaded": 5})
+        self.assertGreaterEqual(
+            result["seconds"],
+            stages["parse"]["seconds"] + stages["download"]["seconds"] - 0.001,
+        )
+        if metrics.resource is not None:
+            self.assertGreater(result["peak_rss_mb"], 0)
+        if metrics.rss_mb() is not None:
+            self.assertIn("rss_delta_mb", stages["parse"])
+            self.assertNotIn("rss_delta_mb", stages["download"])
+
+    def test_stage_and_count_are_noops_outside_collect(self):
+        with metrics.stage("parse"):
+            metrics.count("rows_loaded")
+
+    def test_threads_collect_separately(self):
+        results = {}
+
+        def ingest(name, rows):
+            with metrics.collect(name) as request_metrics:
+                metrics.count("rows_loaded", rows)
+            results[name] = request_metrics.counters
+
+        threads = [
+            threading.Thread(target=ingest, args=(name, rows))
+            for name, rows in (("a", 1), ("b", 2))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {"a": {"rows_loaded": 1}, "b": {"rows_loaded": 2}})
+
+    def test_timed_reader_counts_download_bytes(self):
+        with metrics.collect("ncbi_gene.txt") as request_metrics:
+            with metrics.TimedReader(io.BytesIO(b"a\tb\n1\t2\n")) as stream:
+                lines = list(stream)
+                self.assertEqual(stream.read(), b"")
+
+        self.assertEqual(lines, [b"a\tb\n", b"1\t2\n"])
+        self.assertEqual(request_metrics.counters["bytes_downloaded"], 8)
+        self.assertEqual(request_metrics.stages["download"]["calls"], 4)
+        self.assertTrue(stream.closed)
+
+    def test_totals_accumulate_requests(self):
+        before = metrics.totals()
+        with self.assertRaises(RuntimeError):
+            with metrics.collect("mondo.json"):
+                with metrics.stage("load"):
+                    raise RuntimeError("boom")
+
+        after = metrics.totals()
+        self.assertEqual(after["requests"], before["requests"] + 1)
+        self.assertEqual(after["errors"], before["errors"] + 1)
+        self.assertEqual(
+            after["stages"]["load"]["calls"],
+            before["stages"].get("load", {"calls": 0})["calls"] + 1,
+        )
+        self.assertIn("mondo.json", after["last"])
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.output = tmp_dir.name
+        patcher = mock.patch.object(metrics, "PROFILE_OUTPUT", self.output)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_profile_modes(self):
+        self.assertEqual(metrics.profile_modes(None), set())
+        self.assertEqual(metrics.profile_modes("CPU"), {"cpu"})
+        self.assertEqual(metrics.profile_modes("cpu, memory"), {"cpu", "memory"})
+        self.assertEqual(metrics.profile_modes("true"), {"cpu", "memory"})
+        self.assertEqual(metrics.profile_modes("bogus"), set())
+
+    def test_profiles_written_to_disk(self):
+        with metrics.collect("hp.json", profile="cpu,memory") as request_metrics:
+            rows = [{"id": i} for i in range(10000)]
+            self.assertEqual(len(rows), 10000)
+
+        names = sorted(os.path.basename(path) for path in request_metrics.profiles)
+        self.assertEqual(len(names), 3)
+        self.assertTrue(names[0].endswith("_hp.json.prof"))
+        self.assertTrue(names[1].endswith("_hp.json_cpu.txt"))
+        self.assertTrue(names[2].endswith("_hp.json_memory.txt"))
+        stats = pstats.Stats(os.path.join(self.output, names[0]))
+        self.assertGreater(stats.total_calls, 0)
+        self.assertGreater(request_metrics.counters["python_peak_bytes"], 0)
+
+    def test_one_profile_at_a_time(self):
+        with metrics.collect("hp.json", profile="cpu"):
+            with metrics.collect("mondo.json", profile="cpu") as second:
+                pass
+
+        self.assertEqual(second.profiles, [])
+
+    def test_profile_mode_env_applies_to_every_request(self):
+        with mock.patch.object(metrics, "PROFILE_MODE", "memory"):
+            with metrics.collect("ncbi_gene.txt") as request_metrics:
+                pass
+
+        self.assertEqual(len(request_metrics.profiles), 1)
+        self.assertIn("python_peak_bytes", request_metrics.counters)
+
+    def test_gcs_output(self):
+        storage_client = mock.Mock()
+        with (
+            mock.patch.object(metrics, "PROFILE_OUTPUT", "gs://profiles/ingest/"),
+            mock.patch.dict(
+                sys.modules,
+                {"clients": mock.Mock(get_storage_client=lambda: storage_client)},
+            ),
+        ):
+            uri = metrics.write_profile("x_cpu.txt", "stats")
+
+        self.assertEqual(uri, "gs://profiles/ingest/x_cpu.txt")
+        storage_client.bucket.assert_called_once_with("profiles")
+        storage_client.bucket().blob.assert_called_once_with("ingest/x_cpu.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,22 @@
+import io
 import unittest
 import sys
 import os
 import pandas as pd
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
-from utils import to_snake_case, process_tsv_data, convert_to_bigquery_date  # noqa: E402
+from utils import (  # noqa: E402
+    to_snake_case,
+    header_mapping,
+    cached_header_mapping,
+    process_tsv_data,
+    convert_to_bigquery_date,
+    coerce_dates,
+    iter_batches,
+    iter_tsv_batches,
+    records_to_arrow,
+    dataframe_to_arrow,
+)
 
 # Try to import google.cloud.bigquery, skip tests if not available
 try:
@@ -79,6 +91,35 @@ class TestToSnakeCase(unittest.TestCase):
         result = [to_snake_case(col) for col in columns]
         self.assertEqual(result, expected)
 
+    def test_header_mapping(self):
+        columns = ["GeneID", "Symbol", "GeneType", "OMIM_ID", " #Num ClinVar "]
+        expected = {
+            "GeneID": "id",
+            "Symbol": "symbol",
+            "GeneType": "gene_type",
+            "OMIM_ID": "omim_id",
+            " #Num ClinVar ": "num_clinvar",
+        }
+        self.assertEqual(header_mapping(columns, "GeneID"), expected)
+
+        # A repeated header row is served from the cache
+        hits = cached_header_mapping.cache_info().hits
+        self.assertEqual(header_mapping(list(columns), "GeneID"), expected)
+        self.assertEqual(cached_header_mapping.cache_info().hits, hits + 1)
+
+    def test_process_tsv_data_uses_precomputed_column_map(self):
+        tsv_data = "GeneID\tGeneType\n1\tprotein-coding\n"
+        column_map = {"GeneID": "id", "GeneType": "kind"}
+        config = {"id_column": "GeneID", "column_map": column_map}
+        self.assertEqual(
+            list(process_tsv_data(tsv_data, config).columns), ["id", "kind"]
+        )
+
+        # Headers outside the precomputed layout fall back to normalization
+        tsv_data = "GeneID\tGeneType\tSymbol\n1\tprotein-coding\tA1BG\n"
+        df = process_tsv_data(tsv_data, config)
+        self.assertEqual(list(df.columns), ["id", "gene_type", "symbol"])
+
 
 class TestProcessTsvData(unittest.TestCase):
     def test_process_tsv_data_organization_summary(self):
@@ -161,6 +202,48 @@ class TestDateConversion(unittest.TestCase):
                 else:
                     self.assertEqual(result, expected)
 
+    def test_coerce_dates(self):
+        """Fixed formats, flexible fallback and blanks in one column."""
+        values = pd.Series(
+            [
+                "2024-01-05",
+                "Jun 26, 2025",
+                "June 26, 2025",
+                "12/31/2023",
+                "2024-01-05",
+                " 2023-12-01 ",
+                "",
+                None,
+                "invalid date",
+                "2025-02-30",
+            ],
+            index=range(10, 20),
+        )
+        result = coerce_dates(values)
+
+        self.assertEqual(list(result.index), list(values.index))
+        self.assertEqual(
+            result.iloc[:6].astype(str).tolist(),
+            [
+                "2024-01-05",
+                "2025-06-26",
+                "2025-06-26",
+                "2023-12-31",
+                "2024-01-05",
+                "2023-12-01",
+            ],
+        )
+        self.assertTrue(result.iloc[6:].isna().all())
+
+    def test_coerce_dates_parses_distinct_leftovers_once(self):
+        """Only distinct values outside DATE_FORMATS reach flexible parsing."""
+        convert_to_bigquery_date.cache_clear()
+        values = pd.Series(["12/31/2023"] * 50 + ["2024-01-05"] * 50)
+
+        coerce_dates(values)
+
+        self.assertEqual(convert_to_bigquery_date.cache_info().misses, 1)
+
     def test_process_tsv_data_with_date_conversion(self):
         """Test that process_tsv_data converts DATE columns based on schema."""
         # Create mock schema with DATE field
@@ -303,6 +386,163 @@ class TestDateConversion(unittest.TestCase):
         expected_values = [["val1", "val2", "val3"], ["single_val"]]
         self.assertEqual(df["values"].tolist(), expected_values)
 
+    def test_process_tsv_data_with_repeated_integer_and_date_columns(self):
+        """Test element-wise conversion of REPEATED INTEGER and DATE columns."""
+        import datetime
+
+        mock_schema = [
+            bigquery.SchemaField("id", "STRING"),
+            bigquery.SchemaField("pubmed_ids", "INTEGER", mode="REPEATED"),
+            bigquery.SchemaField("dates", "DATE", mode="REPEATED"),
+        ]
+
+        test_tsv = """id\tpubmed_ids\tdates
+1\t101|202\t2024-01-15|Jun 26, 2025
+2\t\t
+3\t303|abc\tnot a date| 2023-12-01 """
+
+        table_config = {"id_column": "id", "schema": mock_schema, "delimiter": "|"}
+        df = process_tsv_data(test_tsv, table_config)
+
+        pubmed_ids = df["pubmed_ids"].tolist()
+        self.assertEqual(pubmed_ids[0], [101, 202])
+        self.assertEqual(pubmed_ids[1], [])
+        self.assertEqual(pubmed_ids[2][0], 303)
+        self.assertTrue(pd.isna(pubmed_ids[2][1]))
+
+        self.assertEqual(
+            df["dates"].tolist(),
+            [
+                [datetime.date(2024, 1, 15), datetime.date(2025, 6, 26)],
+                [],
+                [None, datetime.date(2023, 12, 1)],
+            ],
+        )
+
+
+class TestStreamingBatches(unittest.TestCase):
+    def test_iter_batches(self):
+        self.assertEqual(list(iter_batches(range(7), 3)), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(iter_batches([], 3)), [])
+
+    def test_iter_tsv_batches_matches_process_tsv_data(self):
+        """Streamed batches should concatenate to the same rows as a full read."""
+        mock_schema = [
+            bigquery.SchemaField("id", "STRING"),
+            bigquery.SchemaField("symbol", "STRING"),
+            bigquery.SchemaField("synonyms", "STRING", mode="REPEATED"),
+            bigquery.SchemaField("count", "INTEGER"),
+        ]
+        test_tsv = """GeneID\tSymbol\tSynonyms\tCount
+1\tA1BG\tA1B|ABG|GAB\t5
+2\tA2M\t\t
+3\tA2MP1\tA2MP\t7
+9\tNAT1\tAAC1|MNAT\t11
+10\tNAT2\tAAC2\t"""
+        table_config = {"id_column": "GeneID", "schema": mock_schema, "delimiter": "|"}
+
+        expected = process_tsv_data(test_tsv, table_config)
+        batches = list(
+            iter_tsv_batches(io.BytesIO(test_tsv.encode("utf-8")), table_config, 2)
+        )
+
+        self.assertEqual([len(b) for b in batches], [2, 2, 1])
+        streamed = pd.concat(batches, ignore_index=True)
+        self.assertEqual(list(streamed.columns), list(expected.columns))
+        self.assertEqual(streamed["id"].tolist(), expected["id"].tolist())
+        self.assertEqual(streamed["synonyms"].tolist(), expected["synonyms"].tolist())
+        self.assertEqual(streamed["count"].tolist(), [5, pd.NA, 7, 11, pd.NA])
+
+    def test_tsv_loads_identical_rows_with_or_without_streaming(self):
+        """Both readers should produce the same values, not just the same ids."""
+        mock_schema = [
+            bigquery.SchemaField("id", "STRING"),
+            bigquery.SchemaField("chromosome", "STRING"),
+            bigquery.SchemaField("count", "INTEGER"),
+        ]
+        # Numeric-looking text with a gap, which type inference reads as 1.0
+        test_tsv = """GeneID\tChromosome\tCount\tNotes
+1\t1\t5\t
+2\t\t\tNA
+3\t07\t7\tx"""
+        table_config = {"id_column": "GeneID", "schema": mock_schema}
+
+        whole = process_tsv_data(test_tsv, table_config)
+        streamed = pd.concat(
+            iter_tsv_batches(io.BytesIO(test_tsv.encode("utf-8")), table_config, 1),
+            ignore_index=True,
+        )
+
+        pd.testing.assert_frame_equal(streamed, whole)
+        self.assertEqual(whole["chromosome"].tolist()[::2], ["1", "07"])
+
+
+class TestArrowConversion(unittest.TestCase):
+    def setUp(self):
+        self.schema = [
+            bigquery.SchemaField("hgnc_id", "STRING"),
+            bigquery.SchemaField("pubmed_id", "INTEGER", mode="REPEATED"),
+            bigquery.SchemaField("date_modified", "DATE"),
+            bigquery.SchemaField("orphanet", "INTEGER"),
+        ]
+
+    def test_records_to_arrow(self):
+        import datetime
+        import pyarrow as pa
+
+        records = [
+            {
+                "hgnc_id": "HGNC:5",
+                "pubmed_id": [2591067],
+                "date_modified": "2023-01-20",
+                "orphanet": None,
+            },
+            {
+                "hgnc_id": "HGNC:37133",
+                "pubmed_id": [],
+                "date_modified": None,
+                "orphanet": 12,
+            },
+        ]
+        table = records_to_arrow(records, self.schema)
+
+        self.assertEqual(table.schema.field("pubmed_id").type, pa.list_(pa.int64()))
+        self.assertEqual(table.schema.field("date_modified").type, pa.date32())
+        self.assertEqual(
+            table.to_pylist(),
+            [
+                {
+                    "hgnc_id": "HGNC:5",
+                    "pubmed_id": [2591067],
+                    "date_modified": datetime.date(2023, 1, 20),
+                    "orphanet": None,
+                },
+                {
+                    "hgnc_id": "HGNC:37133",
+                    "pubmed_id": [],
+                    "date_modified": None,
+                    "orphanet": 12,
+                },
+            ],
+        )
+
+    def test_dataframe_to_arrow_from_processed_tsv(self):
+        import pyarrow as pa
+
+        test_tsv = """hgnc_id\tpubmed_id\tdate_modified\torphanet\textra
+HGNC:5\t1|2\t2023-01-20\t\tdropped
+HGNC:7\t\t\t12\tdropped"""
+        table_config = {"schema": self.schema, "delimiter": "|"}
+        df = process_tsv_data(test_tsv, table_config)
+        table = dataframe_to_arrow(df, self.schema)
+
+        self.assertEqual(
+            table.column_names, ["hgnc_id", "pubmed_id", "date_modified", "orphanet"]
+        )
+        self.assertEqual(table.schema.field("orphanet").type, pa.int64())
+        self.assertEqual(table.column("pubmed_id").to_pylist(), [[1, 2], []])
+        self.assertEqual(table.column("orphanet").to_pylist(), [None, 12])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -12,8 +12,9 @@
 --   state as of the first release of that month. This serves as the foundation
 --   for tracking conflict resolution over time and measuring curation impact.
 --
--- Output Table:
+-- Output Tables:
 --   - clinvar_ingest.monthly_conflict_snapshots
+--   - clinvar_ingest.monthly_conflict_watermark (latest snapshot date)
 --
 -- Source Tables:
 --   - clinvar_ingest.clinvar_vcv_classifications
@@ -85,13 +86,19 @@
 --   conflicts, and continuing conflicts over time.
 -- ============================================================================
 
-CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_snapshots` AS
+-- Build window: the first month to (re)build. The default rebuilds the full
+-- history and replaces the whole table. The conflict-analytics-trigger's
+-- incremental mode passes the first new month as @start_month instead, and
+-- only the months from start_month onward are deleted and re-inserted.
+DECLARE start_month DATE DEFAULT DATE'2023-01-01';
+
+CREATE TEMP TABLE new_monthly_conflict_snapshots AS
 
 -- Define the monthly release dates (first release of each month starting Jan 2023)
 WITH monthly_releases AS (
   SELECT release_date
   FROM `clinvar_ingest.all_schemas`()
-  WHERE release_date >= DATE'2023-01-01'
+  WHERE release_date >= start_month
   QUALIFY ROW_NUMBER() OVER (
     PARTITION BY DATE_TRUNC(release_date, MONTH)
     ORDER BY release_date ASC
@@ -214,4 +221,47 @@ SELECT
 FROM monthly_conflicts mc
 JOIN monthly_path_totals pt USING (snapshot_release_date)
 JOIN monthly_conflict_potential cp USING (snapshot_release_date)
-ORDER BY snapshot_release_date, variation_id
+ORDER BY snapshot_release_date, variation_id;
+
+IF start_month = DATE'2023-01-01' THEN
+  -- One-time migration: a table created before partitioning was added
+  -- cannot be replaced by a partitioned one, so drop it first
+  IF EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.TABLES
+    WHERE table_name = 'monthly_conflict_snapshots'
+  ) AND NOT EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.COLUMNS
+    WHERE table_name = 'monthly_conflict_snapshots' AND is_partitioning_column = 'YES'
+  ) THEN
+    DROP TABLE `clinvar_ingest.monthly_conflict_snapshots`;
+  END IF;
+
+  CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_snapshots`
+  PARTITION BY snapshot_release_date AS
+  SELECT * FROM new_monthly_conflict_snapshots;
+ELSE
+  -- Replace the window's months atomically: a failed INSERT rolls back
+  -- the DELETE
+  BEGIN
+    BEGIN TRANSACTION;
+
+    DELETE FROM `clinvar_ingest.monthly_conflict_snapshots`
+    WHERE snapshot_release_date >= start_month;
+
+    INSERT INTO `clinvar_ingest.monthly_conflict_snapshots`
+    SELECT * FROM new_monthly_conflict_snapshots;
+
+    COMMIT TRANSACTION;
+  EXCEPTION WHEN ERROR THEN
+    ROLLBACK TRANSACTION;
+    RAISE USING MESSAGE = @@error.message;
+  END;
+END IF;
+
+-- Watermark for the analytics trigger's new-data check: a single row it can
+-- read without running a query job
+CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_watermark` AS
+SELECT
+  MAX(snapshot_release_date) AS latest_snapshot_date,
+  CURRENT_TIMESTAMP() AS updated_at
+FROM `clinvar_ingest.monthly_conflict_snapshots`;
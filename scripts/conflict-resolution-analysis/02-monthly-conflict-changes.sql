@@ -81,7 +81,13 @@
 --   Use for analyzing conflict resolution trends and curation impact over time.
 -- ============================================================================
 
-CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_changes` AS
+-- Build window: the first month to (re)build. The default rebuilds the full
+-- history and replaces the whole table. The conflict-analytics-trigger's
+-- incremental mode passes the first new month as @start_month instead, and
+-- only the months from start_month onward are deleted and re-inserted.
+DECLARE start_month DATE DEFAULT DATE'2023-01-01';
+
+CREATE TEMP TABLE new_monthly_conflict_changes AS
 
 WITH ordered_snapshots AS (
   SELECT
@@ -91,6 +97,8 @@ WITH ordered_snapshots AS (
     SELECT DISTINCT snapshot_release_date
     FROM `clinvar_ingest.monthly_conflict_snapshots`
   )
+  -- Compare only the months in the build window (prev month may be older)
+  QUALIFY snapshot_release_date >= start_month
 ),
 
 month_comparisons AS (
@@ -203,3 +211,38 @@ month_comparisons AS (
 
 SELECT * FROM month_comparisons
 ORDER BY snapshot_release_date, variation_id;
+
+IF start_month = DATE'2023-01-01' THEN
+  -- One-time migration: a table created before partitioning was added
+  -- cannot be replaced by a partitioned one, so drop it first
+  IF EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.TABLES
+    WHERE table_name = 'monthly_conflict_changes'
+  ) AND NOT EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.COLUMNS
+    WHERE table_name = 'monthly_conflict_changes' AND is_partitioning_column = 'YES'
+  ) THEN
+    DROP TABLE `clinvar_ingest.monthly_conflict_changes`;
+  END IF;
+
+  CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_changes`
+  PARTITION BY snapshot_release_date AS
+  SELECT * FROM new_monthly_conflict_changes;
+ELSE
+  -- Replace the window's months atomically: a failed INSERT rolls back
+  -- the DELETE
+  BEGIN
+    BEGIN TRANSACTION;
+
+    DELETE FROM `clinvar_ingest.monthly_conflict_changes`
+    WHERE snapshot_release_date >= start_month;
+
+    INSERT INTO `clinvar_ingest.monthly_conflict_changes`
+    SELECT * FROM new_monthly_conflict_changes;
+
+    COMMIT TRANSACTION;
+  EXCEPTION WHEN ERROR THEN
+    ROLLBACK TRANSACTION;
+    RAISE USING MESSAGE = @@error.message;
+  END;
+END IF;
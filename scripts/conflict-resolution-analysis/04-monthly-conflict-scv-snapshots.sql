@@ -72,13 +72,21 @@
 --   This table is the foundation for 05-monthly-conflict-scv-changes.sql.
 -- ============================================================================
 
-CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_scv_snapshots` AS
+-- Build window: the first month to (re)build. The default rebuilds the full
+-- history and replaces the whole table. The conflict-analytics-trigger's
+-- incremental mode passes the first new month as @start_month instead, and
+-- only the months from start_month onward are deleted and re-inserted.
+DECLARE start_month DATE DEFAULT DATE'2023-01-01';
+
+CREATE TEMP TABLE new_monthly_conflict_scv_snapshots AS
 
 -- Define the monthly release dates (first release of each month starting Jan 2023)
 WITH monthly_releases AS (
   SELECT release_date
   FROM `clinvar_ingest.all_schemas`()
-  WHERE release_date >= DATE'2023-01-01'
+  -- Include the month before the window: resolved VCVs are found by
+  -- comparing each month with the previous one
+  WHERE release_date >= GREATEST(DATE'2023-01-01', DATE_SUB(start_month, INTERVAL 1 MONTH))
   QUALIFY ROW_NUMBER() OVER (
     PARTITION BY DATE_TRUNC(release_date, MONTH)
     ORDER BY release_date ASC
@@ -250,5 +258,41 @@ FROM vcv_snapshots v
 INNER JOIN scv_details s
   ON s.snapshot_release_date = v.snapshot_release_date
   AND s.variation_id = v.variation_id
+WHERE v.snapshot_release_date >= start_month
 
 ORDER BY snapshot_release_date, variation_id, scv_id;
+
+IF start_month = DATE'2023-01-01' THEN
+  -- One-time migration: a table created before partitioning was added
+  -- cannot be replaced by a partitioned one, so drop it first
+  IF EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.TABLES
+    WHERE table_name = 'monthly_conflict_scv_snapshots'
+  ) AND NOT EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.COLUMNS
+    WHERE table_name = 'monthly_conflict_scv_snapshots' AND is_partitioning_column = 'YES'
+  ) THEN
+    DROP TABLE `clinvar_ingest.monthly_conflict_scv_snapshots`;
+  END IF;
+
+  CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_scv_snapshots`
+  PARTITION BY snapshot_release_date AS
+  SELECT * FROM new_monthly_conflict_scv_snapshots;
+ELSE
+  -- Replace the window's months atomically: a failed INSERT rolls back
+  -- the DELETE
+  BEGIN
+    BEGIN TRANSACTION;
+
+    DELETE FROM `clinvar_ingest.monthly_conflict_scv_snapshots`
+    WHERE snapshot_release_date >= start_month;
+
+    INSERT INTO `clinvar_ingest.monthly_conflict_scv_snapshots`
+    SELECT * FROM new_monthly_conflict_scv_snapshots;
+
+    COMMIT TRANSACTION;
+  EXCEPTION WHEN ERROR THEN
+    ROLLBACK TRANSACTION;
+    RAISE USING MESSAGE = @@error.message;
+  END;
+END IF;
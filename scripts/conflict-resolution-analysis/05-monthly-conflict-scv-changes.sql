@@ -80,7 +80,13 @@
 -- Part 1: Individual SCV Changes
 -- ============================================================================
 
-CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_scv_changes` AS
+-- Build window: the first month to (re)build. The default rebuilds the full
+-- history and replaces both tables. The conflict-analytics-trigger's
+-- incremental mode passes the first new month as @start_month instead, and
+-- only the months from start_month onward are deleted and re-inserted.
+DECLARE start_month DATE DEFAULT DATE'2023-01-01';
+
+CREATE TEMP TABLE new_monthly_conflict_scv_changes AS
 
 WITH ordered_snapshots AS (
   SELECT
@@ -90,6 +96,8 @@ WITH ordered_snapshots AS (
     SELECT DISTINCT snapshot_release_date
     FROM `clinvar_ingest.monthly_conflict_scv_snapshots`
   )
+  -- Compare only the months in the build window (prev month may be older)
+  QUALIFY snapshot_release_date >= start_month
 ),
 
 -- Track the FIRST time each SCV+version was ever flagged (across all months)
@@ -306,15 +314,51 @@ LEFT JOIN first_flagged_dates ffd
   AND ffd.scv_version = COALESCE(sc.curr_scv_version, sc.prev_scv_version)
 ORDER BY snapshot_release_date, variation_id, scv_id;
 
+IF start_month = DATE'2023-01-01' THEN
+  -- One-time migration: a table created before partitioning was added
+  -- cannot be replaced by a partitioned one, so drop it first
+  IF EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.TABLES
+    WHERE table_name = 'monthly_conflict_scv_changes'
+  ) AND NOT EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.COLUMNS
+    WHERE table_name = 'monthly_conflict_scv_changes' AND is_partitioning_column = 'YES'
+  ) THEN
+    DROP TABLE `clinvar_ingest.monthly_conflict_scv_changes`;
+  END IF;
+
+  CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_scv_changes`
+  PARTITION BY snapshot_release_date AS
+  SELECT * FROM new_monthly_conflict_scv_changes;
+ELSE
+  -- Replace the window's months atomically: a failed INSERT rolls back
+  -- the DELETE
+  BEGIN
+    BEGIN TRANSACTION;
+
+    DELETE FROM `clinvar_ingest.monthly_conflict_scv_changes`
+    WHERE snapshot_release_date >= start_month;
+
+    INSERT INTO `clinvar_ingest.monthly_conflict_scv_changes`
+    SELECT * FROM new_monthly_conflict_scv_changes;
+
+    COMMIT TRANSACTION;
+  EXCEPTION WHEN ERROR THEN
+    ROLLBACK TRANSACTION;
+    RAISE USING MESSAGE = @@error.message;
+  END;
+END IF;
+
 
 -- ============================================================================
 -- Part 2: VCV-Level Summary with SCV Change Details
 -- ============================================================================
 
-CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_vcv_scv_summary` AS
+CREATE TEMP TABLE new_monthly_conflict_vcv_scv_summary AS
 
 WITH scv_changes_raw AS (
   SELECT * FROM `clinvar_ingest.monthly_conflict_scv_changes`
+  WHERE snapshot_release_date >= start_month
 ),
 
 -- Enrich with VCV-level prev_vcv_rank for all rows (including new SCVs where per-row value is NULL)
@@ -564,3 +608,38 @@ SELECT
 
 FROM reason_components v
 ORDER BY snapshot_release_date, variation_id;
+
+IF start_month = DATE'2023-01-01' THEN
+  -- One-time migration: a table created before partitioning was added
+  -- cannot be replaced by a partitioned one, so drop it first
+  IF EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.TABLES
+    WHERE table_name = 'monthly_conflict_vcv_scv_summary'
+  ) AND NOT EXISTS (
+    SELECT 1 FROM `clinvar_ingest`.INFORMATION_SCHEMA.COLUMNS
+    WHERE table_name = 'monthly_conflict_vcv_scv_summary' AND is_partitioning_column = 'YES'
+  ) THEN
+    DROP TABLE `clinvar_ingest.monthly_conflict_vcv_scv_summary`;
+  END IF;
+
+  CREATE OR REPLACE TABLE `clinvar_ingest.monthly_conflict_vcv_scv_summary`
+  PARTITION BY snapshot_release_date AS
+  SELECT * FROM new_monthly_conflict_vcv_scv_summary;
+ELSE
+  -- Replace the window's months atomically: a failed INSERT rolls back
+  -- the DELETE
+  BEGIN
+    BEGIN TRANSACTION;
+
+    DELETE FROM `clinvar_ingest.monthly_conflict_vcv_scv_summary`
+    WHERE snapshot_release_date >= start_month;
+
+    INSERT INTO `clinvar_ingest.monthly_conflict_vcv_scv_summary`
+    SELECT * FROM new_monthly_conflict_vcv_scv_summary;
+
+    COMMIT TRANSACTION;
+  EXCEPTION WHEN ERROR THEN
+    ROLLBACK TRANSACTION;
+    RAISE USING MESSAGE = @@error.message;
+  END;
+END IF;
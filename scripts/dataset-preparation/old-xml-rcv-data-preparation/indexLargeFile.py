@@ -0,0 +1,183 @@
+import argparse
+import gzip
+import re
+import zlib
+
+import numpy as np
+
+from splitLargeFile import CHUNK_SIZE, iter_clinvarset_spans
+
+# Records between gzip seek points in the seekable copy of a release
+RECORDS_PER_SEEK_POINT = 1000
+
+CLINVARSET_ID = re.compile(rb'\sID="(\d+)"')
+
+
+def index_paths(file_path):
+    """(seekable copy, index) paths stored next to a release."""
+    base = file_path[:-3] if file_path.endswith('.gz') else file_path
+    return f'{base}.seekable.gz', f'{base}.index.npz'
+
+
+class TeeReader:
+    # Keeps every byte read from a stream until it is taken with take()
+    def __init__(self, stream):
+        self.stream = stream
+        self.pending = bytearray()
+        self.offset = 0  # stream offset of pending[0]
+
+    def read(self, size):
+        data = self.stream.read(size)
+        self.pending += data
+        return data
+
+    def take(self, end_offset):
+        data = bytes(self.pending[:end_offset - self.offset])
+        del self.pending[:end_offset - self.offset]
+        self.offset = end_offset
+        return data
+
+
+def build_index(file_path, records_per_seek_point=RECORDS_PER_SEEK_POINT):
+    """
+    Index a gzipped ClinVar RCV XML release in one pass.
+
+    A single-member gzip file cannot be entered part way through, so the
+    release is recompressed into a seekable copy: a multi-member gzip (still
+    readable by gunzip and gzip.open) that starts a new member at every
+    records_per_seek_point-th ClinVarSet. The sidecar index records, for
+    each ClinVarSet in file order, its @ID and uncompressed offset and
+    length, plus the compressed and uncompressed offset of every member.
+
+    Returns:
+        the index path
+    """
+    seekable_path, index_path = index_paths(file_path)
+    ids, offsets, lengths = [], [], []
+    seek_compressed, seek_uncompressed = [], []
+
+    with gzip.open(file_path, 'rb') as release, open(seekable_path, 'wb') as output:
+        reader = TeeReader(release)
+        member = gzip.GzipFile(fileobj=output, mode='wb', mtime=0)
+        seek_compressed.append(0)
+        seek_uncompressed.append(0)
+
+        for offset, raw_clinvarset in iter_clinvarset_spans(reader, CHUNK_SIZE):
+            if ids and len(ids) % records_per_seek_point == 0:
+                # Start a new member at this record
+                member.write(reader.take(offset))
+                member.close()
+                seek_compressed.append(output.tell())
+                member = gzip.GzipFile(fileobj=output, mode='wb', mtime=0)
+                seek_uncompressed.append(offset)
+
+            start_tag = raw_clinvarset[:raw_clinvarset.index(b'>')]
+            ids.append(int(CLINVARSET_ID.search(start_tag).group(1)))
+            offsets.append(offset)
+            lengths.append(len(raw_clinvarset))
+            member.write(reader.take(offset + len(raw_clinvarset)))
+
+        # The rest of the release (</ReleaseSet>)
+        member.write(reader.take(reader.offset + len(reader.pending)))
+        member.close()
+
+    np.savez(
+        index_path,
+        ids=np.array(ids, dtype=np.uint64),
+        offsets=np.array(offsets, dtype=np.uint64),
+        lengths=np.array(lengths, dtype=np.uint32),
+        seek_compressed=np.array(seek_compressed, dtype=np.uint64),
+        seek_uncompressed=np.array(seek_uncompressed, dtype=np.uint64),
+    )
+    return index_path
+
+
+class ClinVarSetIndex:
+    """
+    Random access to the ClinVarSets of an indexed release (see build_index).
+
+    Records are numbered from 0 in file order.
+    """
+
+    def __init__(self, file_path):
+        self.seekable_path, index_path = index_paths(file_path)
+        with np.load(index_path) as index:
+            self.ids = index['ids']
+            self.offsets = index['offsets']
+            self.lengths = index['lengths']
+            self.seek_compressed = index['seek_compressed']
+            self.seek_uncompressed = index['seek_uncompressed']
+        self._id_order = None
+        self._sorted_ids = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def seek_point(self, record_number):
+        # Index of the gzip member holding a record
+        offset = self.offsets[record_number]
+        return int(np.searchsorted(self.seek_uncompressed, offset, side='right')) - 1
+
+    def iter_raw(self, first_record=0, last_record=None):
+        """
+        Yield the raw XML of records first_record..last_record (inclusive),
+        decompressing only from the gzip member that holds the first one.
+        """
+        last_record = len(self) - 1 if last_record is None else min(last_record, len(self) - 1)
+        if first_record > last_record:
+            return
+        point = self.seek_point(first_record)
+        with open(self.seekable_path, 'rb') as f:
+            f.seek(int(self.seek_compressed[point]))
+            # gzip continues through the following members on its own
+            with gzip.GzipFile(fileobj=f, mode='rb') as stream:
+                position = int(self.seek_uncompressed[point])
+                for record_number in range(first_record, last_record + 1):
+                    offset = int(self.offsets[record_number])
+                    stream.read(offset - position)
+                    raw_clinvarset = stream.read(int(self.lengths[record_number]))
+                    position = offset + len(raw_clinvarset)
+                    yield raw_clinvarset
+
+    def record_number(self, clinvarset_id):
+        """Position of the ClinVarSet with the given @ID, or None."""
+        if self._id_order is None:
+            self._id_order = np.argsort(self.ids, kind='stable')
+            self._sorted_ids = self.ids[self._id_order]
+        ids = self._sorted_ids
+        i = int(np.searchsorted(ids, np.uint64(clinvarset_id)))
+        if i == len(ids) or ids[i] != clinvarset_id:
+            return None
+        return int(self._id_order[i])
+
+    def get_raw(self, clinvarset_id):
+        """
+        The raw XML of one ClinVarSet, or None if the ID is not in the
+        release. Only the gzip member holding it is decompressed.
+        """
+        record_number = self.record_number(clinvarset_id)
+        if record_number is None:
+            return None
+        point = self.seek_point(record_number)
+        start = int(self.offsets[record_number] - self.seek_uncompressed[point])
+        end = start + int(self.lengths[record_number])
+        with open(self.seekable_path, 'rb') as f:
+            f.seek(int(self.seek_compressed[point]))
+            decompressor = zlib.decompressobj(wbits=31)
+            data = bytearray()
+            while len(data) < end and not decompressor.eof:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                data += decompressor.decompress(chunk)
+        return bytes(data[start:end])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Build a seekable copy and ClinVarSet index of a ClinVar RCV XML release'
+    )
+    parser.add_argument('file_path', help='Gzipped ClinVarFullRelease XML')
+    parser.add_argument('--records-per-seek-point', type=int, default=RECORDS_PER_SEEK_POINT)
+    args = parser.parse_args()
+    print(build_index(args.file_path, args.records_per_seek_point))
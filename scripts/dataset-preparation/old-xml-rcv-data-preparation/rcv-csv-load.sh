@@ -27,11 +27,14 @@ mmyy_array=(
 for mmyy in "${mmyy_array[@]}"; do
     echo "Processing $mmyy..."
 
+    # Shards written by splitLargeFile.py (for --format parquet load
+    # "part_*.parquet" with --source_format=PARQUET and no schema)
     bq load \
         --replace \
-        --source_format=CSV \
+        --source_format=NEWLINE_DELIMITED_JSON \
         clinvar_000.${mmyy}-rcv-source \
-        "gs://clinvar-ingest-dev/rcv-old/${mmyy}/rcv_clinvarset_recs_part*"
+        "gs://clinvar-ingest-dev/rcv-old/${mmyy}/part_*.json.gz" \
+        id:STRING,content:STRING
 
     # Check if the command succeeded
     if [ $? -ne 0 ]; then
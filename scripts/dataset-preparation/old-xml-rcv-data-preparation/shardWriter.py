@@ -0,0 +1,117 @@
+import gzip
+import json
+import os
+
+# Compressed bytes at which a shard is closed and the next one started
+TARGET_SHARD_BYTES = 128 * 1024 * 1024
+# Rows buffered per Parquet row group
+PARQUET_ROW_GROUP_SIZE = 10000
+
+SHARD_EXTENSIONS = {'json': '.json.gz', 'parquet': '.parquet'}
+
+
+class ShardWriter:
+    """
+    Stream {'id', 'content'} rows into shards of about target_bytes each.
+
+    Shards are gzipped newline-delimited JSON (shard_format='json') or
+    Parquet (shard_format='parquet', needs pyarrow), named
+    <output_prefix>part_<part>_<shard>.<ext> so that they sort in record
+    order. A gzip shard is a complete gzip member, so the shards can be
+    concatenated with compose-gcs-shards.sh. start_part() begins a new
+    shard numbering for a part, so a part range never shares a file with
+    another one. close() writes <output_prefix>manifest_<first part>.json
+    listing each shard with its row and byte counts.
+    """
+
+    def __init__(self, output_prefix, shard_format='json', target_bytes=TARGET_SHARD_BYTES):
+        if shard_format not in SHARD_EXTENSIONS:
+            raise ValueError(f'Unknown shard format: {shard_format}')
+        self.output_prefix = output_prefix
+        self.shard_format = shard_format
+        self.target_bytes = target_bytes
+        self.shards = []
+        self.first_part = None
+        self.part = 1
+        self.shard_number = 0
+        self.file = None
+        self.writer = None
+        self.rows = []
+        self.row_count = 0
+
+    def start_part(self, part):
+        # Close the open shard; the next row starts part_<part>_000
+        self._close_shard()
+        if self.first_part is None:
+            self.first_part = part
+        self.part = part
+        self.shard_number = 0
+
+    def write(self, record):
+        if self.file is None:
+            self._open_shard()
+        if self.shard_format == 'json':
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+            self.writer.write(line.encode('utf-8'))
+        else:
+            self.rows.append(record)
+            if len(self.rows) >= PARQUET_ROW_GROUP_SIZE:
+                self._flush_rows()
+        self.row_count += 1
+
+        # The compressed size so far; the compressor holds back a little
+        if self.file.tell() >= self.target_bytes:
+            self._close_shard()
+
+    def close(self):
+        """Close the last shard and write the manifest; returns its path."""
+        self._close_shard()
+        first_part = self.part if self.first_part is None else self.first_part
+        manifest_path = f'{self.output_prefix}manifest_{str(first_part).zfill(3)}.json'
+        manifest = {
+            'format': self.shard_format,
+            'rows': sum(shard['rows'] for shard in self.shards),
+            'shards': self.shards
+        }
+        with open(manifest_path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        return manifest_path
+
+    def _shard_path(self):
+        name = f'part_{str(self.part).zfill(3)}_{str(self.shard_number).zfill(3)}'
+        return f'{self.output_prefix}{name}{SHARD_EXTENSIONS[self.shard_format]}'
+
+    def _open_shard(self):
+        self.path = self._shard_path()
+        self.file = open(self.path, 'wb')
+        if self.shard_format == 'json':
+            self.writer = gzip.GzipFile(fileobj=self.file, mode='wb', mtime=0)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self.schema = pa.schema([('id', pa.string()), ('content', pa.string())])
+            self.writer = pq.ParquetWriter(self.file, self.schema, compression='zstd')
+        self.row_count = 0
+
+    def _flush_rows(self):
+        import pyarrow as pa
+
+        self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+        self.rows = []
+
+    def _close_shard(self):
+        if self.file is None:
+            return
+        if self.rows:
+            self._flush_rows()
+        self.writer.close()
+        self.file.close()
+        self.shards.append({
+            'name': os.path.basename(self.path),
+            'rows': self.row_count,
+            'bytes': os.path.getsize(self.path)
+        })
+        self.file = None
+        self.writer = None
+        self.shard_number += 1
@@ -1,94 +1,250 @@
-import re
-import xmltodict
+import argparse
+import io
 import json
-import pandas as pd
+import os
+import re
 import gzip
-
-def save_records_to_csv(records, file_counter, output_prefix):
-    # Convert to DataFrame
-    clinvar_df = pd.DataFrame(records)
-
-    # Save to CSV for BigQuery upload
-    output_file = f'{output_prefix}_part{str(file_counter).zfill(3)}.csv'
-    clinvar_df.to_csv(output_file, index=False, encoding='utf-8', header=False)
-
-def split_clinvarset_file(file_path, output_prefix):
-    # Define the pattern to match whitespace between </ClinVarSet> and <ClinVarSet
-    pattern = r"</ClinVarSet>\n"
-    regex = re.compile(pattern)
-    chunk_size = 1024 * 1024  # 1MB chunks
-    file_counter = 1
-    record_counter = 1
-    buffer = ""
-    records = []
-
-    with gzip.open(file_path, 'rt', encoding='utf-8') as large_file:
-        # Skip the first 2 line
-        first_line  = large_file.readline()
-        # file_size = large_file.seek(0, 2)  # Get the total file size
-
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from xml.parsers import expat
+
+from shardWriter import SHARD_EXTENSIONS, TARGET_SHARD_BYTES, ShardWriter
+
+# Bytes of XML read from the release at a time
+CHUNK_SIZE = 1024 * 1024  # 1MB chunks
+# Records in each part (the unit of --first-part/--last-part)
+RECORDS_PER_PART = 100000
+# Records converted per worker task
+BATCH_SIZE = 1000
+
+CLINVARSET_START = re.compile(rb'<ClinVarSet[\s>]')
+CLINVARSET_END = b'</ClinVarSet>'
+
+
+def iter_clinvarsets(stream, chunk_size=CHUNK_SIZE):
+    """
+    Stream the <ClinVarSet> records of a ClinVar RCV XML release.
+
+    Feeds the file to an expat parser chunk by chunk and yields each
+    ClinVarSet as {'ClinVarSet': ...}, the same dict xmltodict.parse returns
+    for that record's XML: attributes (including xmlns declarations) as
+    '@name' keys, repeated children as lists, stripped text as '#text' (or
+    the whole value when the element has nothing else), and None for an
+    empty element. Only the record being built is held in memory.
+    """
+    parser = expat.ParserCreate()
+    parser.ordered_attributes = True
+    parser.buffer_text = True
+    completed = []
+    # (name, item, text parts) of each open element from the ClinVarSet down
+    stack = []
+    depth = 0
+
+    def start_element(name, attrs):
+        nonlocal depth
+        depth += 1
+        if depth > 1:
+            item = {'@' + attrs[i]: attrs[i + 1] for i in range(0, len(attrs), 2)}
+            stack.append((name, item, []))
+
+    def end_element(_):
+        nonlocal depth
+        depth -= 1
+        if not depth:
+            return
+        name, item, text = stack.pop()
+        text = ''.join(text).strip() or None
+        if not item:
+            value = text
+        else:
+            if text:
+                item['#text'] = text
+            value = item
+        if stack:
+            parent = stack[-1][1]
+            if name not in parent:
+                parent[name] = value
+            elif isinstance(parent[name], list):
+                parent[name].append(value)
+            else:
+                parent[name] = [parent[name], value]
+        elif name == 'ClinVarSet':
+            completed.append({name: value})
+
+    def character_data(data):
+        if stack:
+            stack[-1][2].append(data)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+
+    while True:
+        chunk = stream.read(chunk_size)
+        parser.Parse(chunk, not chunk)
+        yield from completed
+        completed.clear()
+        if not chunk:
+            break
+
+
+def iter_clinvarset_spans(stream, chunk_size=CHUNK_SIZE):
+    """
+    Cut the raw XML bytes of each <ClinVarSet> out of a release without
+    parsing it, yielding (uncompressed offset, bytes). ClinVarSets are never
+    nested, so a byte search for the start and end tags finds every record.
+    """
+    buffer = b''
+    # Offset of buffer[0] in the stream
+    base = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        position = 0
         while True:
-            chunk = large_file.read(chunk_size)
-            if not chunk:
+            start = CLINVARSET_START.search(buffer, position)
+            if start is None:
                 break
-
-            # Add the new chunk to the buffer
-            buffer += chunk
-
-            # Split the buffer based on the pattern
-            splits = regex.split(buffer)
-
-            # Keep the last part of the buffer to ensure complete patterns
-            buffer = splits.pop()  # Save the leftover part for the next chunk
-
-            # Write each split to a new file
-            for split_content in splits:
-
-                # Add back the pattern to the start of the next split
-                if split_content.strip():
-
-                    # Print the progress
-                    # progress = ((large_file.tell() - len(chunk)) / file_size) * 100
-                    # print(f'\rProcessed records: {record_counter} - {progress:.2f}% complete', end='', flush=True)
-                    print(f'\rProcessed records: {record_counter}', end='', flush=True)
-
-                    xml_content = split_content.strip() + '\n</ClinVarSet>'
-
-                    if file_counter > 9:
-                        # Convert XML to a dictionary
-                        data_dict = xmltodict.parse(xml_content)
-
-                        record_id = data_dict['ClinVarSet']['@ID']
-                        record_content = json.dumps(data_dict)
-
-                        records.append({'id': record_id, 'content': record_content})
-
-                    # Write the record to a csv file every 100,000 records
-                    if record_counter % 100000 == 0:
-
-                        if file_counter > 9:
-                            save_records_to_csv(records, file_counter, output_prefix)
-
-                        # Reset the records list
-                        records = []
-                        file_counter += 1
-
-                    # # Convert the dictionary to JSON
-                    # with open(json_file, 'w', encoding='utf-8') as file:
-                    #     json.dump(data_dict, file)
-
-                    record_counter += 1
-
-        # Do NOT Write the last bit of content since it will be the </ReleaseSet>
-        # if buffer.strip():
-        #     output_file = f"{output_prefix}_part{file_counter}.txt"
-        #     with open(output_file, 'w', encoding='utf-8') as output:
-        #         output.write(buffer.strip())
-
-        # Save the remaining records to a CSV file
-        save_records_to_csv(records, file_counter, output_prefix)
-
-# Usage example
-file_path = "/Users/lbabb/Downloads/rcv/ClinVarFullRelease_2024-03.xml.gz"
-output_prefix = "/Users/lbabb/Downloads/rcv/rcv_clinvarset_recs"
-split_clinvarset_file(file_path, output_prefix)
+            end = buffer.find(CLINVARSET_END, start.start())
+            if end < 0:
+                # Incomplete record; keep it for the next chunk
+                position = start.start()
+                break
+            position = end + len(CLINVARSET_END)
+            yield base + start.start(), buffer[start.start():position]
+        base += position
+        buffer = buffer[position:]
+        if not chunk:
+            break
+
+
+def iter_raw_clinvarsets(stream, chunk_size=CHUNK_SIZE):
+    # The raw bytes of each <ClinVarSet>, see iter_clinvarset_spans
+    for _, raw_clinvarset in iter_clinvarset_spans(stream, chunk_size):
+        yield raw_clinvarset
+
+
+def iter_batches(items, batch_size=BATCH_SIZE):
+    # Group an iterator into lists of up to batch_size items
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def clinvarset_record(data_dict):
+    """The {'id', 'content'} row stored for a ClinVarSet."""
+    return {'id': data_dict['ClinVarSet']['@ID'], 'content': json.dumps(data_dict)}
+
+
+def convert_batch(raw_clinvarsets):
+    """Convert a batch of raw ClinVarSet XML to {'id', 'content'} rows, in order."""
+    xml = b'<ReleaseSet>' + b''.join(raw_clinvarsets) + b'</ReleaseSet>'
+    return [clinvarset_record(d) for d in iter_clinvarsets(io.BytesIO(xml))]
+
+
+def iter_converted_batches(batches, workers):
+    """
+    Convert batches in a pool of worker processes, yielding the results in
+    input order. At most two batches per worker are in flight, so the reader
+    never runs ahead of the workers by more than that.
+    """
+    if workers <= 1:
+        yield from map(convert_batch, batches)
+        return
+
+    with Pool(workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.apply_async(convert_batch, (batch,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def iter_release_range(file_path, first_record=0, last_record=None):
+    """
+    The raw ClinVarSets first_record..last_record (inclusive, numbered from
+    0) of a release. With an index built by indexLargeFile.build_index next
+    to the release, reading starts at the gzip seek point before
+    first_record; otherwise the release is scanned from the start.
+    """
+    from indexLargeFile import ClinVarSetIndex, index_paths
+
+    if os.path.exists(index_paths(file_path)[1]):
+        yield from ClinVarSetIndex(file_path).iter_raw(first_record, last_record)
+        return
+
+    with gzip.open(file_path, 'rb') as large_file:
+        stop = None if last_record is None else last_record + 1
+        yield from islice(iter_raw_clinvarsets(large_file), first_record, stop)
+
+
+def split_clinvarset_file(file_path, output_prefix, workers=None, first_part=1, last_part=None,
+                          shard_format='json', target_bytes=TARGET_SHARD_BYTES):
+    """
+    Convert a gzipped ClinVar RCV XML release into shards of
+    {'id', 'content'} rows written by a ShardWriter, returning the path of
+    its manifest.
+
+    This process reads the file and cuts out the raw ClinVarSets; a pool
+    of `workers` processes (default: one per core) converts them to JSON in
+    batches of BATCH_SIZE. Results are consumed in file order, so the rows
+    and shards do not depend on the number of workers.
+
+    The release is divided into parts of RECORDS_PER_PART records, and each
+    part is written to its own shards of about target_bytes. Only parts
+    first_part..last_part are written, so an interrupted run can be
+    resumed, and disjoint part ranges can be converted by separate
+    processes or machines. An index of the release makes starting part way
+    through cheap (see iter_release_range).
+    """
+    workers = workers or os.cpu_count() or 1
+    first_record = (first_part - 1) * RECORDS_PER_PART
+    last_record = None if last_part is None else last_part * RECORDS_PER_PART - 1
+
+    record_counter = first_record
+
+    writer = ShardWriter(output_prefix, shard_format, target_bytes)
+    writer.start_part(first_part)
+
+    batches = iter_batches(iter_release_range(file_path, first_record, last_record))
+    for converted in iter_converted_batches(batches, workers):
+        for record in converted:
+            # Start the shards of the next part every 100,000 records
+            if record_counter > first_record and record_counter % RECORDS_PER_PART == 0:
+                writer.start_part(record_counter // RECORDS_PER_PART + 1)
+            writer.write(record)
+            record_counter += 1
+
+        # Print the progress
+        print(f'\rProcessed records: {record_counter}', end='', flush=True)
+
+    print()
+    return writer.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Split a ClinVar RCV XML release into shards of ClinVarSet JSON'
+    )
+    parser.add_argument('file_path', help='Gzipped ClinVarFullRelease XML')
+    parser.add_argument(
+        'output_prefix', help='Prefix of the part_*_*.json.gz shards and manifest (e.g. out/)'
+    )
+    parser.add_argument('--workers', type=int, help='Conversion processes (default: cores)')
+    parser.add_argument('--first-part', type=int, default=1)
+    parser.add_argument('--last-part', type=int)
+    parser.add_argument('--format', choices=sorted(SHARD_EXTENSIONS), default='json')
+    parser.add_argument(
+        '--target-mb', type=int, default=TARGET_SHARD_BYTES // (1024 * 1024),
+        help='Compressed size at which a shard is rolled over'
+    )
+    args = parser.parse_args()
+    print(split_clinvarset_file(
+        args.file_path, args.output_prefix, args.workers, args.first_part, args.last_part,
+        args.format, args.target_mb * 1024 * 1024
+    ))